@@ -2,8 +2,15 @@
 This module contains the AI agents for the application.
 """
 
-from agents.reddit_scout.chat_agent import chat_agent
+from typing import Any
 
-# Make the chat_agent available at the root level
+# Make the chat_agent available at the root level. It is imported on first
+# access, so importing agents.common or a single agent module does not load
+# the whole chat stack.
 __all__ = ['chat_agent']
 
+def __getattr__(name: str) -> Any:
+    if name == 'chat_agent':
+        from agents.reddit_scout.chat_agent import chat_agent
+        return chat_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,3 @@
+"""
+Shared infrastructure used by both Reddit Scout agents.
+"""
@@ -0,0 +1,462 @@
+"""
+Two-tier Reddit listing cache, used by the MCP agent and the basic search path.
+
+A bounded in-process LRU sits in front of a persistent storage backend
+(see cache_backends.py), so hot keys are served without any disk I/O.
+MCP_CACHE_BACKEND selects the backend: "file" (default) keeps one file
+per key under CACHE_CONFIG.cache_dir, indexed by an in-memory manifest
+with an on-disk journal; "sqlite" keeps everything in a single SQLite
+database in WAL mode, which is safe for several worker processes. A
+background sweeper removes expired entries off the request path.
+
+Entries past their TTL can still be served for a grace window
+(stale-while-revalidate) while a background worker refreshes them.
+
+Entries are stored in a versioned binary format (see cache_codecs.py),
+msgpack+zstd by default; MCP_CACHE_CODEC selects another one.
+"""
+
+import os
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from agents.common.cache_backends import CacheBackend, FileCacheBackend, LazyCacheBackend, SQLiteCacheBackend
+from agents.common.cache_codecs import Codec, CodecError, payload_size
+from agents.common.metrics import CACHE_LOOKUP_SECONDS, METRICS
+from agents.common.post_batch import PostBatch
+from agents.common.rate_limit import Priority, request_priority
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CacheConfig:
+    """Configuration for cache settings."""
+    cache_dir: Path
+    ttl: int
+    max_size_mb: int
+    compression: bool
+    sweep_interval: int
+    memory_max_entries: int
+    memory_max_mb: int
+    backend: str
+    listing_limit: int
+    stale_grace: int
+    refresh_workers: int
+    codec: str
+    dictionary: Optional[Path]
+
+def get_cache_config() -> CacheConfig:
+    """Get cache configuration from environment variables with defaults."""
+    cache_dir = Path(os.getenv("MCP_CACHE_DIR", ".mcp_cache"))
+    ttl = int(os.getenv("MCP_TTL", "3600"))  # 1 hour default
+    max_size_mb = int(os.getenv("MCP_MAX_SIZE_MB", "100"))  # 100MB default
+    compression = os.getenv("MCP_COMPRESSION", "true").lower() == "true"
+    sweep_interval = int(os.getenv("MCP_SWEEP_INTERVAL", "300"))  # 5 minutes default
+    memory_max_entries = int(os.getenv("MCP_MEMORY_MAX_ENTRIES", "256"))
+    memory_max_mb = int(os.getenv("MCP_MEMORY_MAX_MB", "16"))  # 16MB default
+    backend = os.getenv("MCP_CACHE_BACKEND", "file").lower()  # "file" or "sqlite"
+    listing_limit = int(os.getenv("MCP_LISTING_LIMIT", "25"))  # posts fetched per listing
+    stale_grace = int(os.getenv("MCP_STALE_GRACE", "900"))  # serve stale for up to 15 minutes past TTL
+    refresh_workers = int(os.getenv("MCP_REFRESH_WORKERS", "2"))
+    codec = os.getenv("MCP_CACHE_CODEC", "auto").lower()  # e.g. "msgpack-zstd", "json-zlib"
+    dictionary_path = os.getenv("MCP_CACHE_DICTIONARY")  # trained zstd dictionary
+    dictionary = Path(dictionary_path) if dictionary_path else None
+
+    return CacheConfig(
+        cache_dir, ttl, max_size_mb, compression, sweep_interval,
+        memory_max_entries, memory_max_mb, backend, listing_limit,
+        stale_grace, refresh_workers, codec, dictionary,
+    )
+
+# Initialize cache configuration
+CACHE_CONFIG = get_cache_config()
+CACHE_CODEC = Codec(CACHE_CONFIG.codec, CACHE_CONFIG.compression, CACHE_CONFIG.dictionary)
+
+class CacheStats:
+    """Track cache statistics; safe to update from any thread."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.misses = 0
+        self.errors = 0
+        self.total_size = 0
+
+    def hit(self, tier: str = "disk"):
+        with self._lock:
+            self.hits += 1
+            if tier == "memory":
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+
+    def stale_hit(self):
+        with self._lock:
+            self.stale_hits += 1
+
+    def refresh(self):
+        with self._lock:
+            self.refreshes += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def set_size(self, size_bytes: int):
+        """Record the backend's current size (it shrinks again on expiry and eviction)."""
+        with self._lock:
+            self.total_size = size_bytes
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "stale_hits": self.stale_hits,
+                "refreshes": self.refreshes,
+                "misses": self.misses,
+                "errors": self.errors,
+                "memory_hit_rate": self.memory_hits / lookups if lookups else 0.0,
+                "disk_hit_rate": self.disk_hits / lookups if lookups else 0.0,
+                "total_size_bytes": self.total_size,
+                "total_size_mb": self.total_size // (1024 * 1024)
+            }
+
+CACHE_STATS = CacheStats()
+METRICS.register_collector("reddit_scout_listing_cache", CACHE_STATS.get_stats)
+
+
+class MemoryCache:
+    """
+    In-process LRU tier, bounded by entry count and by bytes.
+
+    Sizes are the entry's serialized length from its codec header, which is
+    at hand when an entry is written or read from disk. Entries are dropped
+    at the same time as their disk counterpart.
+    """
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_size = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, size, data = item
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.total_size -= size
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: Any, expires_at: float, size: int) -> None:
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (expires_at, size, data)
+            self.total_size += size
+            while len(self._entries) > self.max_entries or self.total_size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.total_size -= evicted_size
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _discard(self, key: str) -> None:
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self.total_size -= item[1]
+
+MEMORY_CACHE = MemoryCache(CACHE_CONFIG.memory_max_entries, CACHE_CONFIG.memory_max_mb * 1024 * 1024)
+
+def get_listing_key(subreddit: str, listing: str = "hot", query: str = "") -> str:
+    """
+    Generate a cache key for one subreddit listing.
+
+    Subreddit names are case-insensitive and queries are compared after
+    lowercasing and collapsing whitespace. The result is hashed, so any
+    query text is safe to use as a file name or database key.
+    """
+    normalized_query = " ".join(query.lower().split())
+    normalized = f"{listing}\n{subreddit.lower()}\n{normalized_query}"
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+def create_cache_backend(config: CacheConfig) -> CacheBackend:
+    """Create the storage backend selected by MCP_CACHE_BACKEND."""
+    config.cache_dir.mkdir(parents=True, exist_ok=True)
+    if config.backend == "sqlite":
+        return SQLiteCacheBackend(config.cache_dir / "cache.sqlite3")
+    if config.backend != "file":
+        logger.warning(f"Unknown MCP_CACHE_BACKEND '{config.backend}', using the file backend")
+    return FileCacheBackend(config.cache_dir, config.ttl + config.stale_grace)
+
+# Created on first use, so importing this module leaves the filesystem alone
+CACHE_BACKEND = LazyCacheBackend(lambda: create_cache_backend(CACHE_CONFIG))
+
+def cleanup_expired_cache() -> None:
+    """Remove expired cache entries."""
+    try:
+        expired = CACHE_BACKEND.expire()
+    except Exception as e:
+        logger.error(f"Error cleaning up expired cache entries: {e}")
+        CACHE_STATS.error()
+        return
+    for cache_key in expired:
+        MEMORY_CACHE.remove(cache_key)
+    if expired:
+        logger.info(f"Removed {len(expired)} expired cache entries")
+        CACHE_STATS.set_size(CACHE_BACKEND.size())
+
+def get_cache_size() -> int:
+    """Get total size of the cache in bytes, as tracked by the backend."""
+    return CACHE_BACKEND.size()
+
+def enforce_cache_size_limit() -> None:
+    """Remove least recently used cache entries if the size limit is exceeded."""
+    max_size_bytes = CACHE_CONFIG.max_size_mb * 1024 * 1024
+    for cache_key in CACHE_BACKEND.evict_to(max_size_bytes):
+        MEMORY_CACHE.remove(cache_key)
+        logger.info(f"Removed least recently used cache entry to enforce size limit: {cache_key}")
+
+class CacheSweeper:
+    """Daemon thread that periodically expires cache entries and runs backend housekeeping."""
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start the sweeper if it is not already running."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mcp-cache-sweeper", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                cleanup_expired_cache()
+                CACHE_BACKEND.maintain()
+            except Exception as e:
+                logger.error(f"Cache sweep failed: {e}")
+                CACHE_STATS.error()
+
+CACHE_SWEEPER = CacheSweeper(CACHE_CONFIG.sweep_interval)
+
+@dataclass
+class CachedEntry:
+    """A cache hit together with when it was fetched and whether it is past its TTL."""
+    data: Any
+    timestamp: float
+    stale: bool
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.timestamp
+
+def get_cached_entry(cache_key: str) -> Optional[CachedEntry]:
+    """
+    Look a key up in the memory tier, then the backend.
+
+    Entries younger than CACHE_CONFIG.ttl are fresh. Entries past the TTL
+    but still within CACHE_CONFIG.stale_grace are returned marked stale,
+    for the caller to serve while it refreshes them in the background.
+    """
+    CACHE_SWEEPER.start()
+    start = time.perf_counter()
+    cached_data = MEMORY_CACHE.get(cache_key)
+    tier = "memory"
+    if cached_data is None:
+        tier = "disk"
+        try:
+            blob = CACHE_BACKEND.get(cache_key)
+            if blob is None:
+                logger.info("Cache miss (not found)")
+                CACHE_STATS.miss()
+                CACHE_LOOKUP_SECONDS.observe(time.perf_counter() - start, result="miss")
+                return None
+            cached_data = CACHE_CODEC.decode(blob)
+        except CodecError as e:
+            # Old or foreign format: drop it so the next save rewrites it
+            logger.info(f"Cache miss (unreadable entry: {e})")
+            CACHE_BACKEND.delete(cache_key)
+            CACHE_STATS.miss()
+            CACHE_LOOKUP_SECONDS.observe(time.perf_counter() - start, result="miss")
+            return None
+        except Exception as e:
+            logger.error(f"Cache read error: {e}")
+            CACHE_STATS.error()
+            CACHE_LOOKUP_SECONDS.observe(time.perf_counter() - start, result="error")
+            return None
+
+    age = time.time() - cached_data['timestamp']
+    if age >= CACHE_CONFIG.ttl + CACHE_CONFIG.stale_grace:
+        logger.info("Cache miss (expired)")
+        CACHE_STATS.miss()
+        CACHE_LOOKUP_SECONDS.observe(time.perf_counter() - start, result="miss")
+        return None
+
+    if tier == "disk":
+        MEMORY_CACHE.put(cache_key, cached_data, cached_data['timestamp'] + CACHE_CONFIG.ttl + CACHE_CONFIG.stale_grace, payload_size(blob))
+    stale = age >= CACHE_CONFIG.ttl
+    if stale:
+        logger.info(f"Cache hit ({tier}, stale by {int(age - CACHE_CONFIG.ttl)}s)")
+        CACHE_STATS.stale_hit()
+    else:
+        logger.info(f"Cache hit ({tier})")
+    CACHE_STATS.hit(tier)
+    CACHE_LOOKUP_SECONDS.observe(time.perf_counter() - start, result=tier)
+    return CachedEntry(cached_data['data'], cached_data['timestamp'], stale)
+
+def get_from_cache(cache_key: str) -> Optional[Any]:
+    """Try to get fresh results from cache, memory tier first."""
+    entry = get_cached_entry(cache_key)
+    if entry is None or entry.stale:
+        return None
+    return entry.data
+
+class CacheRefresher:
+    """
+    Small background pool that re-fetches stale entries.
+
+    Each key is refreshed at most once at a time, however many requests
+    see it stale in the meantime. Refreshes are background Reddit traffic,
+    so they never spend the interactive reserve of the rate limiter.
+    """
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight: Set[str] = set()
+
+    def schedule(self, cache_key: str, refresh: Callable[[], Any]) -> bool:
+        """Run refresh in the background unless cache_key is already being refreshed."""
+        with self._lock:
+            if cache_key in self._in_flight:
+                return False
+            self._in_flight.add(cache_key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mcp-cache-refresh")
+        self._executor.submit(self._run, cache_key, refresh)
+        return True
+
+    def _run(self, cache_key: str, refresh: Callable[[], Any]) -> None:
+        try:
+            with request_priority(Priority.BACKGROUND):
+                refresh()
+            CACHE_STATS.refresh()
+        except Exception as e:
+            logger.error(f"Background cache refresh failed: {e}")
+            CACHE_STATS.error()
+        finally:
+            with self._lock:
+                self._in_flight.discard(cache_key)
+
+CACHE_REFRESHER = CacheRefresher(CACHE_CONFIG.refresh_workers)
+
+def get_listing_from_cache(
+    subreddit: str,
+    limit: int,
+    listing: str = "hot",
+    query: str = "",
+    refresh: Optional[Callable[[], Any]] = None,
+) -> Optional[CachedEntry]:
+    """
+    Get up to `limit` posts of a cached subreddit listing, as a PostBatch.
+
+    A cached listing fetched with a larger limit serves any smaller one by
+    slicing. A listing that came back shorter than its fetch limit holds
+    every post there is, so it serves any limit. If the listing is stale
+    and a refresh callable is given, it is scheduled in the background and
+    the stale posts are returned right away.
+    """
+    cache_key = get_listing_key(subreddit, listing, query)
+    entry = get_cached_entry(cache_key)
+    if entry is None:
+        return None
+    posts = get_listing_posts(entry.data)
+    if entry.data['limit'] < limit and len(posts) >= entry.data['limit']:
+        logger.info(f"Cached r/{subreddit} listing too short for limit {limit}")
+        return None
+    if entry.stale and refresh is not None:
+        CACHE_REFRESHER.schedule(cache_key, refresh)
+    return CachedEntry(posts[:limit], entry.timestamp, entry.stale)
+
+def get_listing_posts(data: Dict[str, Any]) -> PostBatch:
+    """
+    The posts of a cached listing entry as a PostBatch.
+
+    Entries are stored as columns (or, if written before PostBatch, as
+    RedditPost dicts). The batch replaces them in the entry, so later
+    memory-tier hits on the same entry skip the conversion.
+    """
+    posts = data['posts']
+    if not isinstance(posts, PostBatch):
+        posts = PostBatch.from_columns(posts) if isinstance(posts, dict) else PostBatch.from_posts(posts)
+        data['posts'] = posts
+    return posts
+
+def save_listing_to_cache(subreddit: str, posts: PostBatch, limit: int, listing: str = "hot", query: str = "") -> None:
+    """Save a subreddit listing fetched with the given limit."""
+    save_to_cache(get_listing_key(subreddit, listing, query), {'limit': limit, 'posts': posts.to_columns()})
+
+def save_to_cache(cache_key: str, data: Any) -> None:
+    """Save results to cache."""
+    CACHE_SWEEPER.start()
+    try:
+        cache_data = {
+            'timestamp': time.time(),
+            'data': data
+        }
+
+        blob = CACHE_CODEC.encode(cache_data)
+
+        # Keep entries through the stale grace window so they can still be served
+        expires_at = cache_data['timestamp'] + CACHE_CONFIG.ttl + CACHE_CONFIG.stale_grace
+        MEMORY_CACHE.put(cache_key, cache_data, expires_at, payload_size(blob))
+
+        CACHE_BACKEND.put(cache_key, blob, expires_at)
+        enforce_cache_size_limit()
+        CACHE_STATS.set_size(CACHE_BACKEND.size())
+
+        logger.info(f"Saved to cache: {cache_key}")
+    except Exception as e:
+        logger.error(f"Cache write error: {e}")
+        CACHE_STATS.error()
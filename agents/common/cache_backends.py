@@ -0,0 +1,573 @@
+"""
+Storage backends for the listing cache.
+
+A backend stores opaque blobs under string keys together with the time
+after which they may be discarded. Decoding, freshness checks and the
+in-memory tier live in front of it, in cache.py.
+"""
+
+import os
+import json
+import time
+import heapq
+import sqlite3
+import tempfile
+import threading
+import contextlib
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend(ABC):
+    """Interface every cache storage backend implements."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the stored blob, or None if missing or past its expiry."""
+
+    @abstractmethod
+    def put(self, key: str, blob: bytes, expires_at: float) -> int:
+        """Atomically insert or replace a blob; returns its stored size in bytes."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a key if present."""
+
+    @abstractmethod
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """Remove entries past their expiry and return their keys."""
+
+    @abstractmethod
+    def evict_to(self, max_bytes: int) -> List[str]:
+        """Remove least recently used entries until the total fits max_bytes."""
+
+    @abstractmethod
+    def size(self) -> int:
+        """Total stored bytes."""
+
+    def maintain(self) -> None:
+        """Periodic housekeeping run by the sweeper."""
+
+class LazyCacheBackend(CacheBackend):
+    """
+    Defers creating a backend (and its directory or database) until the
+    first call, so importing the cache module touches no files.
+    """
+    def __init__(self, factory: Callable[[], CacheBackend]):
+        self._factory = factory
+        self._backend: Optional[CacheBackend] = None
+        self._lock = threading.Lock()
+
+    def _get_backend(self) -> CacheBackend:
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._factory()
+        return self._backend
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._get_backend().get(key)
+
+    def put(self, key: str, blob: bytes, expires_at: float) -> int:
+        return self._get_backend().put(key, blob, expires_at)
+
+    def delete(self, key: str) -> None:
+        self._get_backend().delete(key)
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        return self._get_backend().expire(now)
+
+    def evict_to(self, max_bytes: int) -> List[str]:
+        return self._get_backend().evict_to(max_bytes)
+
+    def size(self) -> int:
+        return self._get_backend().size()
+
+    def maintain(self) -> None:
+        self._get_backend().maintain()
+
+@contextlib.contextmanager
+def interprocess_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on a lock file, shared with every process on this host."""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+@dataclass
+class ManifestEntry:
+    """What the manifest knows about one cache file."""
+    expires_at: float
+    size: int
+    last_access: float
+    mtime_ns: int = 0  # of the file when recorded; 0 if unknown
+
+class CacheManifest:
+    """
+    In-memory index of the cache directory with an on-disk journal.
+
+    Entries are kept in an OrderedDict in least-recently-used order, so
+    eviction pops from the front in O(1). Expiry times sit in a min-heap,
+    so a sweep pops only entries that have actually expired (O(log n)
+    each); heap items left behind by overwrites are skipped lazily. Each
+    put/delete appends one line to the journal, and the journal is
+    compacted into a snapshot once it grows well past the live entry count.
+
+    Several processes (app workers, the prewarmer) may share a cache
+    directory and its journal. Every append and compaction happens under
+    an inter-process lock, after first applying the records other
+    processes appended since this one last read the journal, so each
+    manifest follows the others' puts and deletes and a compaction never
+    drops their entries.
+    """
+    JOURNAL_NAME = "manifest.journal"
+    LOCK_NAME = "manifest.lock"
+
+    def __init__(self, cache_dir: Path, ttl: int):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.journal_path = cache_dir / self.JOURNAL_NAME
+        self.lock_path = cache_dir / self.LOCK_NAME
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, ManifestEntry]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._journal_lines = 0
+        # Journal file (inode) and byte offset this manifest has applied up to
+        self._journal_ino: Optional[int] = None
+        self._journal_pos = 0
+        self.total_size = 0
+        self._load()
+
+    def get(self, key: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def touch(self, key: str) -> None:
+        """Mark a key as recently used (persisted at the next compaction)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_access = time.time()
+                self._entries.move_to_end(key)
+
+    def put(self, key: str, expires_at: float, size: int, mtime_ns: int = 0) -> None:
+        self._commit({"op": "put", "key": key, "expires_at": expires_at, "size": size, "mtime_ns": mtime_ns})
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._commit({"op": "del", "key": key})
+
+    def pop_expired(self, now: Optional[float] = None) -> List[Tuple[str, ManifestEntry]]:
+        """Remove and return every key (with its entry) whose expiry time has passed."""
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            # Pick up expiry times other processes renewed first
+            self.sync()
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                expires_at, key = heapq.heappop(self._expiry_heap)
+                entry = self._entries.get(key)
+                # Skip heap items superseded by a later put
+                if entry is not None and entry.expires_at == expires_at:
+                    self._commit({"op": "del", "key": key})
+                    expired.append((key, entry))
+        return expired
+
+    def pop_lru_until(self, max_size: int) -> List[Tuple[str, ManifestEntry]]:
+        """Remove least-recently-used keys (with their entries) until the total size fits max_size."""
+        evicted = []
+        with self._lock:
+            self.sync()
+            while self.total_size > max_size and self._entries:
+                key, entry = next(iter(self._entries.items()))
+                self._commit({"op": "del", "key": key})
+                evicted.append((key, entry))
+        return evicted
+
+    def sync(self) -> None:
+        """Apply journal records appended by other processes since the last read."""
+        with self._lock, interprocess_lock(self.lock_path):
+            self._read_journal()
+
+    def compact(self) -> None:
+        """Rewrite the journal as a snapshot of the live entries, this and other processes'."""
+        with self._lock, interprocess_lock(self.lock_path):
+            self._read_journal()
+            tmp_path = self.journal_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, entry in self._entries.items():
+                    f.write(json.dumps({
+                        "op": "put",
+                        "key": key,
+                        "expires_at": entry.expires_at,
+                        "size": entry.size,
+                        "last_access": entry.last_access,
+                        "mtime_ns": entry.mtime_ns,
+                    }) + "\n")
+            os.replace(tmp_path, self.journal_path)
+            stat = self.journal_path.stat()
+            self._journal_ino = stat.st_ino
+            self._journal_pos = stat.st_size
+            self._journal_lines = len(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _set(self, key: str, entry: ManifestEntry) -> None:
+        self._discard(key)
+        self._entries[key] = entry
+        self.total_size += entry.size
+        heapq.heappush(self._expiry_heap, (entry.expires_at, key))
+
+    def _discard(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.total_size -= entry.size
+        return True
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        if record.get("op") == "put":
+            self._set(record["key"], ManifestEntry(
+                record["expires_at"],
+                record["size"],
+                record.get("last_access", time.time()),
+                record.get("mtime_ns", 0),
+            ))
+        elif record.get("op") == "del":
+            self._discard(record["key"])
+
+    def _commit(self, record: Dict[str, Any]) -> None:
+        """Catch up with the journal, then apply a record and append it."""
+        with self._lock:
+            try:
+                with interprocess_lock(self.lock_path):
+                    self._read_journal()
+                    self._apply(record)
+                    with open(self.journal_path, "ab") as f:
+                        f.write((json.dumps(record) + "\n").encode("utf-8"))
+                        self._journal_pos = f.tell()
+                        self._journal_ino = os.fstat(f.fileno()).st_ino
+                    self._journal_lines += 1
+            except OSError as e:
+                logger.error(f"Cache journal write error: {e}")
+                self._apply(record)
+                return
+            if self._journal_lines > 4 * len(self._entries) + 100:
+                self.compact()
+
+    def _read_journal(self) -> None:
+        """Apply journal lines past the last read offset; the caller holds the inter-process lock."""
+        try:
+            with open(self.journal_path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                replaced = stat.st_ino != self._journal_ino or stat.st_size < self._journal_pos
+                if replaced:
+                    # A new journal (another process compacted it): rebuild from its snapshot
+                    f.seek(0)
+                else:
+                    f.seek(self._journal_pos)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        previous = self._entries
+        if replaced:
+            self._entries = OrderedDict()
+            self._expiry_heap = []
+            self.total_size = 0
+            self._journal_lines = 0
+            self._journal_ino = stat.st_ino
+            self._journal_pos = 0
+        # Leave a partial last line (an append in progress, or torn by a crash) for the next read
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn line from a crash mid-append; ignore it
+                continue
+            self._journal_lines += 1
+            self._apply(record)
+        self._journal_pos += end
+        if replaced:
+            # Keep access times only this process saw, and LRU order consistent with them
+            for key, entry in self._entries.items():
+                old = previous.get(key)
+                if old is not None and old.last_access > entry.last_access:
+                    entry.last_access = old.last_access
+            self._entries = OrderedDict(sorted(self._entries.items(), key=lambda item: item[1].last_access))
+
+    def _load(self) -> None:
+        if self.journal_path.exists():
+            self.sync()
+        else:
+            self._rebuild_from_directory()
+
+    def _rebuild_from_directory(self) -> None:
+        """Index cache files written before the manifest existed, using stat only."""
+        files = []
+        for cache_file in self.cache_dir.glob("*.cache"):
+            try:
+                files.append((cache_file.stem, cache_file.stat()))
+            except OSError:
+                continue
+        for key, stat in sorted(files, key=lambda item: item[1].st_mtime):
+            self._set(key, ManifestEntry(stat.st_mtime + self.ttl, stat.st_size, stat.st_mtime, stat.st_mtime_ns))
+        self.compact()
+        if files:
+            logger.info(f"Indexed {len(files)} existing cache files into the manifest")
+
+
+class FileCacheBackend(CacheBackend):
+    """
+    One file per key under cache_dir, indexed by a CacheManifest.
+
+    Writes go to a temporary file in the same directory and are moved into
+    place with os.replace, so a reader in another process never sees a
+    half-written entry. Since another process may have rewritten a file
+    since the manifest recorded it, a file is only treated as expired or
+    evicted after checking that its mtime is still the recorded one.
+    """
+    def __init__(self, cache_dir: Path, ttl: int):
+        self.cache_dir = cache_dir
+        self.manifest = CacheManifest(cache_dir, ttl)
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.cache"
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.manifest.get(key)
+        if entry is not None and entry.expires_at <= time.time() and not self._adopt_if_rewritten(key, entry):
+            # Expired per the manifest, and still the file it recorded; no need to open it
+            return None
+        path = self.path_for(key)
+        try:
+            blob = path.read_bytes()
+        except FileNotFoundError:
+            # Removed by another process since the manifest recorded it
+            self.manifest.remove(key)
+            return None
+        if entry is None:
+            # Written by another process; adopt it into our manifest
+            stat = path.stat()
+            self.manifest.put(key, stat.st_mtime + self.manifest.ttl, stat.st_size, stat.st_mtime_ns)
+        else:
+            self.manifest.touch(key)
+        return blob
+
+    def put(self, key: str, blob: bytes, expires_at: float) -> int:
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+                f.flush()
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            os.replace(tmp_name, self.path_for(key))
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+        self.manifest.put(key, expires_at, len(blob), mtime_ns)
+        return len(blob)
+
+    def delete(self, key: str) -> None:
+        self.manifest.remove(key)
+        self._unlink(key)
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        return self._remove_files(self.manifest.pop_expired(now))
+
+    def evict_to(self, max_bytes: int) -> List[str]:
+        return self._remove_files(self.manifest.pop_lru_until(max_bytes))
+
+    def size(self) -> int:
+        return self.manifest.total_size
+
+    def maintain(self) -> None:
+        self.manifest.compact()
+
+    def _adopt_if_rewritten(self, key: str, entry: ManifestEntry) -> bool:
+        """
+        If another process replaced the file since the manifest recorded
+        it, re-index the new file (expiring ttl after it was written) and
+        return True.
+        """
+        if not entry.mtime_ns:
+            return False
+        try:
+            stat = self.path_for(key).stat()
+        except FileNotFoundError:
+            return False
+        if stat.st_mtime_ns == entry.mtime_ns:
+            return False
+        self.manifest.put(key, stat.st_mtime + self.manifest.ttl, stat.st_size, stat.st_mtime_ns)
+        return True
+
+    def _remove_files(self, removed: List[Tuple[str, ManifestEntry]]) -> List[str]:
+        """Unlink the files of entries dropped from the manifest, sparing ones rewritten since."""
+        keys = []
+        for key, entry in removed:
+            if self._adopt_if_rewritten(key, entry):
+                continue
+            self._unlink(key)
+            keys.append(key)
+        return keys
+
+    def _unlink(self, key: str) -> None:
+        try:
+            self.path_for(key).unlink()
+        except FileNotFoundError:
+            pass
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Single SQLite database in WAL mode.
+
+    Upserts are atomic, expiry and LRU eviction use indexes, and the total
+    size is kept in a one-row table maintained by triggers, so no query
+    ever scans the whole cache. WAL lets any number of readers in any
+    number of processes proceed while one writer commits. Each thread gets
+    its own connection.
+    """
+    # Only persist a new last_access when the old one is at least this stale,
+    # so hot reads do not turn into a write each time
+    ACCESS_RESOLUTION = 60
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        last_access REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_cache_entries_expires_at ON cache_entries(expires_at);
+    CREATE INDEX IF NOT EXISTS idx_cache_entries_last_access ON cache_entries(last_access);
+    CREATE TABLE IF NOT EXISTS cache_size (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        total INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO cache_size (id, total)
+        SELECT 0, COALESCE(SUM(size), 0) FROM cache_entries;
+    CREATE TRIGGER IF NOT EXISTS cache_entries_insert AFTER INSERT ON cache_entries BEGIN
+        UPDATE cache_size SET total = total + NEW.size WHERE id = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_entries_update AFTER UPDATE OF size ON cache_entries BEGIN
+        UPDATE cache_size SET total = total - OLD.size + NEW.size WHERE id = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_entries_delete AFTER DELETE ON cache_entries BEGIN
+        UPDATE cache_size SET total = total - OLD.size WHERE id = 0;
+    END;
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, last_access FROM cache_entries WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+        if row is None:
+            return None
+        value, last_access = row
+        if now - last_access >= self.ACCESS_RESOLUTION:
+            conn.execute("UPDATE cache_entries SET last_access = ? WHERE key = ?", (now, key))
+        return value
+
+    def put(self, key: str, blob: bytes, expires_at: float) -> int:
+        self._connect().execute(
+            """
+            INSERT INTO cache_entries (key, value, size, expires_at, last_access)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value,
+                size = excluded.size,
+                expires_at = excluded.expires_at,
+                last_access = excluded.last_access
+            """,
+            (key, blob, len(blob), expires_at, time.time()),
+        )
+        return len(blob)
+
+    def delete(self, key: str) -> None:
+        self._connect().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+
+        def select(conn: sqlite3.Connection) -> List[str]:
+            return [row[0] for row in conn.execute("SELECT key FROM cache_entries WHERE expires_at <= ?", (now,))]
+
+        return self._delete_selected(select)
+
+    def evict_to(self, max_bytes: int) -> List[str]:
+        def select(conn: sqlite3.Connection) -> List[str]:
+            excess = conn.execute("SELECT total FROM cache_size WHERE id = 0").fetchone()[0] - max_bytes
+            keys = []
+            # Walk the last_access index only as far as needed
+            for key, size in conn.execute("SELECT key, size FROM cache_entries ORDER BY last_access"):
+                if excess <= 0:
+                    break
+                keys.append(key)
+                excess -= size
+            return keys
+
+        if self.size() <= max_bytes:
+            return []
+        return self._delete_selected(select)
+
+    def size(self) -> int:
+        row = self._connect().execute("SELECT total FROM cache_size WHERE id = 0").fetchone()
+        return row[0] if row else 0
+
+    def maintain(self) -> None:
+        self._connect().execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def _delete_selected(self, select: Callable[[sqlite3.Connection], List[str]]) -> List[str]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            keys = select(conn)
+            conn.executemany("DELETE FROM cache_entries WHERE key = ?", [(key,) for key in keys])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return keys
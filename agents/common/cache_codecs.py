@@ -0,0 +1,275 @@
+"""
+Serialization formats for cache entries.
+
+Every blob starts with an 8-byte header: the magic b"RC", the format
+version, one byte naming the serializer (high nibble) and compressor (low
+nibble) it was written with, and the uncompressed payload length. The
+header lets a reader decode any entry written by a codec it has the
+libraries for, whatever codec it writes itself, and reject everything
+else (entries from a newer format version, or the unversioned
+gzip+pickle entries of earlier releases) as a miss instead of loading it.
+
+Entries are plain data, so no serializer can execute code on load, which
+matters when several processes share a cache directory. The default is
+msgpack with zstd when both are installed, falling back to compact JSON
+and lz4 or zlib from the standard library. zstd can use a dictionary
+trained on typical entries (see benchmarks/codecs.py), which helps most
+with small listings whose field names and URL prefixes dominate.
+"""
+
+import json
+import zlib
+import struct
+import threading
+import importlib.util
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct(">2sBBI")  # magic, version, serializer << 4 | compressor, payload length
+
+class CodecError(ValueError):
+    """A blob that this process cannot (or must not) decode."""
+
+class Serializer(ABC):
+    """Turns cache entries (plain dicts, lists and scalars) into bytes and back."""
+    name = ""
+    serializer_id = 0
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        """Serialize an entry."""
+
+    @abstractmethod
+    def loads(self, payload: bytes) -> Any:
+        """Deserialize an entry."""
+
+class JsonSerializer(Serializer):
+    """Compact UTF-8 JSON; tuples come back as lists."""
+    name = "json"
+    serializer_id = 1
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, payload: bytes) -> Any:
+        return json.loads(payload)
+
+class MsgpackSerializer(Serializer):
+    name = "msgpack"
+    serializer_id = 2
+
+    def __init__(self):
+        import msgpack
+        self._packb = msgpack.packb
+        self._unpackb = msgpack.unpackb
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._packb(obj, use_bin_type=True)
+
+    def loads(self, payload: bytes) -> Any:
+        return self._unpackb(payload, raw=False)
+
+class Compressor(ABC):
+    """Compresses serialized entries."""
+    name = ""
+    compressor_id = 0
+
+    @abstractmethod
+    def compress(self, payload: bytes) -> bytes:
+        """Compress a serialized entry."""
+
+    @abstractmethod
+    def decompress(self, data: bytes, size: int) -> bytes:
+        """Decompress data whose uncompressed length is `size`."""
+
+class NoCompressor(Compressor):
+    name = "none"
+    compressor_id = 0
+
+    def compress(self, payload: bytes) -> bytes:
+        return payload
+
+    def decompress(self, data: bytes, size: int) -> bytes:
+        return data
+
+class ZlibCompressor(Compressor):
+    name = "zlib"
+    compressor_id = 1
+
+    def __init__(self, level: int = 1):
+        self.level = level
+
+    def compress(self, payload: bytes) -> bytes:
+        return zlib.compress(payload, self.level)
+
+    def decompress(self, data: bytes, size: int) -> bytes:
+        return zlib.decompress(data, bufsize=max(size, 1))
+
+class ZstdCompressor(Compressor):
+    """zstd, optionally with a trained dictionary (frames record which one they need)."""
+    name = "zstd"
+    compressor_id = 2
+
+    def __init__(self, level: int = 3, dictionary: Optional[bytes] = None):
+        import zstandard
+        self._zstd = zstandard
+        self.level = level
+        self._dictionary = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        # Compressor and decompressor objects must not be shared between threads
+        self._local = threading.local()
+
+    def _get_compressor(self) -> Any:
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._zstd.ZstdCompressor(level=self.level, dict_data=self._dictionary)
+            self._local.compressor = compressor
+        return compressor
+
+    def _get_decompressor(self) -> Any:
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._zstd.ZstdDecompressor(dict_data=self._dictionary)
+            self._local.decompressor = decompressor
+        return decompressor
+
+    def compress(self, payload: bytes) -> bytes:
+        return self._get_compressor().compress(payload)
+
+    def decompress(self, data: bytes, size: int) -> bytes:
+        return self._get_decompressor().decompress(data, max_output_size=size)
+
+class Lz4Compressor(Compressor):
+    name = "lz4"
+    compressor_id = 3
+
+    def __init__(self):
+        import lz4.frame
+        self._frame = lz4.frame
+
+    def compress(self, payload: bytes) -> bytes:
+        return self._frame.compress(payload)
+
+    def decompress(self, data: bytes, size: int) -> bytes:
+        return self._frame.decompress(data)
+
+SERIALIZERS: Dict[str, type] = {cls.name: cls for cls in (JsonSerializer, MsgpackSerializer)}
+COMPRESSORS: Dict[str, type] = {cls.name: cls for cls in (NoCompressor, ZlibCompressor, ZstdCompressor, Lz4Compressor)}
+
+# Third-party module each optional format needs
+REQUIRES = {"msgpack": "msgpack", "zstd": "zstandard", "lz4": "lz4"}
+
+def is_available(name: str) -> bool:
+    """Whether a serializer or compressor can be used here (checked without importing it)."""
+    module = REQUIRES.get(name)
+    return module is None or importlib.util.find_spec(module) is not None
+
+def resolve_codec_name(name: str, compression: bool = True) -> str:
+    """
+    Turn "auto" (or a partly unavailable choice) into a concrete
+    "<serializer>-<compressor>" name usable in this environment.
+    """
+    serializer, _, compressor = name.lower().partition("-")
+    if serializer == "auto":
+        serializer = "msgpack" if is_available("msgpack") else "json"
+    if not compression:
+        compressor = "none"
+    elif compressor in ("", "auto"):
+        compressor = next(c for c in ("zstd", "lz4", "zlib") if is_available(c))
+    if serializer not in SERIALIZERS or compressor not in COMPRESSORS:
+        raise ValueError(f"Unknown cache codec '{name}'")
+    if not is_available(serializer):
+        logger.warning(f"{REQUIRES[serializer]} is not installed; the cache codec uses json instead of {serializer}")
+        serializer = "json"
+    if not is_available(compressor):
+        logger.warning(f"{REQUIRES[compressor]} is not installed; the cache codec uses zlib instead of {compressor}")
+        compressor = "zlib"
+    return f"{serializer}-{compressor}"
+
+class Codec:
+    """
+    Encodes cache entries with one serializer and compressor, and decodes
+    entries written with any that are available. Libraries and the zstd
+    dictionary are loaded on first use.
+    """
+    def __init__(self, name: str = "auto", compression: bool = True, dictionary_path: Optional[Path] = None):
+        self.name = resolve_codec_name(name, compression)
+        self.dictionary_path = dictionary_path
+        self._serializer_name, self._compressor_name = self.name.split("-")
+        self._lock = threading.Lock()
+        self._serializers: Dict[int, Serializer] = {}
+        self._compressors: Dict[int, Compressor] = {}
+
+    def _load(self, registry: Dict[int, Any], key: int, factory: Callable[[], Any]) -> Any:
+        part = registry.get(key)
+        if part is None:
+            with self._lock:
+                part = registry.get(key)
+                if part is None:
+                    part = factory()
+                    registry[key] = part
+        return part
+
+    def _make_compressor(self, cls: type) -> Compressor:
+        if cls is ZstdCompressor and self.dictionary_path is not None:
+            return ZstdCompressor(dictionary=self.dictionary_path.read_bytes())
+        return cls()
+
+    def _serializer(self, name: str) -> Serializer:
+        cls = SERIALIZERS[name]
+        return self._load(self._serializers, cls.serializer_id, cls)
+
+    def _compressor(self, name: str) -> Compressor:
+        cls = COMPRESSORS[name]
+        return self._load(self._compressors, cls.compressor_id, lambda: self._make_compressor(cls))
+
+    def encode(self, obj: Any) -> bytes:
+        serializer = self._serializer(self._serializer_name)
+        compressor = self._compressor(self._compressor_name)
+        payload = serializer.dumps(obj)
+        codec_id = serializer.serializer_id << 4 | compressor.compressor_id
+        return HEADER.pack(MAGIC, FORMAT_VERSION, codec_id, len(payload)) + compressor.compress(payload)
+
+    def decode(self, blob: bytes) -> Any:
+        """Decode a blob written by any codec; raises CodecError for anything else."""
+        _, _, codec_id, size = parse_header(blob)
+        serializer_name = _name_for(SERIALIZERS, "serializer_id", codec_id >> 4)
+        compressor_name = _name_for(COMPRESSORS, "compressor_id", codec_id & 0x0F)
+        if not is_available(serializer_name) or not is_available(compressor_name):
+            raise CodecError(f"Entry written with {serializer_name}-{compressor_name}, which is not installed")
+        try:
+            payload = self._compressor(compressor_name).decompress(blob[HEADER.size:], size)
+        except Exception as e:
+            raise CodecError(f"Corrupt {compressor_name} data: {e}") from e
+        if len(payload) != size:
+            raise CodecError(f"Truncated entry: {len(payload)} of {size} bytes")
+        return self._serializer(serializer_name).loads(payload)
+
+def _name_for(registry: Dict[str, type], attribute: str, value: int) -> str:
+    for name, cls in registry.items():
+        if getattr(cls, attribute) == value:
+            return name
+    raise CodecError(f"Unknown {attribute.split('_')[0]} id {value}")
+
+def parse_header(blob: bytes) -> Tuple[bytes, int, int, int]:
+    """Return (magic, version, codec_id, payload length) of a blob."""
+    if len(blob) < HEADER.size or blob[:2] != MAGIC:
+        raise CodecError("Unversioned entry (written by an older release)")
+    header = HEADER.unpack_from(blob)
+    if header[1] != FORMAT_VERSION:
+        raise CodecError(f"Entry format version {header[1]} is not supported (expected {FORMAT_VERSION})")
+    return header
+
+def payload_size(blob: bytes) -> int:
+    """Uncompressed size of an entry, read from its header."""
+    return parse_header(blob)[3]
+
+def train_dictionary(samples: List[bytes], size: int = 16 * 1024) -> bytes:
+    """Train a zstd dictionary from serialized (uncompressed) sample entries."""
+    import zstandard
+    return zstandard.train_dictionary(size, samples).as_bytes()
@@ -0,0 +1,53 @@
+"""
+A process-wide background event loop for running async pipelines from sync code.
+
+Streamlit runs each session's script in its own thread. Rather than
+spin up an event loop per call (which async clients such as Gemini's
+cannot share), every synchronous caller submits its coroutine to one
+long-lived loop, so all sessions share a single loop.
+"""
+
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+class EventLoopThread:
+    """An asyncio loop running forever in a daemon thread, started on first use."""
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """
+        Run a coroutine on the loop and block until it finishes.
+
+        If the wait times out or the calling thread is interrupted, the
+        coroutine is cancelled rather than left running.
+        """
+        loop = self.get_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            raise RuntimeError("EventLoopThread.run() called from its own loop; await the coroutine instead")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+BACKGROUND_LOOP = EventLoopThread("async-pipeline")
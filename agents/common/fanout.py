@@ -0,0 +1,219 @@
+"""
+Concurrent subreddit fan-out with a total deadline and per-subreddit timeouts.
+"""
+
+import os
+import time
+import asyncio
+import functools
+import threading
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+@dataclass
+class FanoutConfig:
+    """Configuration for concurrent subreddit fetching."""
+    concurrent: bool
+    max_workers: int
+    deadline: float
+    per_subreddit_timeout: float
+    async_workers: int
+
+def get_fanout_config() -> FanoutConfig:
+    """Get fan-out configuration from environment variables with defaults."""
+    concurrent = os.getenv("REDDIT_CONCURRENT_FETCH", "true").lower() == "true"
+    # Threads shared by every synchronous fan-out in the process
+    max_workers = int(os.getenv("REDDIT_FANOUT_WORKERS", "8"))
+    deadline = float(os.getenv("REDDIT_FANOUT_DEADLINE", "8"))  # seconds for the whole fan-out
+    per_subreddit_timeout = float(os.getenv("REDDIT_SUBREDDIT_TIMEOUT", "5"))  # seconds per subreddit
+    # Threads shared by every async fan-out in the process (praw itself is blocking)
+    async_workers = int(os.getenv("REDDIT_ASYNC_FETCH_WORKERS", "32"))
+
+    return FanoutConfig(concurrent, max_workers, deadline, per_subreddit_timeout, async_workers)
+
+FANOUT_CONFIG = get_fanout_config()
+
+def fetch_subreddits(
+    fetch_one: Callable[[str], Optional[T]],
+    sub_names: Iterable[str],
+    config: Optional[FanoutConfig] = None,
+) -> Dict[str, T]:
+    """
+    Run fetch_one for every subreddit and collect the non-empty results.
+
+    The calls run on one bounded thread pool shared by the whole process.
+    In concurrent mode, once the total deadline passes, or a single
+    subreddit has been running longer than its timeout, we stop waiting and
+    return whatever has arrived. Otherwise subreddits are fetched one at a
+    time, each still bounded by the per-subreddit timeout (which then
+    includes time queued for a thread). Slow calls are abandoned rather than
+    joined, so they never hold up the response, and queued calls that have
+    not started are cancelled. Each call runs in a copy of the caller's
+    context, so context variables such as the Reddit request priority carry
+    over to the workers.
+
+    Args:
+        fetch_one: Fetches one subreddit; returns None (or raises) to skip it
+        sub_names: Subreddits to fetch, in the order results should appear
+        config: Fan-out settings (default: FANOUT_CONFIG)
+
+    Returns:
+        Dict[str, T]: Results keyed by subreddit name, in sub_names order
+    """
+    config = config or FANOUT_CONFIG
+    sub_names = list(sub_names)
+    executor = _get_executor(config)
+
+    if not config.concurrent or len(sub_names) <= 1:
+        results = {}
+        for sub_name in sub_names:
+            future = executor.submit(contextvars.copy_context().run, _run_one, fetch_one, sub_name)
+            try:
+                result = future.result(timeout=config.per_subreddit_timeout)
+            except FuturesTimeoutError:
+                future.cancel()
+                logger.warning(f"Timed out fetching r/{sub_name} after {config.per_subreddit_timeout}s")
+                continue
+            if result:
+                results[sub_name] = result
+        return results
+
+    deadline = time.monotonic() + config.deadline
+    started: Dict[str, float] = {}
+
+    def timed(sub_name: str):
+        started[sub_name] = time.monotonic()
+        return _run_one(fetch_one, sub_name)
+
+    futures = {
+        executor.submit(contextvars.copy_context().run, timed, sub_name): sub_name
+        for sub_name in sub_names
+    }
+    collected: Dict[str, T] = {}
+    pending = set(futures)
+
+    try:
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+
+            # Drop subreddits that have used up their own timeout
+            for future in list(pending):
+                start = started.get(futures[future])
+                if start is not None and now - start >= config.per_subreddit_timeout:
+                    pending.discard(future)
+                    logger.warning(f"Timed out fetching r/{futures[future]} after {config.per_subreddit_timeout}s")
+            if not pending:
+                break
+
+            # Wake up at the deadline or the earliest per-subreddit expiry, whichever is first
+            wake_at = deadline
+            for future in pending:
+                start = started.get(futures[future])
+                if start is not None:
+                    wake_at = min(wake_at, start + config.per_subreddit_timeout)
+            done, pending = wait(pending, timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                result = future.result()
+                if result:
+                    collected[futures[future]] = result
+    finally:
+        if pending:
+            missing = ", ".join(f"r/{futures[f]}" for f in pending)
+            logger.warning(f"Fan-out deadline reached, returning partial results without {missing}")
+        # Never block on stragglers; queued work that has not started is cancelled
+        for future in pending:
+            future.cancel()
+
+    return {sub_name: collected[sub_name] for sub_name in sub_names if sub_name in collected}
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+def _get_executor(config: FanoutConfig) -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(max_workers=config.max_workers, thread_name_prefix="reddit-fanout")
+    return _EXECUTOR
+
+_ASYNC_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_ASYNC_EXECUTOR_LOCK = threading.Lock()
+
+def _get_async_executor(config: FanoutConfig) -> ThreadPoolExecutor:
+    global _ASYNC_EXECUTOR
+    if _ASYNC_EXECUTOR is None:
+        with _ASYNC_EXECUTOR_LOCK:
+            if _ASYNC_EXECUTOR is None:
+                _ASYNC_EXECUTOR = ThreadPoolExecutor(max_workers=config.async_workers, thread_name_prefix="reddit-async")
+    return _ASYNC_EXECUTOR
+
+async def fetch_subreddits_async(
+    fetch_one: Callable[[str], Optional[T]],
+    sub_names: Iterable[str],
+    config: Optional[FanoutConfig] = None,
+) -> Dict[str, T]:
+    """
+    Async counterpart of fetch_subreddits for use on an event loop.
+
+    The blocking fetches run on one process-wide thread pool shared by all
+    sessions, so a turn holds a thread only while a subreddit is actually
+    being fetched. The same total deadline and per-subreddit timeout apply
+    (the timeout here includes time queued for a thread). If the awaiting
+    task is cancelled, fetches that have not started are cancelled too.
+    As in fetch_subreddits, fetches run in a copy of the caller's context.
+    """
+    config = config or FANOUT_CONFIG
+    sub_names = list(sub_names)
+    loop = asyncio.get_running_loop()
+    executor = _get_async_executor(config)
+
+    async def fetch(sub_name: str) -> Optional[T]:
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(
+                    executor, functools.partial(contextvars.copy_context().run, _run_one, fetch_one, sub_name)
+                ),
+                config.per_subreddit_timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out fetching r/{sub_name} after {config.per_subreddit_timeout}s")
+            return None
+
+    if not config.concurrent or len(sub_names) <= 1:
+        results = {}
+        for sub_name in sub_names:
+            result = await fetch(sub_name)
+            if result:
+                results[sub_name] = result
+        return results
+
+    tasks = {asyncio.ensure_future(fetch(sub_name)): sub_name for sub_name in sub_names}
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=config.deadline)
+    finally:
+        for task in tasks:
+            task.cancel()
+    if pending:
+        missing = ", ".join(f"r/{tasks[task]}" for task in pending)
+        logger.warning(f"Fan-out deadline reached, returning partial results without {missing}")
+
+    collected = {tasks[task]: task.result() for task in done if task.result()}
+    return {sub_name: collected[sub_name] for sub_name in sub_names if sub_name in collected}
+
+def _run_one(fetch_one: Callable[[str], Optional[T]], sub_name: str) -> Optional[T]:
+    try:
+        return fetch_one(sub_name)
+    except Exception as e:
+        logger.warning(f"Error fetching from r/{sub_name}: {e}")
+        return None
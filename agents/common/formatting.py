@@ -0,0 +1,136 @@
+"""
+Markdown formatting of Reddit links in chat messages.
+
+`format_reddit_links` formats a complete message, and `format_message`
+caches the result in a chat message so Streamlit reruns format only new
+messages. `StreamingLinkFormatter` formats a message while it is still
+arriving in chunks: text that might be the start of a link (a partial URL
+or r/ mention, an unclosed `[` or `(`) is held back unformatted until the
+rest of it arrives.
+"""
+
+import re
+import json
+import time
+
+from agents.common.metrics import STAGE_SECONDS
+
+# Nested markdown links, "[[title](url)](url)", are collapsed to "[title]"
+NESTED_LINK_RE = re.compile(r'\[(?:\[([^\]]+)\]\([^)]+\))\](?:\([^)]+\))')
+
+# Reddit post URLs and r/subreddit mentions that are not already part of a
+# markdown link, matched together so the text is scanned once
+REDDIT_LINK_RE = re.compile(
+    r'(?<!\]\()https?://(?:www\.)?reddit\.com/r/(\w+)/comments/([^/]+)/([^/\s]+)/?(?!\))'
+    r'|(?<!\]\()(?<!/)(?<!\w)r/(\w+)(?!\w)(?!\))'
+)
+
+# A link wrapped in another link, "[[text](url)](url)", is reduced to the inner one
+DOUBLE_WRAPPED_RE = re.compile(r'\[(\[.*?\]\(.*?\))\]\(.*?\)')
+
+def format_structured_link(summary, search_query, link_text="Search Reddit"):
+    # Create a clean URL-friendly version of the search query
+    url_query = search_query.replace(' ', '%20')
+    return f"""
+**{summary}**
+- Search: `{search_query}`
+- {link_text}: [Reddit Search](https://www.reddit.com/search/?q={url_query})
+"""
+
+def _reddit_link(match):
+    subreddit, post_id, slug, mention = match.groups()
+    if mention is not None:
+        return f'[r/{mention}](https://reddit.com/r/{mention})'
+    title = slug.replace('_', ' ').rstrip('/')
+    return f'[{title}](https://reddit.com/r/{subreddit}/comments/{post_id}/{slug})'
+
+def format_link_text(text):
+    """Convert Reddit URLs and r/ mentions in free text to markdown links"""
+    # Both cleanup patterns need a "[[", which most messages never contain
+    if '[[' in text:
+        text = NESTED_LINK_RE.sub(r'[\1]', text)
+    text = REDDIT_LINK_RE.sub(_reddit_link, text)
+    if '[[' in text:
+        text = DOUBLE_WRAPPED_RE.sub(r'\1', text)
+    return text
+
+def format_reddit_links(text):
+    """Convert Reddit URLs and structured link data to formatted markdown"""
+    with STAGE_SECONDS.time(stage="link_format"):
+        # Structured link data is a JSON object; don't try to parse anything else
+        if text.lstrip().startswith('{'):
+            try:
+                data = json.loads(text)
+                if isinstance(data, dict) and "summary" in data and "search_query" in data:
+                    return format_structured_link(
+                        data["summary"],
+                        data["search_query"],
+                        data.get("link_text", "Search Reddit")
+                    )
+            except (json.JSONDecodeError, TypeError):
+                pass
+
+        # If not structured data, handle regular Reddit URLs
+        return format_link_text(text)
+
+def format_message(message):
+    """
+    Formatted content of a chat message dict, computed once and kept in the message.
+
+    Streamlit reruns the whole script on every interaction; with this, a
+    rerun formats only messages added since the last one.
+    """
+    formatted = message.get("formatted")
+    if formatted is None:
+        formatted = message["formatted"] = format_reddit_links(message["content"])
+    return formatted
+
+def safe_split(text):
+    """
+    Split streamed text into a prefix that can be formatted now and a tail to hold back.
+
+    The prefix ends at whitespace, so no URL or r/ mention is cut in half,
+    and before the earliest `[` or `(` on its last line that is not closed
+    yet, so a markdown link is never formatted half-written.
+    """
+    cut = max(text.rfind(' '), text.rfind('\n'), text.rfind('\t')) + 1
+    line_start = text.rfind('\n', 0, cut) + 1
+    open_brackets = []
+    closed_bracket = None
+    for i in range(line_start, cut):
+        char = text[i]
+        if char == '[':
+            open_brackets.append(i)
+        elif char == '(':
+            # The URL part of "[title](url)" belongs with its title
+            open_brackets.append(closed_bracket if closed_bracket is not None and text[i - 1] == ']' else i)
+        elif char in '])' and open_brackets:
+            start = open_brackets.pop()
+            closed_bracket = start if char == ']' else None
+    if open_brackets:
+        cut = open_brackets[0]
+    return text[:cut], text[cut:]
+
+class StreamingLinkFormatter:
+    """Format a message incrementally as chunks arrive, without reformatting finished text."""
+    def __init__(self):
+        self.text = ""
+        self._formatted = ""
+        self._pending = ""
+        self._elapsed = 0.0
+
+    def feed(self, chunk):
+        """Add a chunk and return the whole message so far, formatted where safe."""
+        start = time.perf_counter()
+        self.text += chunk
+        ready, self._pending = safe_split(self._pending + chunk)
+        if ready:
+            self._formatted += format_link_text(ready)
+        self._elapsed += time.perf_counter() - start
+        return self._formatted + self._pending
+
+    def finish(self):
+        """Return the complete message, formatted exactly as format_reddit_links would."""
+        # Formatting spread over the chunks counts as one observation per message
+        STAGE_SECONDS.observe(self._elapsed, stage="link_format_stream")
+        return format_reddit_links(self.text)
@@ -0,0 +1,380 @@
+"""
+Process-wide metrics: counters and latency histograms with labels.
+
+Every stage of a chat turn (Reddit fetch per subreddit, cache lookup,
+retrieval, prompt build, Gemini call, link formatting) records its
+duration in a histogram, so a slow turn can be traced to the stage that
+ate the time. Metrics are thread-safe and can be read as a snapshot dict
+(METRICS.snapshot()) or in the Prometheus text format, served locally by
+MetricsServer when METRICS_PORT is set.
+
+Components that keep their own statistics (the listing cache, answer
+cache, ...) register a collector whose values are exported as gauges.
+"""
+
+import os
+import time
+import bisect
+import threading
+import contextlib
+import functools
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+if TYPE_CHECKING:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class MetricsConfig:
+    """Configuration for metrics export."""
+    port: int
+    host: str
+    slow_turn: float
+
+def get_metrics_config() -> MetricsConfig:
+    """Get metrics configuration from environment variables with defaults."""
+    port = int(os.getenv("METRICS_PORT", "0"))  # 0 disables the Prometheus endpoint
+    host = os.getenv("METRICS_HOST", "127.0.0.1")
+    slow_turn = float(os.getenv("METRICS_SLOW_TURN", "5"))  # seconds; slower chat turns log a stage breakdown
+
+    return MetricsConfig(port, host, slow_turn)
+
+METRICS_CONFIG = get_metrics_config()
+
+# Seconds; covers in-memory cache hits up to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {",".join(key): value for key, value in self._values.items()}
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value:g}" for key, value in items]
+
+class _HistogramSeries:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+class Histogram:
+    """Observations in fixed buckets per label combination, with approximate percentiles."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets))
+            series.counts[index] += 1
+            series.total += value
+            series.count += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe how long the enclosed block takes, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _quantile(self, series: _HistogramSeries, q: float) -> Optional[float]:
+        """Linear interpolation within the bucket holding the q-th observation."""
+        if not series.count:
+            return None
+        rank = q * series.count
+        seen = 0
+        for i, count in enumerate(series.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower  # beyond the last bucket, the best we can say
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                ",".join(key): {
+                    "count": series.count,
+                    "sum": series.total,
+                    "mean": series.total / series.count if series.count else None,
+                    "p50": self._quantile(series, 0.50),
+                    "p95": self._quantile(series, 0.95),
+                    "p99": self._quantile(series, 0.99),
+                }
+                for key, series in self._series.items()
+            }
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series.counts), series.total, series.count) for key, series in self._series.items())
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(list(self.buckets) + [float("inf")], counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """All metrics of the process, plus collectors for components that keep their own statistics."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def register_collector(self, prefix: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """Export collect()'s numeric values as gauges named <prefix>_<key>."""
+        with self._lock:
+            self._collectors[prefix] = collect
+
+    def _register(self, metric: Any) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Module reloads (e.g. Streamlit reruns) get the metric that already holds the data
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def _collect(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            collectors = list(self._collectors.items())
+        collected = {}
+        for prefix, collect in collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                logger.error(f"Metrics collector {prefix} failed: {e}")
+                continue
+            collected[prefix] = {
+                key: float(value) for key, value in values.items()
+                if isinstance(value, (int, float)) and not isinstance(value, bool)
+            }
+        return collected
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values of every metric and collector, as plain dicts."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot: Dict[str, Any] = {metric.name: metric.snapshot() for metric in metrics}
+        snapshot.update(self._collect())
+        return snapshot
+
+    def render_prometheus(self) -> str:
+        """Every metric and collector in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for prefix, values in self._collect().items():
+            for key, value in sorted(values.items()):
+                name = f"{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Drop all recorded values (metrics stay registered)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            with metric._lock:
+                if isinstance(metric, Histogram):
+                    metric._series.clear()
+                else:
+                    metric._values.clear()
+
+METRICS = MetricsRegistry()
+
+# Per-stage latency of chat turns and MCP requests
+STAGE_SECONDS = METRICS.histogram(
+    "reddit_scout_stage_seconds",
+    "Time spent per pipeline stage",
+    ["stage"],
+)
+# Live Reddit requests, per subreddit and listing ("hot" or "search")
+REDDIT_FETCH_SECONDS = METRICS.histogram(
+    "reddit_scout_reddit_fetch_seconds",
+    "Time to fetch one subreddit listing from Reddit",
+    ["subreddit", "listing"],
+)
+REDDIT_FETCH_ERRORS = METRICS.counter(
+    "reddit_scout_reddit_fetch_errors_total",
+    "Failed Reddit listing fetches",
+    ["subreddit", "listing"],
+)
+# Listing cache lookups by outcome: memory, disk or miss
+CACHE_LOOKUP_SECONDS = METRICS.histogram(
+    "reddit_scout_cache_lookup_seconds",
+    "Listing cache lookup time by outcome",
+    ["result"],
+)
+
+@contextlib.contextmanager
+def time_reddit_fetch(subreddit: str, listing: str) -> Iterator[None]:
+    """Record a live Reddit listing fetch in REDDIT_FETCH_SECONDS, and failures in REDDIT_FETCH_ERRORS."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REDDIT_FETCH_ERRORS.inc(subreddit=subreddit, listing=listing)
+        raise
+    finally:
+        REDDIT_FETCH_SECONDS.observe(time.perf_counter() - start, subreddit=subreddit, listing=listing)
+
+class StageTimer:
+    """Times the stages of one request into STAGE_SECONDS and keeps the breakdown for logging."""
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, duration: float) -> None:
+        """Record a stage timed by the caller (e.g. summed over the chunks of a stream)."""
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+        STAGE_SECONDS.observe(duration, stage=name)
+
+    def finish(self, stage: str = "turn") -> float:
+        """Record the total time since the timer was created; returns it."""
+        total = time.perf_counter() - self._start
+        STAGE_SECONDS.observe(total, stage=stage)
+        return total
+
+    def breakdown(self) -> str:
+        return ", ".join(f"{name} {duration:.2f}s" for name, duration in self.durations.items())
+
+@functools.lru_cache(maxsize=None)
+def get_handler_class() -> Type["BaseHTTPRequestHandler"]:
+    """The /metrics request handler; http.server is only imported when the endpoint is enabled."""
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = METRICS.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass  # scrapes every few seconds would flood the log
+
+    return MetricsHandler
+
+class MetricsServer:
+    """
+    Serves /metrics in the Prometheus text format from a daemon thread, started on first use.
+
+    Only one process per host can bind METRICS_PORT, so with several app
+    processes only the first one's metrics are exported; the others log
+    one warning and do not try again.
+    """
+    def __init__(self, config: MetricsConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self._server: Optional["ThreadingHTTPServer"] = None
+        self._bind_failed = False
+
+    def start(self) -> bool:
+        """Start serving if METRICS_PORT is set; returns whether the endpoint is up."""
+        if not self.config.port or self._bind_failed:
+            return False
+        if self._server is not None:
+            return True
+        with self._lock:
+            if self._bind_failed:
+                return False
+            if self._server is None:
+                from http.server import ThreadingHTTPServer
+                try:
+                    server = ThreadingHTTPServer((self.config.host, self.config.port), get_handler_class())
+                except OSError as e:
+                    # Another worker process on this host already serves the port
+                    logger.warning(f"Metrics endpoint not started on {self.config.host}:{self.config.port}: {e}")
+                    self._bind_failed = True
+                    return False
+                server.daemon_threads = True
+                threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+                self._server = server
+                logger.info(f"Serving metrics on http://{self.config.host}:{self.config.port}/metrics")
+        return True
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._server is not None:
+                self._server.shutdown()
+                self._server = None
+
+METRICS_SERVER = MetricsServer(METRICS_CONFIG)
@@ -0,0 +1,155 @@
+"""
+Column-wise storage for batches of Reddit posts.
+
+The fetch path, the listing cache and the local index used to carry each
+post as an 8-key dict, with a full URL, a formatted date string and its
+own copy of the subreddit name. A PostBatch keeps one list or array per
+field instead: scores, comment counts and timestamps are packed into
+int64 arrays, subreddit names and flairs (which repeat) are interned,
+and URLs are stored without the "https://reddit.com" prefix.
+
+Posts are turned into the RedditPost dicts the tools return only at the
+tool boundary, with to_posts().
+"""
+
+import sys
+import functools
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+URL_PREFIX = "https://reddit.com"
+
+# Self text kept per post, as in the RedditPost returned by the tools
+SELFTEXT_CHARS = 500
+
+def truncate_selftext(selftext: str) -> str:
+    return selftext[:SELFTEXT_CHARS] + "..." if len(selftext) > SELFTEXT_CHARS else selftext
+
+# Cached posts are formatted again on every tool call, so their dates repeat
+@functools.lru_cache(maxsize=8192)
+def format_date(created_utc: int) -> str:
+    return datetime.fromtimestamp(created_utc).strftime('%Y-%m-%d')
+
+class PostBatch:
+    """An ordered batch of posts stored as parallel columns."""
+    __slots__ = ("titles", "permalinks", "scores", "num_comments", "created", "flairs", "selftexts", "subreddits")
+
+    def __init__(self):
+        self.titles: List[str] = []
+        self.permalinks: List[str] = []
+        self.scores = array("q")
+        self.num_comments = array("q")
+        self.created = array("q")  # created_utc, whole seconds
+        self.flairs: List[str] = []
+        self.selftexts: List[str] = []
+        self.subreddits: List[str] = []
+
+    def append(self, title: str, permalink: str, score: int, num_comments: int, created_utc: float,
+               flair: str, selftext: str, subreddit: str) -> None:
+        self.titles.append(title)
+        self.permalinks.append(permalink)
+        self.scores.append(score)
+        self.num_comments.append(num_comments)
+        self.created.append(int(created_utc))
+        self.flairs.append(sys.intern(flair))
+        self.selftexts.append(truncate_selftext(selftext))
+        self.subreddits.append(sys.intern(subreddit))
+
+    @classmethod
+    def from_submissions(cls, submissions: Iterable[Any], sub_name: str) -> "PostBatch":
+        """Build a batch from praw submissions fetched from one subreddit."""
+        batch = cls()
+        for post in submissions:
+            batch.append(post.title, post.permalink, post.score, post.num_comments, post.created_utc,
+                         post.link_flair_text or "", post.selftext, sub_name)
+        return batch
+
+    @classmethod
+    def from_posts(cls, posts: Iterable[Dict[str, Any]]) -> "PostBatch":
+        """Build a batch from RedditPost dicts (dates are read back as local midnight)."""
+        batch = cls()
+        for post in posts:
+            created = post["created_utc"]
+            if isinstance(created, str):
+                created = datetime.strptime(created, '%Y-%m-%d').timestamp() if created else 0
+            url = post["url"]
+            permalink = url[len(URL_PREFIX):] if url.startswith(URL_PREFIX) else url
+            batch.append(post["title"], permalink, post["score"], post["num_comments"], created,
+                         post["flair"], post["selftext"], post["subreddit"])
+        return batch
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """Plain lists per field, for the cache codecs."""
+        return {
+            "title": self.titles,
+            "permalink": self.permalinks,
+            "score": self.scores.tolist(),
+            "num_comments": self.num_comments.tolist(),
+            "created_utc": self.created.tolist(),
+            "flair": self.flairs,
+            "selftext": self.selftexts,
+            "subreddit": self.subreddits,
+        }
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, List[Any]]) -> "PostBatch":
+        batch = cls()
+        batch.titles = list(columns["title"])
+        batch.permalinks = list(columns["permalink"])
+        batch.scores = array("q", columns["score"])
+        batch.num_comments = array("q", columns["num_comments"])
+        batch.created = array("q", columns["created_utc"])
+        batch.flairs = [sys.intern(flair) for flair in columns["flair"]]
+        batch.selftexts = list(columns["selftext"])
+        batch.subreddits = [sys.intern(sub_name) for sub_name in columns["subreddit"]]
+        return batch
+
+    def post(self, i: int) -> Dict[str, Any]:
+        """Post i in the RedditPost shape returned by the tools."""
+        return {
+            "title": self.titles[i],
+            "url": URL_PREFIX + self.permalinks[i],
+            "score": self.scores[i],
+            "num_comments": self.num_comments[i],
+            "created_utc": format_date(self.created[i]),
+            "flair": self.flairs[i],
+            "selftext": self.selftexts[i],
+            "subreddit": self.subreddits[i],
+        }
+
+    def to_posts(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "title": title,
+                "url": URL_PREFIX + permalink,
+                "score": score,
+                "num_comments": num_comments,
+                "created_utc": format_date(created),
+                "flair": flair,
+                "selftext": selftext,
+                "subreddit": subreddit,
+            }
+            for title, permalink, score, num_comments, created, flair, selftext, subreddit in zip(
+                self.titles, self.permalinks, self.scores, self.num_comments,
+                self.created, self.flairs, self.selftexts, self.subreddits,
+            )
+        ]
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.post(i) for i in range(len(self.titles)))
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], "PostBatch"]:
+        if not isinstance(index, slice):
+            return self.post(index)
+        batch = PostBatch()
+        for name in self.__slots__:
+            setattr(batch, name, getattr(self, name)[index])
+        return batch
+
+def to_post_lists(batches: Dict[str, Optional[PostBatch]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Convert per-subreddit batches into RedditPost lists, dropping empty ones."""
+    return {sub_name: batch.to_posts() for sub_name, batch in batches.items() if batch}
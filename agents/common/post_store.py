@@ -0,0 +1,375 @@
+"""
+Local post store with a full-text index.
+
+Every post the agents fetch from Reddit is upserted into a SQLite
+database, and an FTS5 index over title, selftext and flair lets chat
+queries be answered locally with BM25 ranking instead of a live search
+across every subreddit.
+"""
+
+import os
+import re
+import math
+import time
+import sqlite3
+import threading
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from agents.common.post_batch import PostBatch
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PostStoreConfig:
+    """Configuration for the local post store."""
+    path: Path
+    retrieval_mode: str
+    min_local_hits: int
+    min_term_share: float
+    max_selftext_chars: int
+
+def get_post_store_config() -> PostStoreConfig:
+    """Get post store configuration from environment variables with defaults."""
+    path = Path(os.getenv("REDDIT_STORE_PATH", ".reddit_store/posts.sqlite3"))
+    # "live": always search Reddit; "local": only the index; "auto": index first,
+    # falling back to live search when it finds too few posts
+    retrieval_mode = os.getenv("REDDIT_RETRIEVAL_MODE", "auto").lower()
+    min_local_hits = int(os.getenv("REDDIT_LOCAL_MIN_HITS", "10"))
+    # Share of a query's words a post must contain to count as a local hit
+    min_term_share = float(os.getenv("REDDIT_LOCAL_MIN_TERM_SHARE", "0.75"))
+    max_selftext_chars = int(os.getenv("REDDIT_STORE_SELFTEXT_CHARS", "4000"))
+
+    return PostStoreConfig(path, retrieval_mode, min_local_hits, min_term_share, max_selftext_chars)
+
+POST_STORE_CONFIG = get_post_store_config()
+
+# Words too common in visa questions to be worth matching on
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "can", "do", "does", "for", "from",
+    "get", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "the", "to",
+    "what", "whats", "when", "where", "which", "who", "why", "with", "you", "your",
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize_query(query: str) -> List[str]:
+    """Lowercase word tokens of a query, without stopwords."""
+    return [token for token in TOKEN_RE.findall(query.lower()) if token not in STOPWORDS]
+
+def matched_terms(row: Dict[str, Any], tokens: Sequence[str]) -> int:
+    """How many distinct query tokens a stored post contains."""
+    words = set(TOKEN_RE.findall(f"{row['title']} {row['selftext']} {row['flair']}".lower()))
+    return len(words.intersection(tokens))
+
+class PostStore:
+    """SQLite-backed post store with an FTS5 index; one connection per thread."""
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS posts (
+        rowid INTEGER PRIMARY KEY,
+        id TEXT NOT NULL UNIQUE,
+        subreddit TEXT NOT NULL,
+        title TEXT NOT NULL,
+        selftext TEXT NOT NULL,
+        flair TEXT NOT NULL,
+        permalink TEXT NOT NULL,
+        score INTEGER NOT NULL,
+        num_comments INTEGER NOT NULL,
+        created_utc INTEGER NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_posts_subreddit_created ON posts(subreddit, created_utc);
+    CREATE INDEX IF NOT EXISTS idx_posts_created ON posts(created_utc);
+    CREATE TABLE IF NOT EXISTS watermarks (
+        subreddit TEXT PRIMARY KEY,
+        fullname TEXT NOT NULL,
+        created_utc INTEGER NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS route_stats (
+        term TEXT NOT NULL,
+        subreddit TEXT NOT NULL,
+        hits INTEGER NOT NULL,
+        trials INTEGER NOT NULL,
+        PRIMARY KEY (term, subreddit)
+    );
+    """
+
+    FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        title, selftext, flair, content='posts', content_rowid='rowid'
+    );
+    CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, title, selftext, flair) VALUES (new.rowid, new.title, new.selftext, new.flair);
+    END;
+    CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, selftext, flair) VALUES ('delete', old.rowid, old.title, old.selftext, old.flair);
+    END;
+    CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, selftext, flair ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, selftext, flair) VALUES ('delete', old.rowid, old.title, old.selftext, old.flair);
+        INSERT INTO posts_fts(rowid, title, selftext, flair) VALUES (new.rowid, new.title, new.selftext, new.flair);
+    END;
+    """
+
+    # BM25 column weights: title matches count most, then flair, then body
+    BM25_WEIGHTS = (10.0, 1.0, 3.0)
+
+    def __init__(self, path: Path, max_selftext_chars: int):
+        self.path = path
+        self.max_selftext_chars = max_selftext_chars
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(self.SCHEMA)
+        try:
+            conn.executescript(self.FTS_SCHEMA)
+            self.fts_available = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite FTS5 unavailable, local retrieval disabled: {e}")
+            self.fts_available = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def upsert_submissions(self, submissions: Iterable[Any], sub_name: Optional[str] = None) -> int:
+        """Insert or update praw submissions; returns how many were written."""
+        now = time.time()
+        rows = [
+            (
+                post.id,
+                sub_name or post.subreddit.display_name,
+                post.title,
+                (post.selftext or "")[:self.max_selftext_chars],
+                post.link_flair_text or "",
+                post.permalink,
+                int(post.score),
+                int(post.num_comments),
+                int(post.created_utc),
+                now,
+            )
+            for post in submissions
+        ]
+        if not rows:
+            return 0
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                """
+                INSERT INTO posts (id, subreddit, title, selftext, flair, permalink, score, num_comments, created_utc, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    title = excluded.title,
+                    selftext = excluded.selftext,
+                    flair = excluded.flair,
+                    score = excluded.score,
+                    num_comments = excluded.num_comments,
+                    updated_at = excluded.updated_at
+                """,
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def search(
+        self,
+        query: str,
+        subreddits: Optional[Sequence[str]] = None,
+        limit: int = 100,
+        min_term_share: float = 0.0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search ranked by BM25.
+
+        Query words are OR-ed together so natural-language questions still
+        match; BM25 ranks posts that contain more (and rarer) words first.
+        Posts containing fewer than min_term_share of the distinct query
+        words are dropped, so a post that only shares "visa" with the
+        question does not count as an answer to it.
+        """
+        if not self.fts_available:
+            return []
+        tokens = tokenize_query(query)
+        if not tokens:
+            return []
+        match = " OR ".join(f'"{token}"' for token in tokens)
+        sql = f"""
+            SELECT p.*, bm25(posts_fts, {", ".join(str(w) for w in self.BM25_WEIGHTS)}) AS rank
+            FROM posts_fts JOIN posts p ON p.rowid = posts_fts.rowid
+            WHERE posts_fts MATCH ?
+        """
+        params: List[Any] = [match]
+        if subreddits:
+            sql += f" AND p.subreddit IN ({', '.join('?' for _ in subreddits)})"
+            params.extend(subreddits)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        rows = [dict(row) for row in self._connect().execute(sql, params)]
+        required = math.ceil(min_term_share * len(set(tokens)))
+        return [row for row in rows if matched_terms(row, tokens) >= required] if required > 1 else rows
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def get_watermark(self, subreddit: str) -> Optional[Tuple[str, int]]:
+        """Fullname and creation time of the newest post harvested from a subreddit."""
+        row = self._connect().execute(
+            "SELECT fullname, created_utc FROM watermarks WHERE subreddit = ?", (subreddit,)
+        ).fetchone()
+        return (row["fullname"], row["created_utc"]) if row else None
+
+    def set_watermark(self, subreddit: str, fullname: str, created_utc: int) -> None:
+        self._connect().execute(
+            """
+            INSERT INTO watermarks (subreddit, fullname, created_utc, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(subreddit) DO UPDATE SET
+                fullname = excluded.fullname,
+                created_utc = excluded.created_utc,
+                updated_at = excluded.updated_at
+            """,
+            (subreddit, fullname, int(created_utc), time.time()),
+        )
+
+    def due_for_refresh(self, schedule: Sequence[Tuple[int, int]], limit: int = 500) -> List[str]:
+        """
+        IDs of recent posts whose score and comment count are due a refresh.
+
+        schedule is a list of (max_age, refresh_interval) pairs in seconds,
+        youngest first: a post younger than max_age is due once it was last
+        updated more than refresh_interval ago. Posts older than the last
+        max_age are never refreshed. Most-overdue posts come first.
+        """
+        now = time.time()
+        cases = " ".join(
+            f"WHEN {now} - created_utc < {int(max_age)} THEN {int(interval)}"
+            for max_age, interval in schedule
+        )
+        oldest = now - max(max_age for max_age, _ in schedule)
+        sql = f"""
+            SELECT id, (? - updated_at) - (CASE {cases} END) AS overdue
+            FROM posts
+            WHERE created_utc >= ?
+            AND overdue >= 0
+            ORDER BY overdue DESC
+            LIMIT ?
+        """
+        return [row["id"] for row in self._connect().execute(sql, (now, oldest, limit))]
+
+    def update_engagement(self, updates: Iterable[Tuple[str, int, int]]) -> None:
+        """Store fresh (id, score, num_comments) values for existing posts."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE posts SET score = ?, num_comments = ?, updated_at = ? WHERE id = ?",
+                [(int(score), int(num_comments), now, post_id) for post_id, score, num_comments in updates],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def record_route_results(self, terms: Sequence[str], results: Dict[str, bool]) -> None:
+        """Count, per query term, which searched subreddits returned posts."""
+        rows = [(term, subreddit, int(hit)) for term in set(terms) for subreddit, hit in results.items()]
+        if not rows:
+            return
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                """
+                INSERT INTO route_stats (term, subreddit, hits, trials) VALUES (?, ?, ?, 1)
+                ON CONFLICT(term, subreddit) DO UPDATE SET
+                    hits = hits + excluded.hits,
+                    trials = trials + 1
+                """,
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_route_stats(self, terms: Sequence[str]) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """(hits, trials) per (term, subreddit) for the given terms."""
+        terms = list(set(terms))
+        if not terms:
+            return {}
+        placeholders = ", ".join("?" for _ in terms)
+        rows = self._connect().execute(
+            f"SELECT term, subreddit, hits, trials FROM route_stats WHERE term IN ({placeholders})",
+            terms,
+        )
+        return {(row["term"], row["subreddit"]): (row["hits"], row["trials"]) for row in rows}
+
+_POST_STORE: Optional[PostStore] = None
+_POST_STORE_LOCK = threading.Lock()
+
+def get_post_store() -> PostStore:
+    """Return the process-wide post store, opening it on first use."""
+    global _POST_STORE
+    if _POST_STORE is None:
+        with _POST_STORE_LOCK:
+            if _POST_STORE is None:
+                _POST_STORE = PostStore(POST_STORE_CONFIG.path, POST_STORE_CONFIG.max_selftext_chars)
+    return _POST_STORE
+
+def ingest_submissions(submissions: Iterable[Any], sub_name: Optional[str] = None) -> None:
+    """Upsert fetched submissions into the post store, logging rather than raising on failure."""
+    try:
+        get_post_store().upsert_submissions(submissions, sub_name)
+    except Exception as e:
+        logger.error(f"Post store ingest error: {e}")
+
+def search_local_posts(
+    query: str,
+    subreddits: Sequence[str],
+    limit: int,
+    min_hits: Optional[int] = None,
+) -> Optional[Dict[str, PostBatch]]:
+    """
+    Answer a search from the local index, grouped by subreddit.
+
+    Only posts containing most of the query's words count (see
+    REDDIT_LOCAL_MIN_TERM_SHARE). Returns None when the index finds fewer
+    than min_hits such posts (default: REDDIT_LOCAL_MIN_HITS), so the
+    caller can fall back to a live search. It also returns None, logging
+    the error, when the store cannot be opened or read (locked, corrupt,
+    read-only), since a live search can still answer.
+    """
+    min_hits = POST_STORE_CONFIG.min_local_hits if min_hits is None else min_hits
+    try:
+        rows = get_post_store().search(
+            query, subreddits, limit=limit * len(subreddits), min_term_share=POST_STORE_CONFIG.min_term_share
+        )
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Post store search error: {e}")
+        return None
+    if not rows or len(rows) < min_hits:
+        logger.info(f"Local index found {len(rows)} relevant posts for '{query}', too few to skip live search")
+        return None
+    results: Dict[str, PostBatch] = {}
+    for row in rows:
+        posts = results.get(row["subreddit"])
+        if posts is None:
+            posts = results[row["subreddit"]] = PostBatch()
+        if len(posts) < limit:
+            posts.append(row["title"], row["permalink"], row["score"], row["num_comments"], row["created_utc"],
+                         row["flair"], row["selftext"], row["subreddit"])
+    # Keep the caller's subreddit order
+    return {sub_name: results[sub_name] for sub_name in subreddits if sub_name in results}
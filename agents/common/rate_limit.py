@@ -0,0 +1,269 @@
+"""
+Reddit rate limiting shared by every process on the host.
+
+Each Streamlit worker, the prewarmer and the harvester used to spend the
+same Reddit quota without knowing about each other, so bursts ran into
+429s and praw slept unpredictably in the middle of user requests. Now
+every HTTP request praw makes first takes a token from a bucket kept in a
+small SQLite database that all processes share. The bucket refills at
+the configured rate and is capped by what Reddit's X-Ratelimit-Remaining
+header says is left in the current window.
+
+Requests have a priority. Interactive requests may drain the bucket;
+background requests (prewarm, harvest) stop while less than the
+interactive reserve is left. An interactive request that cannot get a
+token quickly fails at once with RateLimitExceeded, so the caller can
+degrade (serve cached or partial results) instead of stalling.
+"""
+
+import os
+import time
+import sqlite3
+import functools
+import threading
+import contextlib
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Type
+
+from agents.common.post_store import POST_STORE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class Priority(Enum):
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+class RateLimitExceeded(Exception):
+    """No Reddit request token became available within the caller's wait limit."""
+
+@dataclass
+class RateLimitConfig:
+    """Configuration for the shared Reddit rate limiter."""
+    enabled: bool
+    path: Path
+    rate_limit_qpm: int
+    burst: int
+    window_requests: int
+    interactive_reserve: float
+    interactive_max_wait: float
+    background_max_wait: float
+
+def get_rate_limit_config() -> RateLimitConfig:
+    """Get rate limiter configuration from environment variables with defaults."""
+    enabled = os.getenv("REDDIT_RATE_LIMIT", "true").lower() == "true"
+    path = Path(os.getenv("REDDIT_RATE_DB", str(POST_STORE_CONFIG.path.parent / "ratelimit.sqlite3")))
+    rate_limit_qpm = int(os.getenv("REDDIT_RATE_LIMIT_QPM", "100"))  # Reddit OAuth limit
+    burst = int(os.getenv("REDDIT_RATE_BURST", str(rate_limit_qpm)))  # bucket capacity
+    window_requests = int(os.getenv("REDDIT_RATE_WINDOW_REQUESTS", "600"))  # per 10-minute window
+    # Share of the bucket (and of Reddit's window) background requests may not touch
+    interactive_reserve = float(os.getenv("REDDIT_RATE_INTERACTIVE_RESERVE", "0.5"))
+    interactive_max_wait = float(os.getenv("REDDIT_RATE_MAX_WAIT", "1.0"))  # seconds
+    background_max_wait = float(os.getenv("REDDIT_RATE_BACKGROUND_MAX_WAIT", "600"))  # seconds
+
+    return RateLimitConfig(
+        enabled,
+        path,
+        rate_limit_qpm,
+        burst,
+        window_requests,
+        interactive_reserve,
+        interactive_max_wait,
+        background_max_wait,
+    )
+
+RATE_LIMIT_CONFIG = get_rate_limit_config()
+
+# Priority of Reddit requests made from the current thread or task
+REQUEST_PRIORITY: ContextVar[Priority] = ContextVar("reddit_request_priority", default=Priority.INTERACTIVE)
+
+@contextlib.contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """Run the enclosed Reddit requests at the given priority."""
+    token = REQUEST_PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        REQUEST_PRIORITY.reset(token)
+
+class SharedRateLimiter:
+    """Token bucket in SQLite, shared by every process using the same database file."""
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS bucket (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        server_remaining REAL,
+        server_reset REAL
+    );
+    """
+
+    def __init__(self, config: RateLimitConfig):
+        self.config = config
+        self.rate = config.rate_limit_qpm / 60.0  # tokens per second
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._stats_lock = threading.Lock()
+        self.granted = {priority: 0 for priority in Priority}
+        self.rejected = {priority: 0 for priority in Priority}
+        self.waited = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self.config.path.parent.mkdir(parents=True, exist_ok=True)
+                    conn = self._open()
+                    conn.executescript(self.SCHEMA)
+                    conn.execute(
+                        "INSERT OR IGNORE INTO bucket (id, tokens, updated_at) VALUES (0, ?, ?)",
+                        (float(self.config.burst), time.time()),
+                    )
+                    self._initialized = True
+        return self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.config.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _floor(self, priority: Priority) -> float:
+        return self.config.interactive_reserve * self.config.burst if priority is Priority.BACKGROUND else 0.0
+
+    def _try_take(self, priority: Priority, cost: float) -> float:
+        """Take cost tokens if available; returns 0, or how long to wait before trying again."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated_at, server_remaining, server_reset = conn.execute(
+                "SELECT tokens, updated_at, server_remaining, server_reset FROM bucket WHERE id = 0"
+            ).fetchone()
+            tokens = min(float(self.config.burst), tokens + max(0.0, now - updated_at) * self.rate)
+
+            wait = 0.0
+            server_known = server_remaining is not None and server_reset is not None and server_reset > now
+            if server_known:
+                # Reddit's own count of what is left in this window wins over our estimate
+                server_floor = (
+                    self.config.interactive_reserve * self.config.window_requests
+                    if priority is Priority.BACKGROUND else 0.0
+                )
+                if server_remaining - cost < server_floor:
+                    wait = server_reset - now
+            floor = self._floor(priority)
+            if not wait and tokens - cost < floor:
+                wait = (floor + cost - tokens) / self.rate
+
+            if not wait:
+                tokens -= cost
+                if server_known:
+                    server_remaining -= cost
+            conn.execute(
+                "UPDATE bucket SET tokens = ?, updated_at = ?, server_remaining = ? WHERE id = 0",
+                (tokens, now, server_remaining),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, priority: Optional[Priority] = None, cost: float = 1.0, max_wait: Optional[float] = None) -> None:
+        """
+        Take a request token, waiting up to max_wait for one.
+
+        Raises:
+            RateLimitExceeded: If no token can be had within max_wait
+        """
+        if not self.config.enabled:
+            return
+        priority = priority or REQUEST_PRIORITY.get()
+        if max_wait is None:
+            max_wait = (
+                self.config.background_max_wait if priority is Priority.BACKGROUND else self.config.interactive_max_wait
+            )
+        deadline = time.monotonic() + max_wait
+        started = time.monotonic()
+        while True:
+            wait = self._try_take(priority, cost)
+            if not wait:
+                with self._stats_lock:
+                    self.granted[priority] += 1
+                    self.waited += time.monotonic() - started
+                return
+            if time.monotonic() + wait > deadline:
+                with self._stats_lock:
+                    self.rejected[priority] += 1
+                raise RateLimitExceeded(
+                    f"Reddit rate limit reached ({priority.value} request would wait {wait:.1f}s)"
+                )
+            time.sleep(wait)
+
+    def observe(self, headers: Any) -> None:
+        """Record Reddit's X-Ratelimit-Remaining/Reset headers from a response."""
+        if not self.config.enabled:
+            return
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining = float(remaining)
+            reset_at = time.time() + float(reset)
+        except ValueError:
+            return
+        self._connect().execute(
+            "UPDATE bucket SET server_remaining = ?, server_reset = ? WHERE id = 0",
+            (remaining, reset_at),
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        row = self._connect().execute(
+            "SELECT tokens, updated_at, server_remaining, server_reset FROM bucket WHERE id = 0"
+        ).fetchone()
+        tokens, updated_at, server_remaining, server_reset = row
+        with self._stats_lock:
+            granted = sum(self.granted.values())
+            return {
+                "tokens": min(float(self.config.burst), tokens + max(0.0, time.time() - updated_at) * self.rate),
+                "server_remaining": server_remaining,
+                "server_reset_in": max(0.0, server_reset - time.time()) if server_reset else None,
+                "granted": {priority.value: count for priority, count in self.granted.items()},
+                "rejected": {priority.value: count for priority, count in self.rejected.items()},
+                "avg_wait": self.waited / granted if granted > 0 else 0,
+            }
+
+RATE_LIMITER = SharedRateLimiter(RATE_LIMIT_CONFIG)
+
+@functools.lru_cache(maxsize=None)
+def get_requestor_class() -> Type[Any]:
+    """
+    The prawcore requestor class to build Reddit clients with.
+
+    Defined on first use so that importing this module does not import
+    prawcore.
+    """
+    from prawcore import Requestor
+
+    class RateLimitedRequestor(Requestor):
+        """prawcore requestor that takes a shared token before, and reads the rate headers after, every request."""
+        def request(self, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+            RATE_LIMITER.acquire()
+            response = super().request(*args, timeout=timeout, **kwargs)
+            try:
+                RATE_LIMITER.observe(response.headers)
+            except Exception as e:
+                logger.error(f"Rate limit header update failed: {e}")
+            return response
+
+    return RateLimitedRequestor
@@ -0,0 +1,141 @@
+"""
+Process-wide pooled Reddit client.
+
+Every tool call used to build its own praw.Reddit, which meant a fresh OAuth
+token request and a fresh HTTP connection pool each time. The manager below
+keeps one client per process and hands it to every caller and Streamlit
+session; praw renews the app-only token on its own when it expires.
+
+praw (and .env) are only loaded when the first client is needed, so
+importing the agents stays cheap.
+"""
+
+import os
+import threading
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from agents.common.fanout import FANOUT_CONFIG
+from agents.common.rate_limit import get_requestor_class
+
+if TYPE_CHECKING:
+    import praw
+
+logger = logging.getLogger(__name__)
+
+CREDENTIAL_VARS = ["REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "REDDIT_USER_AGENT"]
+
+_ENV_LOADED = False
+_ENV_LOCK = threading.Lock()
+
+def load_env() -> None:
+    """Load .env into the environment once per process (existing variables win)."""
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
+    with _ENV_LOCK:
+        if not _ENV_LOADED:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _ENV_LOADED = True
+
+def get_missing_credentials() -> List[str]:
+    """Return the names of Reddit credential variables that are not set."""
+    load_env()
+    return [var for var in CREDENTIAL_VARS if not os.getenv(var)]
+
+class RedditClientManager:
+    """Thread-safe holder for a single shared praw.Reddit instance."""
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._reddit: Optional["praw.Reddit"] = None
+        self._credentials: Optional[Tuple[str, str, str]] = None
+        self._healthy: Optional[bool] = None
+        self._last_error: Optional[str] = None
+
+    def get_client(self) -> "praw.Reddit":
+        """
+        Return the shared client, creating it on first use.
+
+        The client is rebuilt lazily when the credentials in the environment
+        change or after it has been invalidated. Building it kicks off a
+        background health check; nothing on the request path waits for it.
+
+        Raises:
+            ValueError: If any Reddit credentials are missing
+        """
+        load_env()
+        credentials = tuple(os.getenv(var) for var in CREDENTIAL_VARS)
+        if not all(credentials):
+            raise ValueError(f"Missing Reddit API credentials: {', '.join(get_missing_credentials())}")
+
+        reddit = self._reddit
+        if reddit is not None and self._credentials == credentials:
+            return reddit
+
+        with self._lock:
+            if self._reddit is None or self._credentials != credentials:
+                import praw
+
+                client_id, client_secret, user_agent = credentials
+                self._reddit = praw.Reddit(
+                    client_id=client_id,
+                    client_secret=client_secret,
+                    user_agent=user_agent,
+                    timeout=self.timeout,
+                    # Every request takes a token from the rate limiter shared by all processes
+                    requestor_class=get_requestor_class(),
+                )
+                self._credentials = credentials
+                self._healthy = None
+                logger.info("Created shared Reddit client")
+                self._start_health_check(self._reddit)
+            return self._reddit
+
+    def warm_up(self) -> None:
+        """Create the client (and start its health check) ahead of the first request."""
+        try:
+            self.get_client()
+        except ValueError as e:
+            logger.warning(f"Reddit client not started: {e}")
+
+    def invalidate(self) -> None:
+        """Drop the shared client so the next caller builds a fresh one."""
+        with self._lock:
+            self._reddit = None
+            self._credentials = None
+
+    def health(self) -> Dict[str, Optional[object]]:
+        """Result of the most recent background health check (None while pending)."""
+        return {"healthy": self._healthy, "error": self._last_error}
+
+    def _start_health_check(self, reddit: "praw.Reddit") -> None:
+        thread = threading.Thread(
+            target=self._check_health,
+            args=(reddit,),
+            name="reddit-health-check",
+            daemon=True,
+        )
+        thread.start()
+
+    def _check_health(self, reddit: "praw.Reddit") -> None:
+        try:
+            reddit.user.me()
+            self._healthy = True
+            self._last_error = None
+        except Exception as e:
+            logger.error(f"Reddit health check failed: {e}")
+            self._healthy = False
+            self._last_error = str(e)
+            # Rebuild on next use rather than keep handing out a broken client
+            with self._lock:
+                if self._reddit is reddit:
+                    self._reddit = None
+                    self._credentials = None
+
+REDDIT_CLIENTS = RedditClientManager(timeout=FANOUT_CONFIG.per_subreddit_timeout)
+
+def get_reddit_client() -> "praw.Reddit":
+    """Return the process-wide Reddit client."""
+    return REDDIT_CLIENTS.get_client()
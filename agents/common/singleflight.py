@@ -0,0 +1,88 @@
+"""
+Request coalescing for identical in-flight fetches.
+
+When several sessions ask for the same thing at the same moment (say, all
+clicking the same Popular Question), only the first caller runs the fetch;
+the others wait for it and share its result or its exception.
+
+Reddit fetches coalesce only with fetches of the same request priority:
+a user request that joined a prewarm or harvest fetch would wait behind
+its background-priority rate limiter token, which may take minutes.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from agents.common.metrics import METRICS
+from agents.common.rate_limit import REQUEST_PRIORITY
+
+T = TypeVar("T")
+
+def normalize_key(*parts: Any) -> Tuple[Any, ...]:
+    """Build a coalescing key, lowercasing strings and collapsing whitespace."""
+    return tuple(" ".join(part.lower().split()) if isinstance(part, str) else part for part in parts)
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time; concurrent callers share the outcome.
+
+    If scope is given, its value in the calling thread is part of every
+    key, so only callers in the same scope share a call.
+    """
+    def __init__(self, scope: Optional[Callable[[], Hashable]] = None):
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Return fn()'s result, or the result of the identical call already in flight."""
+        if self.scope is not None:
+            key = (self.scope(), key)
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+        }
+
+# Shared by the basic and MCP fetch paths
+REDDIT_FETCHES = SingleFlight(scope=REQUEST_PRIORITY.get)
+METRICS.register_collector("reddit_scout_singleflight", REDDIT_FETCHES.get_stats)
@@ -0,0 +1,196 @@
+"""
+Incremental harvester for the local post store.
+
+Instead of re-listing every subreddit on each tool call, the harvester
+polls each subreddit's `new` listing and ingests only posts newer than
+that subreddit's watermark (the fullname of the newest post seen so far).
+Scores and comment counts of recent posts are refreshed on a decaying
+schedule: young posts often, older posts rarely, week-old posts never.
+
+    python -m agents.harvester            # run forever
+    python -m agents.harvester --once     # one poll of every subreddit, then exit
+"""
+
+import os
+import time
+import argparse
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from agents.common.post_store import get_post_store
+from agents.common.rate_limit import Priority, request_priority
+from agents.common.reddit_client import get_reddit_client, load_env
+from agents.reddit_scout.agent import RELEVANT_SUBREDDITS
+
+logger = logging.getLogger(__name__)
+
+# (max post age, refresh interval) in seconds, youngest first
+REFRESH_SCHEDULE: List[Tuple[int, int]] = [
+    (60 * 60, 5 * 60),              # first hour: every 5 minutes
+    (6 * 60 * 60, 30 * 60),         # up to 6 hours: every 30 minutes
+    (24 * 60 * 60, 2 * 60 * 60),    # up to a day: every 2 hours
+    (3 * 24 * 60 * 60, 12 * 60 * 60),  # up to 3 days: every 12 hours
+]
+
+# Reddit's /api/info accepts up to 100 fullnames per request
+INFO_BATCH_SIZE = 100
+
+@dataclass
+class HarvestConfig:
+    """Configuration for the incremental harvester."""
+    interval: int
+    max_new_per_poll: int
+    max_refresh_per_pass: int
+
+def get_harvest_config() -> HarvestConfig:
+    """Get harvester configuration from environment variables with defaults."""
+    interval = int(os.getenv("HARVEST_INTERVAL", "120"))  # seconds between passes
+    max_new_per_poll = int(os.getenv("HARVEST_MAX_NEW", "100"))  # posts per subreddit per poll
+    max_refresh_per_pass = int(os.getenv("HARVEST_MAX_REFRESH", "500"))  # score refreshes per pass
+
+    return HarvestConfig(interval, max_new_per_poll, max_refresh_per_pass)
+
+HARVEST_CONFIG = get_harvest_config()
+
+class Harvester:
+    """Polls `new` for every relevant subreddit and keeps the post store current."""
+    def __init__(self, config: HarvestConfig, subreddits: List[str]):
+        self.config = config
+        self.subreddits = subreddits
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_run: Dict[str, float] = {}
+
+    def poll_subreddit(self, sub_name: str) -> int:
+        """
+        Ingest posts newer than the subreddit's watermark; returns how many.
+
+        Reddit's `before` parameter returns only posts newer than the
+        watermark post, so a quiet subreddit costs an empty page rather than
+        a full one. If the watermark post has been deleted, `before` has
+        nothing to anchor on and returns nothing; then we scan `new` down to
+        the watermark's creation time instead.
+        """
+        store = get_post_store()
+        watermark = store.get_watermark(sub_name)
+        reddit = get_reddit_client()
+        subreddit = reddit.subreddit(sub_name)
+        limit = self.config.max_new_per_poll
+        if watermark is None:
+            fresh = list(subreddit.new(limit=limit))
+        else:
+            fresh = list(subreddit.new(limit=limit, params={"before": watermark[0]}))
+            if not fresh and self._is_deleted(reddit, watermark[0]):
+                logger.info(f"Watermark post {watermark[0]} in r/{sub_name} is gone; scanning by time")
+                fresh = [
+                    post for post in subreddit.new(limit=limit)
+                    if int(post.created_utc) >= watermark[1] and post.name != watermark[0]
+                ]
+        if fresh:
+            store.upsert_submissions(fresh, sub_name)
+            newest = max(fresh, key=lambda post: post.created_utc)
+            store.set_watermark(sub_name, newest.name, int(newest.created_utc))
+        return len(fresh)
+
+    @staticmethod
+    def _is_deleted(reddit, fullname: str) -> bool:
+        """Whether a post was deleted or removed, so listings can no longer anchor on it."""
+        post = next(iter(reddit.info(fullnames=[fullname])), None)
+        return post is None or getattr(post, "removed_by_category", None) is not None
+
+    def refresh_recent(self) -> int:
+        """Refresh score and comment count of recent posts that are due; returns how many."""
+        store = get_post_store()
+        due = store.due_for_refresh(REFRESH_SCHEDULE, limit=self.config.max_refresh_per_pass)
+        refreshed = 0
+        reddit = get_reddit_client()
+        for start in range(0, len(due), INFO_BATCH_SIZE):
+            fullnames = [f"t3_{post_id}" for post_id in due[start:start + INFO_BATCH_SIZE]]
+            updates = [(post.id, post.score, post.num_comments) for post in reddit.info(fullnames=fullnames)]
+            store.update_engagement(updates)
+            refreshed += len(updates)
+        return refreshed
+
+    def run_once(self) -> Dict[str, float]:
+        """Poll every subreddit once, then refresh due posts; returns a summary."""
+        # Harvest traffic yields to user requests in the shared rate limiter
+        with request_priority(Priority.BACKGROUND):
+            return self._harvest()
+
+    def _harvest(self) -> Dict[str, float]:
+        started = time.time()
+        ingested = failed = 0
+        for sub_name in self.subreddits:
+            if self._stop.is_set():
+                break
+            try:
+                ingested += self.poll_subreddit(sub_name)
+            except Exception as e:
+                logger.warning(f"Harvest of r/{sub_name} failed: {e}")
+                failed += 1
+        try:
+            refreshed = self.refresh_recent()
+        except Exception as e:
+            logger.warning(f"Refreshing recent posts failed: {e}")
+            refreshed = 0
+
+        self.last_run = {
+            "started": started,
+            "duration": time.time() - started,
+            "ingested": ingested,
+            "refreshed": refreshed,
+            "failed": failed,
+        }
+        logger.info(f"Harvest pass ingested {ingested} new posts, refreshed {refreshed} ({failed} subreddits failed)")
+        return self.last_run
+
+    def start(self) -> None:
+        """Start harvesting in a daemon thread: once now, then every interval."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="reddit-harvester", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            pass_started = time.time()
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Harvest pass failed: {e}")
+            self._stop.wait(max(0.0, self.config.interval - (time.time() - pass_started)))
+
+HARVESTER = Harvester(HARVEST_CONFIG, RELEVANT_SUBREDDITS)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Harvest new Reddit posts into the local post store")
+    parser.add_argument("--once", action="store_true", help="Run a single harvest pass and exit")
+    parser.add_argument("--interval", type=int, help="Seconds between passes (default: HARVEST_INTERVAL)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.interval:
+        HARVESTER.config.interval = args.interval
+
+    if args.once:
+        print(HARVESTER.run_once())
+        return
+
+    HARVESTER.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        HARVESTER.stop()
+
+if __name__ == "__main__":
+    load_env()
+    main()
@@ -0,0 +1,162 @@
+"""
+Background cache prewarmer.
+
+The sidebar's Popular Questions and the hot listings of every relevant
+subreddit are predictable, so instead of letting the first user after
+each TTL expiry pay for a cold fetch, the prewarmer re-fetches them on an
+interval shorter than the cache TTL. Requests are paced so prewarming
+never uses more than a configured share of the Reddit rate budget, and
+its requests run at background priority in the shared rate limiter so
+they yield to user requests.
+
+Run it inside the Streamlit process (PREWARM_IN_APP=true) or standalone:
+
+    python -m agents.prewarm            # run forever
+    python -m agents.prewarm --once     # one pass, then exit
+"""
+
+import os
+import time
+import argparse
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agents.common.cache import CACHE_CONFIG
+from agents.common.rate_limit import Priority, request_priority
+from agents.common.reddit_client import get_reddit_client, load_env
+from agents.reddit_scout.agent import RELEVANT_SUBREDDITS, refresh_subreddit_posts
+from agents.reddit_scout.questions import EXAMPLE_QUESTIONS
+from agents.reddit_scout.router import QUERY_ROUTER
+from agents.reddit_scout_mcp.agent import ALL_SUBREDDITS_LIMIT, fetch_hot_listing
+
+logger = logging.getLogger(__name__)
+
+# Posts per subreddit the chat agent asks for (get_reddit_posts default)
+QUESTION_LIMIT = 15
+
+@dataclass
+class PrewarmConfig:
+    """Configuration for the cache prewarmer."""
+    interval: int
+    rate_share: float
+    rate_limit_qpm: int
+    in_app: bool
+
+def get_prewarm_config() -> PrewarmConfig:
+    """Get prewarm configuration from environment variables with defaults."""
+    # Default to 80% of the TTL so entries are replaced before they expire
+    interval = int(os.getenv("PREWARM_INTERVAL", str(int(CACHE_CONFIG.ttl * 0.8))))
+    rate_share = float(os.getenv("PREWARM_RATE_SHARE", "0.25"))  # share of the Reddit budget
+    rate_limit_qpm = int(os.getenv("REDDIT_RATE_LIMIT_QPM", "100"))  # Reddit OAuth limit
+    in_app = os.getenv("PREWARM_IN_APP", "false").lower() == "true"
+
+    return PrewarmConfig(interval, rate_share, rate_limit_qpm, in_app)
+
+PREWARM_CONFIG = get_prewarm_config()
+
+class Prewarmer:
+    """Refreshes predictable cache keys on a schedule, within a share of the rate budget."""
+    def __init__(self, config: PrewarmConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_run: Dict[str, float] = {}
+
+    def jobs(self) -> List[Tuple[str, Callable[[], object]]]:
+        """Every (description, refresh) pair one prewarm pass runs."""
+        jobs = []
+        for sub_name in RELEVANT_SUBREDDITS:
+            jobs.append((
+                f"hot r/{sub_name}",
+                lambda sub_name=sub_name: fetch_hot_listing(get_reddit_client(), sub_name, ALL_SUBREDDITS_LIMIT),
+            ))
+        for question in EXAMPLE_QUESTIONS:
+            # Only the subreddits the chat agent will route the question to
+            for sub_name in QUERY_ROUTER.select(question, RELEVANT_SUBREDDITS) or RELEVANT_SUBREDDITS:
+                jobs.append((
+                    f"search r/{sub_name} '{question}'",
+                    lambda sub_name=sub_name, question=question: refresh_subreddit_posts(
+                        get_reddit_client(), sub_name, question, QUESTION_LIMIT
+                    ),
+                ))
+        return jobs
+
+    def run_once(self) -> Dict[str, float]:
+        """Run one prewarm pass and return a summary of it."""
+        started = time.time()
+        # Space requests so we never exceed our share of the per-minute limit
+        spacing = 60.0 / max(self.config.rate_share * self.config.rate_limit_qpm, 1e-6)
+        refreshed = failed = 0
+
+        for description, refresh in self.jobs():
+            if self._stop.is_set():
+                break
+            try:
+                # Waits in the shared limiter while the interactive reserve is all that is left
+                with request_priority(Priority.BACKGROUND):
+                    refresh()
+                refreshed += 1
+            except Exception as e:
+                logger.warning(f"Prewarm of {description} failed: {e}")
+                failed += 1
+            self._stop.wait(spacing)
+
+        self.last_run = {
+            "started": started,
+            "duration": time.time() - started,
+            "refreshed": refreshed,
+            "failed": failed,
+        }
+        logger.info(f"Prewarm pass refreshed {refreshed} listings ({failed} failed) in {self.last_run['duration']:.0f}s")
+        return self.last_run
+
+    def start(self) -> None:
+        """Start prewarming in a daemon thread: once now, then every interval."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="cache-prewarmer", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            pass_started = time.time()
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Prewarm pass failed: {e}")
+            self._stop.wait(max(0.0, self.config.interval - (time.time() - pass_started)))
+
+PREWARMER = Prewarmer(PREWARM_CONFIG)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prewarm the Reddit listing cache")
+    parser.add_argument("--once", action="store_true", help="Run a single prewarm pass and exit")
+    parser.add_argument("--interval", type=int, help="Seconds between passes (default: PREWARM_INTERVAL)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.interval:
+        PREWARMER.config.interval = args.interval
+
+    if args.once:
+        print(PREWARMER.run_once())
+        return
+
+    PREWARMER.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        PREWARMER.stop()
+
+if __name__ == "__main__":
+    load_env()
+    main()
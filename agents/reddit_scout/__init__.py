@@ -3,8 +3,14 @@ Reddit Scout agent module.
 """
 
 # This file makes 'reddit_scout' a Python package.
-# It should import the chat_agent instance to make it discoverable.
+# It exposes the chat_agent instance (imported on first access) to make it discoverable.
 
-from agents.reddit_scout.chat_agent import chat_agent
+from typing import Any
 
-__all__ = ['chat_agent'] 
\ No newline at end of file
+__all__ = ['chat_agent']
+
+def __getattr__(name: str) -> Any:
+    if name == 'chat_agent':
+        from agents.reddit_scout.chat_agent import chat_agent
+        return chat_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
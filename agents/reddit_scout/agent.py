@@ -1,10 +1,18 @@
 import os
-from typing import Dict, List, TypedDict
-from datetime import datetime
+import asyncio
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, TypedDict
 
-from google.adk.agents import Agent
-import praw
-from praw.exceptions import PRAWException
+from agents.common.cache import CACHE_CONFIG, get_listing_from_cache, save_listing_to_cache
+from agents.common.fanout import fetch_subreddits, fetch_subreddits_async
+from agents.common.metrics import time_reddit_fetch
+from agents.common.post_batch import PostBatch, to_post_lists
+from agents.common.post_store import POST_STORE_CONFIG, ingest_submissions, search_local_posts
+from agents.common.reddit_client import get_reddit_client
+from agents.common.singleflight import REDDIT_FETCHES, normalize_key
+from agents.reddit_scout.router import QUERY_ROUTER
+
+if TYPE_CHECKING:
+    import praw
 
 class RedditPost(TypedDict):
     title: str
@@ -34,6 +42,94 @@ RELEVANT_SUBREDDITS = [
     "iwantoutjobs"         # Jobs for immigration
 ]
 
+# Read search/hot listings through the shared listing cache (and let the
+# prewarmer fill it) unless REDDIT_SCOUT_CACHE=false
+USE_LISTING_CACHE = os.getenv("REDDIT_SCOUT_CACHE", "true").lower() == "true"
+
+def fetch_subreddit_posts(reddit: "praw.Reddit", sub_name: str, query: str, limit: int) -> PostBatch:
+    """
+    Search (or list hot posts from) a single subreddit.
+
+    With the listing cache enabled, cached listings are served directly
+    (stale ones are refreshed in the background) and only misses go to
+    Reddit.
+    """
+    if USE_LISTING_CACHE:
+        listing = "search" if query else "hot"
+        cached = get_listing_from_cache(
+            sub_name,
+            limit,
+            listing,
+            query,
+            refresh=lambda: refresh_subreddit_posts(get_reddit_client(), sub_name, query, limit),
+        )
+        if cached is not None:
+            return cached.data
+    return refresh_subreddit_posts(reddit, sub_name, query, limit)[:limit]
+
+def refresh_subreddit_posts(reddit: "praw.Reddit", sub_name: str, query: str, limit: int) -> PostBatch:
+    """
+    Fetch a subreddit listing from Reddit, bypassing the cache, and store it.
+
+    Identical fetches already in flight (from another session, say) are
+    joined rather than repeated. When caching, at least
+    CACHE_CONFIG.listing_limit posts are requested so the stored listing
+    can serve other limits; this may return more than `limit` posts.
+    """
+    listing = "search" if query else "hot"
+    fetch_limit = max(limit, CACHE_CONFIG.listing_limit) if USE_LISTING_CACHE else limit
+
+    def fetch() -> PostBatch:
+        sub = reddit.subreddit(sub_name)
+        with time_reddit_fetch(sub_name, listing):
+            posts = list(sub.search(query, limit=fetch_limit) if query else sub.hot(limit=fetch_limit))
+        ingest_submissions(posts, sub_name)
+        post_info = PostBatch.from_submissions(posts, sub_name)
+        if USE_LISTING_CACHE:
+            save_listing_to_cache(sub_name, post_info, fetch_limit, listing, query)
+        return post_info
+
+    return REDDIT_FETCHES.do(normalize_key(listing, sub_name, query, fetch_limit), fetch)
+
+def plan_search(query: str, subreddit: str, limit: int) -> Tuple[Optional[Dict[str, List[RedditPost]]], List[str]]:
+    """
+    Decide how to answer a get_reddit_posts call.
+
+    Returns (results, []) when the local index answers it, otherwise
+    (None, subreddits) with the subreddits to fetch live.
+    """
+    # Remove 'r/' prefix if present in the subreddit name
+    subreddit = subreddit.replace('r/', '')
+
+    subreddits_to_search = [subreddit] if subreddit != "all" and subreddit in RELEVANT_SUBREDDITS else RELEVANT_SUBREDDITS
+
+    # Answer searches from the local full-text index when it has enough matches
+    if query and POST_STORE_CONFIG.retrieval_mode != "live":
+        local_only = POST_STORE_CONFIG.retrieval_mode == "local"
+        local_results = search_local_posts(query, subreddits_to_search, limit, min_hits=1 if local_only else None)
+        if local_results:
+            return to_post_lists(local_results), []
+        if local_only:
+            return {"info": [{"title": "No relevant posts found", "url": "", "score": 0, "num_comments": 0, "created_utc": "", "flair": "", "selftext": "", "subreddit": ""}]}, []
+
+    # Search only the subreddits the question is about, unless the caller
+    # named one; falls back to all of them when routing is unsure
+    if subreddit == "all":
+        subreddits_to_search = QUERY_ROUTER.route(query, subreddits_to_search)
+
+    return None, subreddits_to_search
+
+def make_fetch_one(reddit: "praw.Reddit", query: str, limit: int) -> Callable[[str], PostBatch]:
+    """Per-subreddit fetch for the fan-out; errors skip the subreddit."""
+    def fetch_one(sub_name: str) -> PostBatch:
+        try:
+            return fetch_subreddit_posts(reddit, sub_name, query, limit)
+        except Exception as e:
+            print(f"Warning: Error fetching from r/{sub_name}: {e}")
+            return PostBatch()
+
+    return fetch_one
+
 def get_reddit_posts(query: str = "", subreddit: str = "all", limit: int = 15) -> Dict[str, List[RedditPost]]:
     """
     Fetches visa, passport, and citizenship-related posts from relevant subreddits.
@@ -47,74 +143,49 @@ def get_reddit_posts(query: str = "", subreddit: str = "all", limit: int = 15) -
         Dict[str, List[RedditPost]]: A dictionary mapping subreddit names to lists of posts
     """
     try:
-        client_id = os.environ.get("REDDIT_CLIENT_ID")
-        client_secret = os.environ.get("REDDIT_CLIENT_SECRET")
-        user_agent = os.environ.get("REDDIT_USER_AGENT")
-
-        if not all([client_id, client_secret, user_agent]):
-            missing_creds = []
-            if not client_id:
-                missing_creds.append("REDDIT_CLIENT_ID")
-            if not client_secret:
-                missing_creds.append("REDDIT_CLIENT_SECRET")
-            if not user_agent:
-                missing_creds.append("REDDIT_USER_AGENT")
-            raise ValueError(f"Missing Reddit API credentials: {', '.join(missing_creds)}")
-
-        reddit = praw.Reddit(
-            client_id=client_id,
-            client_secret=client_secret,
-            user_agent=user_agent,
-        )
+        local_results, subreddits_to_search = plan_search(query, subreddit, limit)
+        if local_results is not None:
+            return local_results
 
-        # Test the Reddit connection
-        try:
-            reddit.user.me()
-        except Exception as e:
-            raise ConnectionError(f"Failed to connect to Reddit API: {str(e)}")
-
-        # Remove 'r/' prefix if present in the subreddit name
-        subreddit = subreddit.replace('r/', '')
-
-        results = {}
-        subreddits_to_search = [subreddit] if subreddit != "all" and subreddit in RELEVANT_SUBREDDITS else RELEVANT_SUBREDDITS
-
-        for sub_name in subreddits_to_search:
-            try:
-                sub = reddit.subreddit(sub_name)
-                posts = list(sub.search(query, limit=limit)) if query else list(sub.hot(limit=limit))
-                
-                if posts:
-                    post_info = []
-                    for post in posts:
-                        post_date = datetime.fromtimestamp(post.created_utc).strftime('%Y-%m-%d')
-                        post_info.append({
-                            "title": post.title,
-                            "url": f"https://reddit.com{post.permalink}",
-                            "score": post.score,
-                            "num_comments": post.num_comments,
-                            "created_utc": post_date,
-                            "flair": post.link_flair_text or "",
-                            "selftext": post.selftext[:500] + "..." if len(post.selftext) > 500 else post.selftext,
-                            "subreddit": sub_name
-                        })
-                    if post_info:  # Only add subreddits that have matching posts
-                        results[sub_name] = post_info
-            except Exception as e:
-                print(f"Warning: Error fetching from r/{sub_name}: {e}")
-                continue
-
-        return results if results else {"info": [{"title": "No relevant posts found", "url": "", "score": 0, "num_comments": 0, "created_utc": "", "flair": "", "selftext": "", "subreddit": ""}]}
+        # Shared client; raises ValueError if credentials are missing. Its
+        # connectivity check runs once in the background, not per request.
+        reddit = get_reddit_client()
+
+        # Subreddits run concurrently under a total deadline; only those that
+        # returned matching posts in time end up in the results
+        results = fetch_subreddits(make_fetch_one(reddit, query, limit), subreddits_to_search)
+        QUERY_ROUTER.record(query, subreddits_to_search, results)
+
+        # Posts travel as PostBatches up to here and become RedditPost dicts only in the tool's result
+        return to_post_lists(results) if results else {"info": [{"title": "No relevant posts found", "url": "", "score": 0, "num_comments": 0, "created_utc": "", "flair": "", "selftext": "", "subreddit": ""}]}
+
+    except Exception as e:
+        raise Exception(f"Error fetching Reddit posts: {str(e)}")
+
+async def get_reddit_posts_async(query: str = "", subreddit: str = "all", limit: int = 15) -> Dict[str, List[RedditPost]]:
+    """
+    Async version of get_reddit_posts for callers on an event loop.
+
+    Local index and routing lookups run in a worker thread, and the live
+    fan-out uses the process-wide async fetch pool, so the loop is never
+    blocked. Cancelling the caller cancels fetches that have not started.
+    """
+    try:
+        local_results, subreddits_to_search = await asyncio.to_thread(plan_search, query, subreddit, limit)
+        if local_results is not None:
+            return local_results
+
+        reddit = get_reddit_client()
+        results = await fetch_subreddits_async(make_fetch_one(reddit, query, limit), subreddits_to_search)
+        await asyncio.to_thread(QUERY_ROUTER.record, query, subreddits_to_search, results)
+
+        return to_post_lists(results) if results else {"info": [{"title": "No relevant posts found", "url": "", "score": 0, "num_comments": 0, "created_utc": "", "flair": "", "selftext": "", "subreddit": ""}]}
 
     except Exception as e:
         raise Exception(f"Error fetching Reddit posts: {str(e)}")
 
 # Define the Agent with proper ADK setup
-agent = Agent(
-    name="reddit_scout",
-    model="gemini-2.0-flash",
-    description="An AI agent specialized in finding and analyzing Reddit discussions about visas, passports, and immigration",
-    instruction="""You are an AI agent that helps users find relevant information about visas, passports, and immigration from Reddit discussions. Your goal is to provide helpful, accurate information while being clear about the community-sourced nature of the data.
+AGENT_INSTRUCTION = """You are an AI agent that helps users find relevant information about visas, passports, and immigration from Reddit discussions. Your goal is to provide helpful, accurate information while being clear about the community-sourced nature of the data.
 
 When interacting with users:
 
@@ -152,6 +223,24 @@ Remember:
 - Focus on factual information
 - Provide balanced perspectives
 - Always encourage official verification
-""",
-    tools=[get_reddit_posts]
-)
\ No newline at end of file
+"""
+
+def create_agent() -> Any:
+    """Build the ADK agent; google.adk is only imported here."""
+    from google.adk.agents import Agent
+
+    return Agent(
+        name="reddit_scout",
+        model="gemini-2.0-flash",
+        description="An AI agent specialized in finding and analyzing Reddit discussions about visas, passports, and immigration",
+        instruction=AGENT_INSTRUCTION,
+        tools=[get_reddit_posts]
+    )
+
+def __getattr__(name: str) -> Any:
+    # The ADK agent is built when first accessed (e.g. by `adk run`), not on import,
+    # so the chat app can use get_reddit_posts without loading google.adk
+    if name in ("agent", "root_agent"):
+        agent = globals()["agent"] = globals()["root_agent"] = create_agent()
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
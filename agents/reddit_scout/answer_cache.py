@@ -0,0 +1,155 @@
+"""
+Persistent cache of chat answers.
+
+An answer is reused only when the normalized question, the model and the
+posts that went into the prompt (their URLs and scores) all match, so it
+is invalidated automatically as soon as retrieval returns different posts
+or the posts' scores move.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from agents.common.cache_backends import SQLiteCacheBackend
+from agents.common.metrics import METRICS
+from agents.common.post_store import POST_STORE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class AnswerCacheConfig:
+    """Configuration for the chat answer cache."""
+    enabled: bool
+    path: Path
+    ttl: int
+    max_size_mb: int
+
+def get_answer_cache_config() -> AnswerCacheConfig:
+    """Get answer cache configuration from environment variables with defaults."""
+    enabled = os.getenv("CHAT_ANSWER_CACHE", "true").lower() == "true"
+    path = Path(os.getenv("CHAT_ANSWER_CACHE_PATH", str(POST_STORE_CONFIG.path.parent / "answers.sqlite3")))
+    ttl = int(os.getenv("CHAT_ANSWER_TTL", "21600"))  # 6 hours
+    max_size_mb = int(os.getenv("CHAT_ANSWER_CACHE_MB", "50"))
+
+    return AnswerCacheConfig(enabled, path, ttl, max_size_mb)
+
+ANSWER_CACHE_CONFIG = get_answer_cache_config()
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?!. ")
+
+def posts_fingerprint(posts: List[Dict[str, Any]]) -> str:
+    """Hash of the URLs and scores of the posts used, independent of their order."""
+    digest = hashlib.sha256()
+    for url, score in sorted((post["url"], post["score"]) for post in posts):
+        digest.update(f"{url}\t{score}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def get_answer_key(question: str, model_name: str, posts: List[Dict[str, Any]]) -> str:
+    """Cache key for an answer: normalized question, model and post fingerprint."""
+    key_data = json.dumps([normalize_question(question), model_name, posts_fingerprint(posts)])
+    return hashlib.sha256(key_data.encode("utf-8")).hexdigest()[:32]
+
+class AnswerCache:
+    """SQLite-backed answer cache with a TTL and a size bound (LRU eviction)."""
+    def __init__(self, config: AnswerCacheConfig):
+        self.config = config
+        self._backend: Optional[SQLiteCacheBackend] = None
+        self._lock = threading.Lock()
+        # get/put run concurrently from worker threads, so counters need their own lock
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    def _get_backend(self) -> SQLiteCacheBackend:
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self.config.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._backend = SQLiteCacheBackend(self.config.path)
+        return self._backend
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached answer for key, or None."""
+        if not self.config.enabled:
+            return None
+        try:
+            blob = self._get_backend().get(key)
+        except Exception as e:
+            logger.error(f"Answer cache read error: {e}")
+            self._count("errors")
+            return None
+        if blob is None:
+            self._count("misses")
+            return None
+        try:
+            answer = json.loads(blob.decode("utf-8"))["answer"]
+        except (UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+            # A corrupt entry is a miss; drop it so the fresh answer replaces it
+            logger.warning(f"Discarding corrupt answer cache entry {key}: {e}")
+            self._count("errors", "misses")
+            self._delete(key)
+            return None
+        self._count("hits")
+        return answer
+
+    def put(self, key: str, answer: str) -> None:
+        """Store an answer, then evict expired and least recently used answers over the size bound."""
+        if not self.config.enabled:
+            return
+        try:
+            backend = self._get_backend()
+            now = time.time()
+            blob = json.dumps({"answer": answer, "timestamp": now}).encode("utf-8")
+            backend.put(key, blob, now + self.config.ttl)
+            backend.expire(now)
+            backend.evict_to(self.config.max_size_mb * 1024 * 1024)
+            self._count("stores")
+        except Exception as e:
+            logger.error(f"Answer cache write error: {e}")
+            self._count("errors")
+
+    def clear(self) -> None:
+        """Drop every cached answer."""
+        try:
+            self._get_backend().expire(float("inf"))
+        except Exception as e:
+            logger.error(f"Answer cache clear error: {e}")
+            self._count("errors")
+
+    def _delete(self, key: str) -> None:
+        try:
+            self._get_backend().delete(key)
+        except Exception as e:
+            logger.error(f"Answer cache delete error: {e}")
+            self._count("errors")
+
+    def _count(self, *counters: str) -> None:
+        with self._stats_lock:
+            for counter in counters:
+                setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "errors": self.errors,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0,
+            }
+
+ANSWER_CACHE = AnswerCache(ANSWER_CACHE_CONFIG)
+METRICS.register_collector("reddit_scout_answer_cache", ANSWER_CACHE.get_stats)
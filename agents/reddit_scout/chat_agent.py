@@ -1,16 +1,48 @@
-from typing import Dict, List
-from .agent import get_reddit_posts
-import google.generativeai as genai
+import time
+import asyncio
+import weakref
+import functools
+import threading
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+from agents.common.event_loop import BACKGROUND_LOOP
+from agents.common.metrics import METRICS_CONFIG, StageTimer
+from agents.common.post_batch import to_post_lists
+from agents.common.post_store import search_local_posts
+from agents.common.reddit_client import load_env
+from .agent import RELEVANT_SUBREDDITS, get_reddit_posts, get_reddit_posts_async
+from .answer_cache import ANSWER_CACHE, get_answer_key
+from .context import BuiltContext, build_context
+from .semantic_cache import SEMANTIC_CACHE
 import os
 import re
 
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = 'gemini-2.0-flash'
+
+_genai = None
+_genai_lock = threading.Lock()
+
+def get_genai() -> Any:
+    """Import and configure the Gemini SDK on first use rather than at import time."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                load_env()
+                genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+                _genai = genai
+    return _genai
+
 class ChatAgent:
     def __init__(self):
-        # Initialize Gemini
-        genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+        # The Gemini model is created on first use (see `model`)
         
-        # Initialize the model with the correct version
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        # The async Gemini client binds to the event loop that first uses it,
+        # so async calls get a model instance per loop
+        self._async_models = weakref.WeakKeyDictionary()
         
         # Define greeting patterns
         self.greeting_patterns = [
@@ -53,6 +85,11 @@ Remember:
 - Always encourage official verification
 """
 
+    @functools.cached_property
+    def model(self):
+        """The Gemini model, with the correct version."""
+        return get_genai().GenerativeModel(MODEL_NAME)
+    
     def is_greeting(self, message: str) -> bool:
         """Check if the message is a simple greeting."""
         message = message.lower().strip()
@@ -70,45 +107,185 @@ You can ask me questions like:
 
 What would you like to know about?"""
     
+    def build_prompt(self, message: str, timer: Optional[StageTimer] = None) -> BuiltContext:
+        """Retrieve Reddit posts for the message and build the model prompt from them."""
+        timer = timer or StageTimer()
+        # For actual queries, get relevant Reddit posts
+        with timer.stage("retrieval"):
+            posts = get_reddit_posts(query=message)
+        
+        # Keep the most relevant posts that fit the prompt's token budget
+        with timer.stage("prompt_build"):
+            return build_context(self.instruction, message, posts)
+    
+    async def build_prompt_async(self, message: str, timer: Optional[StageTimer] = None) -> BuiltContext:
+        """Async version of build_prompt."""
+        timer = timer or StageTimer()
+        with timer.stage("retrieval"):
+            posts = await get_reddit_posts_async(query=message)
+        with timer.stage("prompt_build"):
+            return build_context(self.instruction, message, posts)
+    
+    def local_prompt_posts(self, message: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        The posts the local index alone would put in the prompt for message,
+        or None if it has none; for checking semantic cache hits.
+
+        Makes no Reddit requests and records neither routing nor context stats.
+        """
+        local_results = search_local_posts(message, RELEVANT_SUBREDDITS, 15, min_hits=1)
+        if local_results is None:
+            return None
+        return build_context(self.instruction, message, to_post_lists(local_results), record=False).posts
+    
+    def answer_key(self, message: str, built: BuiltContext) -> str:
+        """Answer cache key: same question, same model and same posts give the same answer."""
+        return get_answer_key(message, MODEL_NAME, built.posts)
+    
+    def semantic_lookup(self, message: str):
+        """Return the answer to an already answered, similar question, if any."""
+        hit = SEMANTIC_CACHE.lookup(message)
+        if hit is not None:
+            SEMANTIC_CACHE.maybe_verify(message, hit, self.local_prompt_posts)
+        return hit
+    
+    def remember_answer(self, message: str, built: BuiltContext, cache_key: str, answer: str) -> None:
+        ANSWER_CACHE.put(cache_key, answer)
+        SEMANTIC_CACHE.add(message, answer, built.posts)
+    
+    def finish_turn(self, timer: StageTimer) -> None:
+        """Record the turn's total time; slow turns log which stage the time went to."""
+        total = timer.finish()
+        if total >= METRICS_CONFIG.slow_turn:
+            logger.warning(f"Slow chat turn ({total:.2f}s): {timer.breakdown()}")
+    
+    def async_model(self):
+        """The Gemini model instance for the running event loop."""
+        loop = asyncio.get_running_loop()
+        model = self._async_models.get(loop)
+        if model is None:
+            model = self._async_models[loop] = get_genai().GenerativeModel(MODEL_NAME)
+        return model
+    
     def generate_response(self, message: str) -> str:
+        """Answer a message; a blocking wrapper around generate_response_async."""
+        return BACKGROUND_LOOP.run(self.generate_response_async(message))
+    
+    async def generate_response_async(self, message: str) -> str:
+        """
+        Answer a message without blocking the event loop.
+        
+        Cache lookups and writes run in worker threads, Reddit fetches on the
+        shared async fetch pool and the model call on the async Gemini
+        client, so a turn holds no thread while it waits and many sessions
+        can share one loop. Cancelling the task (say, when the user leaves)
+        stops the turn at its next await and drops fetches not yet started.
+        
+        The Streamlit app does not use this path: it streams through the
+        synchronous stream_response, which cannot be cancelled mid-turn.
+        """
+        timer = StageTimer()
         try:
             # Check if it's a simple greeting
             if self.is_greeting(message):
                 return self.get_greeting_response()
             
-            # For actual queries, get relevant Reddit posts
-            posts = get_reddit_posts(query=message)
+            # A rephrasing of a recent question reuses its answer without any fetch
+            with timer.stage("semantic_lookup"):
+                hit = await asyncio.to_thread(self.semantic_lookup, message)
+            if hit is not None:
+                return hit.answer
             
-            # Format the posts for the agent
-            formatted_posts = []
-            for subreddit, post_list in posts.items():
-                for post in post_list:
-                    formatted_posts.append(
-                        f"[r/{post['subreddit']}] {post['title']}\n"
-                        f"Score: {post['score']} | Comments: {post['num_comments']} | Date: {post['created_utc']}\n"
-                        f"URL: {post['url']}\n"
-                        f"Content: {post['selftext']}\n"
-                    )
+            built = await self.build_prompt_async(message, timer)
             
-            # Create context for the agent
-            context = f"""Instructions: {self.instruction}
-
-Based on the user's question: "{message}", here are relevant Reddit posts:
-
-{chr(10).join(formatted_posts)}
-
-Please analyze these posts and provide a helpful response following the instructions."""
+            # Reuse the answer if this question was answered from the same posts
+            cache_key = self.answer_key(message, built)
+            with timer.stage("answer_cache"):
+                cached = await asyncio.to_thread(ANSWER_CACHE.get, cache_key)
+            if cached is not None:
+                return cached
             
             # Generate response using the model
-            response = self.model.generate_content(context)
+            with timer.stage("gemini"):
+                response = await self.async_model().generate_content_async(built.prompt)
             
             if response.text:
+                await asyncio.to_thread(self.remember_answer, message, built, cache_key, response.text)
                 return response.text
             else:
                 return "I apologize, but I couldn't generate a response. Please try rephrasing your question."
         
         except Exception as e:
             return f"I encountered an error while processing your request: {str(e)}"
+        
+        finally:
+            self.finish_turn(timer)
+    
+    def stream_response(self, message: str) -> Iterator[str]:
+        """
+        Like generate_response, but yield the answer in chunks as the model produces them.
+        
+        This is the synchronous path the Streamlit app uses; it runs on the
+        calling thread and is not cancelled if the user leaves mid-answer.
+        
+        Errors are yielded as text too, so callers can render whatever
+        arrives without special cases.
+        """
+        produced = False
+        timer = StageTimer()
+        try:
+            if self.is_greeting(message):
+                yield self.get_greeting_response()
+                return
+            
+            with timer.stage("semantic_lookup"):
+                hit = self.semantic_lookup(message)
+            if hit is not None:
+                yield hit.answer
+                return
+            
+            built = self.build_prompt(message, timer)
+            
+            cache_key = self.answer_key(message, built)
+            with timer.stage("answer_cache"):
+                cached = ANSWER_CACHE.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+            
+            chunks = []
+            # Only time spent waiting on the model counts, not the caller's rendering between chunks
+            gemini_time = 0.0
+            start = time.perf_counter()
+            stream = iter(self.model.generate_content(built.prompt, stream=True))
+            while True:
+                chunk = next(stream, None)
+                gemini_time += time.perf_counter() - start
+                if chunk is None:
+                    break
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. safety metadata only)
+                    text = None
+                if text:
+                    produced = True
+                    chunks.append(text)
+                    yield text
+                start = time.perf_counter()
+            timer.record("gemini", gemini_time)
+            
+            if produced:
+                self.remember_answer(message, built, cache_key, "".join(chunks))
+            else:
+                yield "I apologize, but I couldn't generate a response. Please try rephrasing your question."
+        
+        except Exception as e:
+            separator = "\n\n" if produced else ""
+            yield f"{separator}I encountered an error while processing your request: {str(e)}"
+        
+        finally:
+            self.finish_turn(timer)
 
 # Create a singleton instance
 chat_agent = ChatAgent() 
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""
+Prompt context builder for the chat agent.
+
+A chat turn can retrieve up to 14 subreddits x 15 posts. Rather than paste
+all of them into the prompt, posts are deduplicated, ranked by query
+relevance, score, comment count and recency, and added best-first until
+the prompt reaches its token budget.
+"""
+
+import os
+import math
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from agents.common.metrics import METRICS
+from agents.common.post_store import tokenize_query
+
+@dataclass
+class ContextConfig:
+    """Configuration for prompt context building."""
+    token_budget: int
+    max_posts: int
+    chars_per_token: float
+    relevance_weight: float
+    score_weight: float
+    comments_weight: float
+    recency_weight: float
+    recency_half_life_days: float
+
+def get_context_config() -> ContextConfig:
+    """Get context configuration from environment variables with defaults."""
+    token_budget = int(os.getenv("CHAT_CONTEXT_TOKENS", "6000"))  # whole prompt, instructions included
+    max_posts = int(os.getenv("CHAT_CONTEXT_MAX_POSTS", "30"))
+    chars_per_token = float(os.getenv("CHAT_CHARS_PER_TOKEN", "4"))  # rough estimate for English text
+    relevance_weight = float(os.getenv("CHAT_RANK_RELEVANCE", "0.5"))
+    score_weight = float(os.getenv("CHAT_RANK_SCORE", "0.2"))
+    comments_weight = float(os.getenv("CHAT_RANK_COMMENTS", "0.15"))
+    recency_weight = float(os.getenv("CHAT_RANK_RECENCY", "0.15"))
+    recency_half_life_days = float(os.getenv("CHAT_RECENCY_HALF_LIFE_DAYS", "90"))
+
+    return ContextConfig(
+        token_budget,
+        max_posts,
+        chars_per_token,
+        relevance_weight,
+        score_weight,
+        comments_weight,
+        recency_weight,
+        recency_half_life_days,
+    )
+
+CONTEXT_CONFIG = get_context_config()
+
+@dataclass
+class BuiltContext:
+    """A prompt plus what went into it."""
+    prompt: str
+    posts_considered: int
+    posts_included: int
+    prompt_tokens: int
+    posts: List[Dict[str, Any]]
+
+class ContextStats:
+    """Track prompt sizes and how many posts make it into them."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.posts_considered = 0
+        self.posts_included = 0
+        self.prompt_chars = 0
+        self.prompt_tokens = 0
+        self.last: Dict[str, int] = {}
+
+    def record(self, built: BuiltContext) -> None:
+        with self._lock:
+            self.prompts += 1
+            self.posts_considered += built.posts_considered
+            self.posts_included += built.posts_included
+            self.prompt_chars += len(built.prompt)
+            self.prompt_tokens += built.prompt_tokens
+            self.last = {
+                "posts_considered": built.posts_considered,
+                "posts_included": built.posts_included,
+                "prompt_chars": len(built.prompt),
+                "prompt_tokens": built.prompt_tokens,
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            prompts = max(self.prompts, 1)
+            return {
+                "prompts": self.prompts,
+                "posts_considered": self.posts_considered,
+                "posts_included": self.posts_included,
+                "avg_prompt_tokens": self.prompt_tokens / prompts,
+                "avg_prompt_chars": self.prompt_chars / prompts,
+                "inclusion_rate": self.posts_included / max(self.posts_considered, 1),
+                "last": dict(self.last),
+            }
+
+CONTEXT_STATS = ContextStats()
+METRICS.register_collector("reddit_scout_context", CONTEXT_STATS.get_stats)
+
+def estimate_tokens(text: str, config: Optional[ContextConfig] = None) -> int:
+    config = config or CONTEXT_CONFIG
+    return int(math.ceil(len(text) / config.chars_per_token))
+
+def format_post(post: Dict[str, Any]) -> str:
+    """Render one post the way the prompt presents it."""
+    return (
+        f"[r/{post['subreddit']}] {post['title']}\n"
+        f"Score: {post['score']} | Comments: {post['num_comments']} | Date: {post['created_utc']}\n"
+        f"URL: {post['url']}\n"
+        f"Content: {post['selftext']}\n"
+    )
+
+def _age_days(created: Any, now: datetime) -> Optional[float]:
+    """Age of a post in days; created_utc is a 'YYYY-MM-DD' string in RedditPost dicts."""
+    try:
+        if isinstance(created, (int, float)):
+            created_at = datetime.fromtimestamp(created)
+        else:
+            created_at = datetime.strptime(str(created), '%Y-%m-%d')
+    except (ValueError, OverflowError, OSError):
+        return None
+    return max((now - created_at).total_seconds() / 86400, 0.0)
+
+def rank_posts(query: str, posts: List[Dict[str, Any]], config: Optional[ContextConfig] = None) -> List[Dict[str, Any]]:
+    """
+    Order posts best-first for the prompt.
+
+    Relevance is the share of query terms found in the post (title matches
+    count double). Score and comment count are log-scaled against the best
+    post in the batch, and recency decays with a configurable half-life.
+    """
+    config = config or CONTEXT_CONFIG
+    terms = set(tokenize_query(query))
+    max_score = max((math.log1p(max(post["score"], 0)) for post in posts), default=0.0) or 1.0
+    max_comments = max((math.log1p(max(post["num_comments"], 0)) for post in posts), default=0.0) or 1.0
+    now = datetime.now()
+
+    def rank(post: Dict[str, Any]) -> float:
+        if terms:
+            title_terms = set(tokenize_query(post["title"])) & terms
+            body_terms = set(tokenize_query(post["selftext"])) & terms
+            relevance = (2 * len(title_terms) + len(body_terms)) / (3 * len(terms))
+        else:
+            relevance = 0.0
+        age = _age_days(post["created_utc"], now)
+        recency = 0.0 if age is None else 0.5 ** (age / config.recency_half_life_days)
+        return (
+            config.relevance_weight * relevance
+            + config.score_weight * math.log1p(max(post["score"], 0)) / max_score
+            + config.comments_weight * math.log1p(max(post["num_comments"], 0)) / max_comments
+            + config.recency_weight * recency
+        )
+
+    return sorted(posts, key=rank, reverse=True)
+
+def build_context(
+    instruction: str,
+    message: str,
+    posts: Dict[str, List[Dict[str, Any]]],
+    config: Optional[ContextConfig] = None,
+    record: bool = True,
+) -> BuiltContext:
+    """
+    Build the chat prompt from get_reddit_posts results within the token budget.
+
+    Info/error entries (no URL) and posts seen in several subreddits are
+    dropped; the rest are added best-first, skipping any post too large
+    for the budget that is left. Pass record=False for prompts that are
+    not sent, to keep them out of the context stats.
+    """
+    config = config or CONTEXT_CONFIG
+    seen = set()
+    candidates = []
+    for post_list in posts.values():
+        for post in post_list:
+            if not post.get("url") or post["url"] in seen:
+                continue
+            seen.add(post["url"])
+            candidates.append(post)
+
+    header = f"""Instructions: {instruction}
+
+Based on the user's question: "{message}", here are relevant Reddit posts:
+
+"""
+    footer = "\nPlease analyze these posts and provide a helpful response following the instructions."
+    remaining = config.token_budget - estimate_tokens(header + footer, config)
+
+    parts = [header]
+    included = []
+    for post in rank_posts(message, candidates, config):
+        if len(included) >= config.max_posts:
+            break
+        block = format_post(post) + "\n"
+        cost = estimate_tokens(block, config)
+        if cost > remaining:
+            continue
+        parts.append(block)
+        remaining -= cost
+        included.append(post)
+    parts.append(footer)
+
+    prompt = "".join(parts)
+    built = BuiltContext(prompt, len(candidates), len(included), estimate_tokens(prompt, config), included)
+    if record:
+        CONTEXT_STATS.record(built)
+    return built
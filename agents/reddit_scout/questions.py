@@ -0,0 +1,18 @@
+"""
+Popular questions offered in the app sidebar.
+
+Kept here rather than in app.py so the cache prewarmer can import them.
+"""
+
+EXAMPLE_QUESTIONS = [
+    "What are the requirements for a US tourist visa?",
+    "How to apply for Schengen visa?",
+    "Digital nomad visa options",
+    "Canada Express Entry points calculator",
+    "Portugal D7 visa requirements",
+    "UK skilled worker visa process",
+    "Australian PR pathways",
+    "Dubai golden visa eligibility",
+    "Estonia e-Residency benefits",
+    "Singapore work visa types"
+]
@@ -0,0 +1,215 @@
+"""
+Query routing for live Reddit searches.
+
+Instead of searching every relevant subreddit for every question, a
+question is matched against per-subreddit country and visa-type keyword
+lists, plus hit rates learned from earlier searches (how often a
+subreddit returned posts for questions sharing a term). Only the top N
+subreddits are searched; when nothing scores high enough the search
+falls back to every subreddit, and those results feed the learned rates.
+"""
+
+import os
+import re
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from agents.common.metrics import METRICS
+from agents.common.post_store import get_post_store, tokenize_query
+
+logger = logging.getLogger(__name__)
+
+# Keywords and phrases (lowercase, matched on whole words) that point a question at a subreddit
+SUBREDDIT_KEYWORDS: Dict[str, List[str]] = {
+    "immigration": [
+        "immigration", "immigrate", "immigrant", "permanent residency", "permanent resident", "pr",
+        "express entry", "canada", "canadian", "australia", "australian", "new zealand", "asylum",
+        "deportation",
+    ],
+    "USCIS": [
+        "uscis", "green card", "h1b", "h 1b", "i 485", "i 130", "i 140", "n 400", "ead", "opt",
+        "f1", "us citizenship", "us visa", "united states", "usa", "america", "naturalization",
+        "adjustment of status", "biometrics", "us tourist", "b1 b2", "b2", "esta",
+    ],
+    "visas": [
+        "tourist visa", "student visa", "work visa", "visa application", "visa interview",
+        "visa refusal", "visa denied", "visa types", "visa options",
+    ],
+    "IWantOut": [
+        "move", "moving", "relocate", "relocation", "emigrate", "leave", "abroad", "portugal",
+        "spain", "netherlands", "ireland", "new country",
+    ],
+    "PassportPorn": [
+        "passport", "passports", "passport ranking", "passport power", "visa free", "strongest passport",
+    ],
+    "expats": [
+        "expat", "expats", "living abroad", "living in", "cost of living", "retire abroad", "retirement",
+        "d7", "passive income", "dubai", "uae", "singapore", "thailand", "mexico",
+    ],
+    "Schengen": [
+        "schengen", "europe", "eu", "european", "france", "italy", "greece", "90 180", "short stay",
+        "etias", "travel insurance",
+    ],
+    "ukvisa": [
+        "uk", "united kingdom", "britain", "british", "england", "scotland", "london", "skilled worker",
+        "ilr", "indefinite leave", "brp", "home office", "spouse visa", "graduate route",
+    ],
+    "GermanCitizenship": [
+        "german", "germany", "einbuergerung", "einburgerung", "staatsangehoerigkeit", "berlin",
+        "german citizenship", "german passport",
+    ],
+    "dualcitizenship": [
+        "dual citizenship", "dual citizen", "dual nationality", "second citizenship", "second passport",
+        "renounce", "descent", "ancestry", "jus sanguinis", "citizenship by descent",
+    ],
+    "goldenvisa": [
+        "golden visa", "golden visas", "investment", "investor", "investor visa", "residency by investment",
+        "citizenship by investment", "cbi", "rbi", "real estate", "portugal", "greece", "malta",
+    ],
+    "digitalnomad": [
+        "digital nomad", "nomad", "nomad visa", "remote work", "remote worker", "remote", "freelance",
+        "freelancer", "d8", "coworking", "e residency", "estonia",
+    ],
+    "eupersonalfinance": [
+        "tax", "taxes", "bank", "banking", "bank account", "pension", "finance", "salary", "income",
+        "savings", "proof of funds",
+    ],
+    "iwantoutjobs": [
+        "job", "jobs", "job offer", "work abroad", "employer", "sponsorship", "sponsor", "hiring",
+        "recruiter", "work permit",
+    ],
+}
+
+# Broad subreddits that fill up a routed search when fewer than N subreddits match
+GENERAL_SUBREDDITS = ["immigration", "visas", "IWantOut"]
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+@dataclass
+class RouterConfig:
+    """Configuration for query routing."""
+    enabled: bool
+    top_n: int
+    min_confidence: float
+    learned_weight: float
+    min_trials: int
+
+def get_router_config() -> RouterConfig:
+    """Get router configuration from environment variables with defaults."""
+    enabled = os.getenv("REDDIT_ROUTING", "true").lower() == "true"
+    top_n = int(os.getenv("REDDIT_ROUTE_TOP_N", "4"))  # subreddits searched per routed question
+    min_confidence = float(os.getenv("REDDIT_ROUTE_MIN_CONFIDENCE", "1.0"))  # best score needed to route
+    learned_weight = float(os.getenv("REDDIT_ROUTE_LEARNED_WEIGHT", "1.0"))
+    min_trials = int(os.getenv("REDDIT_ROUTE_MIN_TRIALS", "3"))  # searches before a learned rate counts
+
+    return RouterConfig(enabled, top_n, min_confidence, learned_weight, min_trials)
+
+ROUTER_CONFIG = get_router_config()
+
+class QueryRouter:
+    """Ranks subreddits for a question and records which ones returned posts."""
+    def __init__(self, config: RouterConfig, keywords: Dict[str, List[str]]):
+        self.config = config
+        self.keywords = {sub_name: [f" {phrase} " for phrase in phrases] for sub_name, phrases in keywords.items()}
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.fallbacks = 0
+        self.subreddits_searched = 0
+        self.subreddits_available = 0
+
+    def score(self, query: str, subreddits: Sequence[str]) -> Dict[str, float]:
+        """
+        Routing score per subreddit.
+
+        Each matching keyword adds 1 (2 for multi-word phrases, which are
+        more specific). Learned rates add up to +/- learned_weight: a
+        subreddit that returned posts for every earlier question sharing
+        a term gains the full weight, one that never did loses it.
+        """
+        text = " " + " ".join(WORD_RE.findall(query.lower())) + " "
+        scores = {}
+        for sub_name in subreddits:
+            scores[sub_name] = float(sum(
+                2 if phrase.count(" ") > 2 else 1
+                for phrase in self.keywords.get(sub_name, [])
+                if phrase in text
+            ))
+
+        terms = tokenize_query(query)
+        if terms and self.config.learned_weight:
+            try:
+                stats = get_post_store().get_route_stats(terms)
+            except Exception as e:
+                logger.error(f"Route stats read error: {e}")
+                stats = {}
+            for sub_name in subreddits:
+                rates = [
+                    (hits + 1) / (trials + 2)
+                    for term in terms
+                    for hits, trials in [stats.get((term, sub_name), (0, 0))]
+                    if trials >= self.config.min_trials
+                ]
+                if rates:
+                    scores[sub_name] += self.config.learned_weight * (2 * sum(rates) / len(rates) - 1)
+        return scores
+
+    def select(self, query: str, subreddits: Sequence[str]) -> List[str]:
+        """The top N subreddits for a question, or [] if routing is unsure."""
+        if not self.config.enabled or not query or len(subreddits) <= self.config.top_n:
+            return []
+        scores = self.score(query, subreddits)
+        # Stable sort keeps the configured subreddit order among ties
+        ranked = sorted(subreddits, key=lambda sub_name: scores[sub_name], reverse=True)
+        if scores[ranked[0]] < self.config.min_confidence:
+            return []
+        selected = [sub_name for sub_name in ranked[:self.config.top_n] if scores[sub_name] > 0]
+        for sub_name in GENERAL_SUBREDDITS:
+            if len(selected) < self.config.top_n and sub_name in subreddits and sub_name not in selected:
+                selected.append(sub_name)
+        return selected
+
+    def route(self, query: str, subreddits: Sequence[str]) -> List[str]:
+        """The subreddits to search for a question: the top N, or all of them if routing is unsure."""
+        if not self.config.enabled or not query or len(subreddits) <= self.config.top_n:
+            return list(subreddits)
+        selected = self.select(query, subreddits)
+
+        with self._lock:
+            self.subreddits_available += len(subreddits)
+            if selected:
+                self.routed += 1
+                self.subreddits_searched += len(selected)
+            else:
+                self.fallbacks += 1
+                self.subreddits_searched += len(subreddits)
+        if not selected:
+            logger.info(f"Routing unsure for '{query}', searching all {len(subreddits)} subreddits")
+            return list(subreddits)
+        logger.info(f"Routed '{query}' to {', '.join(selected)}")
+        return selected
+
+    def record(self, query: str, searched: Sequence[str], results: Dict[str, List[Dict]]) -> None:
+        """Learn from a search: which of the searched subreddits returned posts."""
+        terms = tokenize_query(query)
+        if not terms or not self.config.enabled:
+            return
+        try:
+            get_post_store().record_route_results(terms, {sub_name: bool(results.get(sub_name)) for sub_name in searched})
+        except Exception as e:
+            logger.error(f"Route stats write error: {e}")
+
+    def get_stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            decisions = self.routed + self.fallbacks
+            return {
+                "routed": self.routed,
+                "fallbacks": self.fallbacks,
+                "routed_rate": self.routed / decisions if decisions > 0 else None,
+                "avg_subreddits_searched": self.subreddits_searched / decisions if decisions > 0 else None,
+                "fetch_reduction": 1 - self.subreddits_searched / self.subreddits_available if self.subreddits_available > 0 else None,
+            }
+
+QUERY_ROUTER = QueryRouter(ROUTER_CONFIG, SUBREDDIT_KEYWORDS)
+METRICS.register_collector("reddit_scout_router", QUERY_ROUTER.get_stats)
@@ -0,0 +1,338 @@
+"""
+Semantic cache of chat answers for rephrased questions.
+
+Questions are embedded locally as hashed word and character n-gram
+vectors, without calling an embedding API; stopwords and filler are
+dropped and plurals folded first, so "What are the requirements for the
+Portugal D7 visa?" and "portugal d7 visa requirement" land on the same
+vector. A lookup is a single matrix-vector product over every cached
+question; the nearest one is reused if its cosine similarity clears the
+threshold.
+
+As a guard, the distinctive terms of the two questions must also match
+exactly: countries (demonyms count as their country, so "German" and
+"Germany" match), visa codes and other numbers, and negations. However
+close their vectors are, "German"/"Austrian citizenship", "D7"/"D8" or
+"with"/"without a job offer" never share an answer.
+
+Precision is estimated by re-running retrieval against the local index
+for a sample of hits, on a small background pool, and checking that it
+returns mostly the same posts.
+"""
+
+import os
+import re
+import time
+import zlib
+import random
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, List, Optional
+
+from agents.common.metrics import METRICS
+from agents.common.post_store import STOPWORDS
+from agents.common.rate_limit import Priority, request_priority
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words that flip what a question asks; never treated as filler
+NEGATIONS = {"no", "not", "never", "without", "cannot", "cant", "dont", "doesnt", "isnt", "wont", "except"}
+
+# Filler that changes how a question is phrased but not what it asks
+QUESTION_STOPWORDS = (STOPWORDS | {
+    "about", "any", "anyone", "know", "need", "please", "should", "tell", "there", "would",
+}) - NEGATIONS
+
+# Countries and regions, with the names and demonyms (after plural folding) that refer to them
+COUNTRIES: Dict[str, List[str]] = {
+    "argentina": ["argentina", "argentinian", "argentine"],
+    "australia": ["australia", "australian", "aussie"],
+    "austria": ["austria", "austrian"],
+    "belgium": ["belgium", "belgian"],
+    "brazil": ["brazil", "brazilian"],
+    "canada": ["canada", "canadian"],
+    "china": ["china", "chinese"],
+    "colombia": ["colombia", "colombian"],
+    "croatia": ["croatia", "croatian"],
+    "cyprus": ["cyprus", "cypriot"],
+    "czechia": ["czechia", "czech"],
+    "denmark": ["denmark", "danish", "dane"],
+    "egypt": ["egypt", "egyptian"],
+    "estonia": ["estonia", "estonian"],
+    "eu": ["eu", "europe", "european", "schengen"],
+    "finland": ["finland", "finnish", "finn"],
+    "france": ["france", "french"],
+    "germany": ["germany", "german"],
+    "greece": ["greece", "greek"],
+    "hungary": ["hungary", "hungarian"],
+    "india": ["india", "indian"],
+    "indonesia": ["indonesia", "indonesian", "bali"],
+    "ireland": ["ireland", "irish"],
+    "israel": ["israel", "israeli"],
+    "italy": ["italy", "italian"],
+    "japan": ["japan", "japanese"],
+    "korea": ["korea", "korean"],
+    "malaysia": ["malaysia", "malaysian"],
+    "malta": ["malta", "maltese"],
+    "mexico": ["mexico", "mexican"],
+    "netherlands": ["netherland", "dutch", "holland"],
+    "new zealand": ["zealand", "nz", "kiwi"],
+    "nigeria": ["nigeria", "nigerian"],
+    "norway": ["norway", "norwegian"],
+    "pakistan": ["pakistan", "pakistani"],
+    "philippines": ["philippine", "filipino"],
+    "poland": ["poland", "polish"],
+    "portugal": ["portugal", "portuguese"],
+    "romania": ["romania", "romanian"],
+    "russia": ["russia", "russian"],
+    "singapore": ["singapore", "singaporean"],
+    "south africa": ["africa", "african"],
+    "spain": ["spain", "spanish"],
+    "sweden": ["sweden", "swedish", "swede"],
+    "switzerland": ["switzerland", "swiss"],
+    "thailand": ["thailand", "thai"],
+    "turkey": ["turkey", "turkish", "turkiye"],
+    "uae": ["uae", "emirate", "dubai"],
+    "uk": ["uk", "britain", "british", "england", "scotland", "wale"],
+    "ukraine": ["ukraine", "ukrainian"],
+    "usa": ["usa", "america", "american", "uscis"],
+    "vietnam": ["vietnam", "vietnamese"],
+}
+COUNTRY_TERMS = {alias: country for country, aliases in COUNTRIES.items() for alias in aliases}
+
+@dataclass
+class SemanticCacheConfig:
+    """Configuration for the semantic answer cache."""
+    enabled: bool
+    threshold: float
+    max_entries: int
+    ttl: int
+    dimensions: int
+    verify_rate: float
+    verify_overlap: float
+
+def get_semantic_cache_config() -> SemanticCacheConfig:
+    """Get semantic cache configuration from environment variables with defaults."""
+    enabled = os.getenv("CHAT_SEMANTIC_CACHE", "true").lower() == "true"
+    threshold = float(os.getenv("CHAT_SEMANTIC_THRESHOLD", "0.95"))  # minimum cosine similarity
+    max_entries = int(os.getenv("CHAT_SEMANTIC_MAX_ENTRIES", "2000"))
+    ttl = int(os.getenv("CHAT_SEMANTIC_TTL", "3600"))  # kept short: hits skip retrieval, so answers are not revalidated
+    dimensions = int(os.getenv("CHAT_SEMANTIC_DIMENSIONS", "2048"))
+    verify_rate = float(os.getenv("CHAT_SEMANTIC_VERIFY_RATE", "0.1"))  # share of hits re-checked
+    verify_overlap = float(os.getenv("CHAT_SEMANTIC_VERIFY_OVERLAP", "0.5"))  # Jaccard of post URLs
+
+    return SemanticCacheConfig(enabled, threshold, max_entries, ttl, dimensions, verify_rate, verify_overlap)
+
+SEMANTIC_CACHE_CONFIG = get_semantic_cache_config()
+
+def singular(word: str) -> str:
+    """Fold regular plurals ("requirements", "countries", "taxes") onto the singular."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def question_terms(question: str) -> List[str]:
+    """Content terms of a question: no stopwords or filler, plurals folded, countries canonical."""
+    terms = []
+    for token in TOKEN_RE.findall(question.lower()):
+        if token not in QUESTION_STOPWORDS:
+            term = singular(token)
+            terms.append(COUNTRY_TERMS.get(term, term))
+    return terms
+
+def distinctive_terms(terms: List[str]) -> FrozenSet[str]:
+    """
+    Terms that must match for two questions to share an answer: countries,
+    terms with digits (visa codes, form numbers, years) and negations.
+    """
+    distinctive = set()
+    for term in terms:
+        if term in COUNTRIES or term in NEGATIONS or any(char.isdigit() for char in term):
+            distinctive.add(term)
+    return frozenset(distinctive)
+
+def embed_question(question: str, dimensions: int) -> "np.ndarray":
+    """
+    Unit-length hashed feature vector of a question.
+
+    Features are whole words (counted twice, so exact terms outweigh
+    partial overlaps) and the 3- and 4-character n-grams of each word,
+    which match inflections like "apply"/"application". Counts are
+    log-scaled before normalizing.
+    """
+    import numpy as np
+
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for term in question_terms(question):
+        features = [f"w:{term}", f"w:{term}"]
+        padded = f" {term} "
+        for n in (3, 4):
+            features.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        for feature in features:
+            vector[zlib.crc32(feature.encode("utf-8")) % dimensions] += 1.0
+    np.log1p(vector, out=vector)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+@dataclass
+class SemanticHit:
+    """A cached answer for a similar question."""
+    question: str
+    answer: str
+    posts: List[Dict[str, Any]]
+    similarity: float
+
+class SemanticCache:
+    """
+    In-memory nearest-question cache.
+
+    Vectors live in one preallocated matrix used as a ring buffer, so the
+    oldest question is overwritten once max_entries is reached. The matrix
+    is allocated by the first add, keeping numpy out of import time.
+    """
+    # Verification pool size, and checks queued beyond which new samples are dropped
+    VERIFY_WORKERS = 1
+    VERIFY_MAX_PENDING = 16
+
+    def __init__(self, config: SemanticCacheConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self._vectors: Optional["np.ndarray"] = None
+        self._timestamps: Optional["np.ndarray"] = None
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * config.max_entries
+        self._next = 0
+        self._count = 0
+        self.lookups = 0
+        self.hits = 0
+        self.verified = 0
+        self.confirmed = 0
+        self._verify_executor: Optional[ThreadPoolExecutor] = None
+        self._verify_pending = 0
+
+    def lookup(self, question: str) -> Optional[SemanticHit]:
+        """Return the cached answer of the most similar unexpired question above the threshold."""
+        if not self.config.enabled:
+            return None
+        vector = embed_question(question, self.config.dimensions)
+        terms = distinctive_terms(question_terms(question))
+        with self._lock:
+            self.lookups += 1
+            if self._count == 0 or not vector.any():
+                return None
+            similarities = self._vectors[:self._count] @ vector
+            similarities[self._timestamps[:self._count] < time.time() - self.config.ttl] = -1.0
+            best = int(similarities.argmax())
+            similarity = float(similarities[best])
+            entry = self._entries[best]
+            if similarity < self.config.threshold or entry["terms"] != terms:
+                return None
+            self.hits += 1
+        logger.info(f"Semantic cache hit ({similarity:.2f}): '{question}' ~ '{entry['question']}'")
+        return SemanticHit(entry["question"], entry["answer"], entry["posts"], similarity)
+
+    def add(self, question: str, answer: str, posts: List[Dict[str, Any]]) -> None:
+        """Remember a question's answer and the posts it was based on."""
+        if not self.config.enabled:
+            return
+        vector = embed_question(question, self.config.dimensions)
+        if not vector.any():
+            return
+        entry = {
+            "question": question,
+            "answer": answer,
+            "posts": posts,
+            "terms": distinctive_terms(question_terms(question)),
+        }
+        with self._lock:
+            if self._vectors is None:
+                import numpy as np
+                self._vectors = np.zeros((self.config.max_entries, self.config.dimensions), dtype=np.float32)
+                self._timestamps = np.zeros(self.config.max_entries, dtype=np.float64)
+            slot = self._next
+            self._vectors[slot] = vector
+            self._timestamps[slot] = time.time()
+            self._entries[slot] = entry
+            self._next = (slot + 1) % self.config.max_entries
+            self._count = min(self._count + 1, self.config.max_entries)
+
+    def maybe_verify(
+        self,
+        question: str,
+        hit: SemanticHit,
+        retrieve: Callable[[str], Optional[List[Dict[str, Any]]]],
+    ) -> None:
+        """
+        For a sample of hits, re-run retrieval in the background and record whether it agrees.
+
+        retrieve should be cheap and side-effect free (the local index, not
+        a live search); it runs at background Reddit priority and returns
+        None when it cannot tell. A hit counts as correct when the freshly
+        retrieved posts overlap the cached retrieval set by at least
+        verify_overlap (Jaccard on URLs).
+        """
+        if random.random() >= self.config.verify_rate:
+            return
+
+        def verify() -> None:
+            try:
+                with request_priority(Priority.BACKGROUND):
+                    posts = retrieve(question)
+            except Exception as e:
+                logger.warning(f"Semantic cache verification failed: {e}")
+                return
+            finally:
+                with self._lock:
+                    self._verify_pending -= 1
+            if posts is None:
+                return
+            fresh = {post["url"] for post in posts}
+            cached = {post["url"] for post in hit.posts}
+            union = fresh | cached
+            overlap = len(fresh & cached) / len(union) if union else 1.0
+            with self._lock:
+                self.verified += 1
+                if overlap >= self.config.verify_overlap:
+                    self.confirmed += 1
+            if overlap < self.config.verify_overlap:
+                logger.info(f"Semantic cache false hit ({overlap:.2f} overlap): '{question}' ~ '{hit.question}'")
+
+        with self._lock:
+            if self._verify_pending >= self.VERIFY_MAX_PENDING:
+                return
+            self._verify_pending += 1
+            if self._verify_executor is None:
+                self._verify_executor = ThreadPoolExecutor(
+                    max_workers=self.VERIFY_WORKERS, thread_name_prefix="semantic-cache-verify"
+                )
+        self._verify_executor.submit(verify)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = [None] * self.config.max_entries
+            self._next = 0
+            self._count = 0
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "entries": self._count,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups > 0 else 0,
+                "verified": self.verified,
+                "precision": self.confirmed / self.verified if self.verified > 0 else None,
+            }
+
+SEMANTIC_CACHE = SemanticCache(SEMANTIC_CACHE_CONFIG)
+METRICS.register_collector("reddit_scout_semantic_cache", SEMANTIC_CACHE.get_stats)
@@ -1,5 +1,21 @@
 # This file makes 'reddit_scout_mcp' a Python package.
-# It should import the agent instance to make it discoverable.
+# It exposes the agent instance as 'root_agent' (the name ADK looks for) to
+# make it discoverable; the agent (and google.adk) is only loaded when it is
+# first accessed.
+#
+# 'agent' is also the name of the agent submodule: once anything has imported
+# agents.reddit_scout_mcp.agent, that attribute is the module, not the agent.
+# Use 'root_agent' (or agents.reddit_scout_mcp.agent.root_agent) to get the
+# agent itself.
 
-# Import the agent instance (using conventional 'root_agent' name)
-from .agent import agent 
\ No newline at end of file
+from typing import Any
+
+__all__ = ['root_agent']
+
+def __getattr__(name: str) -> Any:
+    if name in ('root_agent', 'agent'):
+        # Only reached for 'agent' while the submodule has not been imported yet
+        from .agent import root_agent
+        globals()[name] = root_agent
+        return root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
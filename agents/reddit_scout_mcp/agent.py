@@ -1,85 +1,30 @@
 import random
-import os
-from typing import Dict, List, TypedDict, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, TypedDict, Optional
 from datetime import datetime
 import json
-from pathlib import Path
-import time
-import pickle
-import gzip
 import shutil
-from dataclasses import dataclass
 import logging
 
-from google.adk.agents import Agent
-
-from dotenv import load_dotenv
-print("--- Attempting to load .env file ---")
-load_dotenv()
-print(f"--- Current working directory: {os.getcwd()} ---")
-print("--- Checking for environment variables ---")
-print(f"CLIENT_ID exists: {'REDDIT_CLIENT_ID' in os.environ}")
-print(f"CLIENT_SECRET exists: {'REDDIT_CLIENT_SECRET' in os.environ}")
-print(f"USER_AGENT exists: {'REDDIT_USER_AGENT' in os.environ}")
-
-import praw
-from praw.exceptions import PRAWException
+from agents.common.fanout import fetch_subreddits
+from agents.common.metrics import time_reddit_fetch
+from agents.common.post_batch import PostBatch
+from agents.common.post_store import ingest_submissions
+from agents.common.reddit_client import get_missing_credentials, get_reddit_client
+from agents.common.singleflight import REDDIT_FETCHES, normalize_key
+from agents.common.cache import (
+    CACHE_CONFIG,
+    CachedEntry,
+    get_listing_from_cache,
+    save_listing_to_cache,
+)
+
+if TYPE_CHECKING:
+    import praw
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
-class CacheConfig:
-    """Configuration for cache settings."""
-    cache_dir: Path
-    ttl: int
-    max_size_mb: int
-    compression: bool
-
-def get_cache_config() -> CacheConfig:
-    """Get cache configuration from environment variables with defaults."""
-    cache_dir = Path(os.getenv("MCP_CACHE_DIR", ".mcp_cache"))
-    ttl = int(os.getenv("MCP_TTL", "3600"))  # 1 hour default
-    max_size_mb = int(os.getenv("MCP_MAX_SIZE_MB", "100"))  # 100MB default
-    compression = os.getenv("MCP_COMPRESSION", "true").lower() == "true"
-    
-    return CacheConfig(cache_dir, ttl, max_size_mb, compression)
-
-# Initialize cache configuration
-CACHE_CONFIG = get_cache_config()
-CACHE_CONFIG.cache_dir.mkdir(exist_ok=True)
-
-class CacheStats:
-    """Track cache statistics."""
-    def __init__(self):
-        self.hits = 0
-        self.misses = 0
-        self.errors = 0
-        self.total_size = 0
-    
-    def hit(self):
-        self.hits += 1
-    
-    def miss(self):
-        self.misses += 1
-    
-    def error(self):
-        self.errors += 1
-    
-    def update_size(self, size_bytes: int):
-        self.total_size += size_bytes
-    
-    def get_stats(self) -> Dict[str, int]:
-        return {
-            "hits": self.hits,
-            "misses": self.misses,
-            "errors": self.errors,
-            "total_size_mb": self.total_size // (1024 * 1024)
-        }
-
-CACHE_STATS = CacheStats()
-
 class RedditPost(TypedDict):
     title: str
     url: str
@@ -90,232 +35,155 @@ class RedditPost(TypedDict):
     selftext: str
     subreddit: str
 
-def get_cache_key(query: str, subreddit: str, limit: int) -> str:
-    """Generate a cache key from the function parameters."""
-    return f"{query}_{subreddit}_{limit}"
-
-def get_cache_path(cache_key: str) -> Path:
-    """Get the cache file path for a given key."""
-    return CACHE_CONFIG.cache_dir / f"{cache_key}.cache"
-
-def cleanup_expired_cache() -> None:
-    """Remove expired cache files."""
-    current_time = time.time()
-    for cache_file in CACHE_CONFIG.cache_dir.glob("*.cache"):
-        try:
-            with open(cache_file, 'rb') as f:
-                cached_data = pickle.load(f)
-                if current_time - cached_data['timestamp'] > CACHE_CONFIG.ttl:
-                    cache_file.unlink()
-                    logger.info(f"Removed expired cache file: {cache_file}")
-        except Exception as e:
-            logger.error(f"Error cleaning up cache file {cache_file}: {e}")
-            CACHE_STATS.error()
-
-def get_cache_size() -> int:
-    """Get total size of cache directory in bytes."""
-    return sum(f.stat().st_size for f in CACHE_CONFIG.cache_dir.glob("*.cache"))
-
-def enforce_cache_size_limit() -> None:
-    """Remove oldest cache files if size limit is exceeded."""
-    current_size = get_cache_size()
-    max_size_bytes = CACHE_CONFIG.max_size_mb * 1024 * 1024
-    
-    if current_size > max_size_bytes:
-        # Sort files by modification time
-        cache_files = sorted(
-            CACHE_CONFIG.cache_dir.glob("*.cache"),
-            key=lambda x: x.stat().st_mtime
-        )
-        
-        while current_size > max_size_bytes and cache_files:
-            oldest_file = cache_files.pop(0)
-            current_size -= oldest_file.stat().st_size
-            oldest_file.unlink()
-            logger.info(f"Removed oldest cache file to enforce size limit: {oldest_file}")
-
-def get_from_cache(cache_key: str) -> Optional[Dict[str, List[RedditPost]]]:
-    """Try to get results from cache."""
-    cache_path = get_cache_path(cache_key)
-    if cache_path.exists():
-        try:
-            open_func = gzip.open if CACHE_CONFIG.compression else open
-            mode = 'rb' if CACHE_CONFIG.compression else 'rb'
-            with open_func(cache_path, mode) as f:
-                cached_data = pickle.load(f)
-                if time.time() - cached_data['timestamp'] < CACHE_CONFIG.ttl:
-                    logger.info("Cache hit")
-                    CACHE_STATS.hit()
-                    return cached_data['data']
-                else:
-                    logger.info("Cache miss (expired)")
-                    CACHE_STATS.miss()
-        except Exception as e:
-            logger.error(f"Cache read error: {e}")
-            CACHE_STATS.error()
-    else:
-        logger.info("Cache miss (not found)")
-        CACHE_STATS.miss()
-    return None
+# List of relevant subreddits for immigration, visas, and citizenship
+RELEVANT_SUBREDDITS = [
+    "immigration",          # General immigration discussions
+    "USCIS",               # US immigration
+    "visas",               # General visa discussions
+    "IWantOut",            # Immigration and relocation
+    "PassportPorn",        # Passport discussions
+    "expats",              # Expat community
+    "Schengen",            # Schengen visa discussions
+    "ukvisa",              # UK visa discussions
+    "GermanCitizenship",   # German citizenship
+    "dualcitizenship",     # Dual citizenship discussions
+    "goldenvisa",          # Investment/Golden visa programs
+    "digitalnomad",        # Digital nomad visas
+    "eupersonalfinance",   # EU immigration/financial aspects
+    "iwantoutjobs"         # Jobs for immigration
+]
+
+# Posts per subreddit when searching all
+ALL_SUBREDDITS_LIMIT = 5
+
+def fetch_hot_listing(reddit: "praw.Reddit", sub_name: str, limit: int) -> PostBatch:
+    """
+    Fetch a subreddit's hot listing and store it in the listing cache.
 
-def save_to_cache(cache_key: str, data: Dict[str, List[RedditPost]]) -> None:
-    """Save results to cache."""
-    cache_path = get_cache_path(cache_key)
-    try:
-        cache_data = {
-            'timestamp': time.time(),
-            'data': data
-        }
-        
-        open_func = gzip.open if CACHE_CONFIG.compression else open
-        mode = 'wb' if CACHE_CONFIG.compression else 'wb'
-        with open_func(cache_path, mode) as f:
-            pickle.dump(cache_data, f)
-        
-        # Update cache size and enforce limits
-        CACHE_STATS.update_size(cache_path.stat().st_size)
-        enforce_cache_size_limit()
-        
-        logger.info(f"Saved to cache: {cache_path}")
-    except Exception as e:
-        logger.error(f"Cache write error: {e}")
-        CACHE_STATS.error()
+    Reddit returns up to 100 posts per request, so we always ask for at
+    least CACHE_CONFIG.listing_limit posts; the extra posts cost nothing and
+    let later requests with a different limit be served from the cache.
+    Concurrent fetches of the same listing, including background
+    refreshes, share a single request.
+    """
+    fetch_limit = max(limit, CACHE_CONFIG.listing_limit)
+
+    def fetch() -> PostBatch:
+        sub = reddit.subreddit(sub_name)
+        with time_reddit_fetch(sub_name, "hot"):
+            submissions = list(sub.hot(limit=fetch_limit))
+        ingest_submissions(submissions, sub_name)
+        posts = PostBatch.from_submissions(submissions, sub_name)
+        save_listing_to_cache(sub_name, posts, fetch_limit)
+        return posts
+
+    posts = REDDIT_FETCHES.do(normalize_key("hot", sub_name, "", fetch_limit), fetch)
+    return posts[:limit]
+
+def get_cached_listing(sub_name: str, limit: int) -> Optional[CachedEntry]:
+    """Look up a hot listing, refreshing it in the background if it is stale."""
+    return get_listing_from_cache(
+        sub_name,
+        limit,
+        refresh=lambda: fetch_hot_listing(get_reddit_client(), sub_name, limit),
+    )
 
 def get_passport_visa_info(query: str = "", subreddit: str = "all", limit: int = 15) -> Dict[str, List[RedditPost]]:
     """
     Fetches visa, passport, and citizenship-related posts from relevant subreddits.
     Uses local caching for better performance.
+
+    When any posts come from the cache, the result also carries a
+    "cache_info" entry saying how old the cached data is.
     """
     logger.info(f"Fetching information about {query if query else 'visa/passport'} from r/{subreddit}")
-    
-    # Clean up expired cache before proceeding
-    cleanup_expired_cache()
-    
-    # Try to get from cache first
-    cache_key = get_cache_key(query, subreddit, limit)
-    cached_result = get_from_cache(cache_key)
-    if cached_result is not None:
-        return cached_result
-    
-    # List of relevant subreddits for immigration, visas, and citizenship
-    RELEVANT_SUBREDDITS = [
-        "immigration",          # General immigration discussions
-        "USCIS",               # US immigration
-        "visas",               # General visa discussions
-        "IWantOut",            # Immigration and relocation
-        "PassportPorn",        # Passport discussions
-        "expats",              # Expat community
-        "Schengen",            # Schengen visa discussions
-        "ukvisa",              # UK visa discussions
-        "GermanCitizenship",   # German citizenship
-        "dualcitizenship",     # Dual citizenship discussions
-        "goldenvisa",          # Investment/Golden visa programs
-        "digitalnomad",        # Digital nomad visas
-        "eupersonalfinance",   # EU immigration/financial aspects
-        "iwantoutjobs"         # Jobs for immigration
-    ]
-
-    client_id = os.getenv("REDDIT_CLIENT_ID")
-    client_secret = os.getenv("REDDIT_CLIENT_SECRET")
-    user_agent = os.getenv("REDDIT_USER_AGENT")
-
-    if not all([client_id, client_secret, user_agent]):
-        missing_creds = []
-        if not client_id:
-            missing_creds.append("REDDIT_CLIENT_ID")
-        if not client_secret:
-            missing_creds.append("REDDIT_CLIENT_SECRET")
-        if not user_agent:
-            missing_creds.append("REDDIT_USER_AGENT")
-            
+
+    # Remove 'r/' prefix if present in the subreddit name
+    subreddit = subreddit.replace('r/', '')
+
+    # Results are cached per subreddit listing, so "all" is assembled from the
+    # same entries a single-subreddit request uses. Stale entries are served
+    # immediately and refreshed in the background; expired ones are removed
+    # by the background cache sweeper rather than on every request.
+    cache_hits: List[CachedEntry] = []
+    if subreddit != "all":
+        cached = get_cached_listing(subreddit, limit)
+        if cached is not None:
+            return _with_cache_info({subreddit: cached.data.to_posts() or _no_posts_entry(subreddit)}, [cached])
+        cached_listings: Dict[str, PostBatch] = {}
+        subreddits_to_fetch = [subreddit]
+    else:
+        cached_listings = {}
+        subreddits_to_fetch = []
+        for sub_name in RELEVANT_SUBREDDITS:
+            cached = get_cached_listing(sub_name, ALL_SUBREDDITS_LIMIT)
+            if cached is None:
+                subreddits_to_fetch.append(sub_name)
+            else:
+                cached_listings[sub_name] = cached.data
+                cache_hits.append(cached)
+        if not subreddits_to_fetch:
+            return _with_cache_info(_compose_all(cached_listings), cache_hits)
+
+    missing_creds = get_missing_credentials()
+    if missing_creds:
         error_msg = f"Missing Reddit API credentials in .env file: {', '.join(missing_creds)}. Please create a .env file with these credentials."
         print(f"--- Tool error: {error_msg} ---")
         return {"error": [{"title": error_msg, "url": "", "score": 0, "num_comments": 0, "created_utc": "", "flair": "", "selftext": "", "subreddit": ""}]}
 
     try:
-        reddit = praw.Reddit(
-            client_id=client_id,
-            client_secret=client_secret,
-            user_agent=user_agent,
-        )
-
-        # Remove 'r/' prefix if present in the subreddit name
-        subreddit = subreddit.replace('r/', '')
+        reddit = get_reddit_client()
 
         # If a specific subreddit is requested, use that
         if subreddit != "all":
             try:
-                sub = reddit.subreddit(subreddit)
                 # Get hot posts directly without search query
-                posts = list(sub.hot(limit=limit))
-                if posts:
-                    post_info = []
-                    for post in posts:
-                        post_date = datetime.fromtimestamp(post.created_utc).strftime('%Y-%m-%d')
-                        post_info.append({
-                            "title": post.title,
-                            "url": f"https://reddit.com{post.permalink}",
-                            "score": post.score,
-                            "num_comments": post.num_comments,
-                            "created_utc": post_date,
-                            "flair": post.link_flair_text or "",
-                            "selftext": post.selftext[:500] + "..." if len(post.selftext) > 500 else post.selftext,
-                            "subreddit": subreddit
-                        })
-                    result = {subreddit: post_info}
-                    save_to_cache(cache_key, result)
-                    return result
-                else:
-                    result = {subreddit: [{"title": f"No posts found in r/{subreddit}", "url": "", "score": 0, "num_comments": 0, "created_utc": "", "flair": "", "selftext": "", "subreddit": subreddit}]}
-                    save_to_cache(cache_key, result)
-                    return result
+                post_info = fetch_hot_listing(reddit, subreddit, limit)
+                return {subreddit: post_info.to_posts() or _no_posts_entry(subreddit)}
             except Exception as e:
                 print(f"--- Error accessing r/{subreddit}: {str(e)} ---")
                 return {"error": [{"title": f"Error accessing r/{subreddit}: {str(e)}", "url": "", "score": 0, "num_comments": 0, "created_utc": "", "flair": "", "selftext": "", "subreddit": subreddit}]}
 
-        # For "all", search across relevant subreddits
-        results = {}
-        for sub_name in RELEVANT_SUBREDDITS:
+        # For "all", fetch the uncached subreddits concurrently under a total deadline
+        def fetch_one(sub_name: str) -> PostBatch:
             try:
-                sub = reddit.subreddit(sub_name)
-                posts = list(sub.hot(limit=5))  # Limit to 5 posts per subreddit when searching all
-                if posts:
-                    post_info = []
-                    for post in posts:
-                        post_date = datetime.fromtimestamp(post.created_utc).strftime('%Y-%m-%d')
-                        post_info.append({
-                            "title": post.title,
-                            "url": f"https://reddit.com{post.permalink}",
-                            "score": post.score,
-                            "num_comments": post.num_comments,
-                            "created_utc": post_date,
-                            "flair": post.link_flair_text or "",
-                            "selftext": post.selftext[:500] + "..." if len(post.selftext) > 500 else post.selftext,
-                            "subreddit": sub_name
-                        })
-                    results[sub_name] = post_info
+                return fetch_hot_listing(reddit, sub_name, ALL_SUBREDDITS_LIMIT)
             except Exception as e:
                 print(f"--- Warning: Error fetching from r/{sub_name}: {e} ---")
-                continue
-
-        if not results:
-            result = {"info": [{"title": "No posts found in any subreddit", "url": "", "score": 0, "num_comments": 0, "created_utc": "", "flair": "", "selftext": "", "subreddit": ""}]}
-            save_to_cache(cache_key, result)
-            return result
-        
-        save_to_cache(cache_key, results)
-        return results
+                return PostBatch()
+
+        cached_listings.update(fetch_subreddits(fetch_one, subreddits_to_fetch))
+        return _with_cache_info(_compose_all(cached_listings), cache_hits)
 
     except Exception as e:
         print(f"--- Tool error: Unexpected error: {e} ---")
         return {"error": [{"title": f"An unexpected error occurred: {e}", "url": "", "score": 0, "num_comments": 0, "created_utc": "", "flair": "", "selftext": "", "subreddit": ""}]}
 
+def _no_posts_entry(subreddit: str) -> List[RedditPost]:
+    return [{"title": f"No posts found in r/{subreddit}", "url": "", "score": 0, "num_comments": 0, "created_utc": "", "flair": "", "selftext": "", "subreddit": subreddit}]
+
+def _compose_all(listings: Dict[str, PostBatch]) -> Dict[str, List[RedditPost]]:
+    """Assemble the "all" result from per-subreddit listings, in RELEVANT_SUBREDDITS order."""
+    results = {sub_name: listings[sub_name].to_posts() for sub_name in RELEVANT_SUBREDDITS if listings.get(sub_name)}
+    if not results:
+        return {"info": [{"title": "No posts found in any subreddit", "url": "", "score": 0, "num_comments": 0, "created_utc": "", "flair": "", "selftext": "", "subreddit": ""}]}
+    return results
+
+def _with_cache_info(results: Dict[str, List[RedditPost]], cache_hits: List[CachedEntry]) -> Dict[str, List[RedditPost]]:
+    """Add a "cache_info" entry describing the oldest cached listing used, if any."""
+    if not cache_hits:
+        return results
+    oldest = min(cache_hits, key=lambda entry: entry.timestamp)
+    minutes = int(oldest.age // 60)
+    age_text = "less than a minute" if minutes == 0 else f"{minutes} minute{'s' if minutes != 1 else ''}"
+    title = f"Some results come from a cache fetched {age_text} ago"
+    if any(entry.stale for entry in cache_hits):
+        title += " (past its refresh time; a refresh is running in the background)"
+    fetched_at = datetime.fromtimestamp(oldest.timestamp).strftime('%Y-%m-%d %H:%M')
+    return {**results, "cache_info": [{"title": title, "url": "", "score": 0, "num_comments": 0, "created_utc": fetched_at, "flair": "", "selftext": "", "subreddit": ""}]}
+
 # Define the Agent with proper ADK setup
-agent = Agent(
-    name="reddit_scout_mcp",
-    model="gemini-2.0-flash",
-    description="An enhanced Reddit Scout agent with Model Content Protocol (MCP) for optimized performance and caching",
-    instruction="""You are an AI agent that helps users find relevant information about visas, passports, and immigration from Reddit discussions, with enhanced performance through caching. Your goal is to provide helpful, accurate information while being clear about the community-sourced nature of the data.
+AGENT_INSTRUCTION = """You are an AI agent that helps users find relevant information about visas, passports, and immigration from Reddit discussions, with enhanced performance through caching. Your goal is to provide helpful, accurate information while being clear about the community-sourced nature of the data.
 
 When interacting with users:
 
@@ -343,7 +211,7 @@ When interacting with users:
 - Group information by topic/country
 - Include relevant post links
 - Add appropriate disclaimers
-- Note if information comes from cache
+- Note if information comes from cache, using the age given in the "cache_info" entry
 
 5. BE RESPONSIBLE
 - Clearly state that information is community-sourced
@@ -358,6 +226,23 @@ Remember:
 - Provide balanced perspectives
 - Always encourage official verification
 - Consider cache implications
-""",
-    tools=[get_passport_visa_info]
-) 
\ No newline at end of file
+"""
+
+def create_agent() -> Any:
+    """Build the ADK agent; google.adk is only imported here."""
+    from google.adk.agents import Agent
+
+    return Agent(
+        name="reddit_scout_mcp",
+        model="gemini-2.0-flash",
+        description="An enhanced Reddit Scout agent with Model Content Protocol (MCP) for optimized performance and caching",
+        instruction=AGENT_INSTRUCTION,
+        tools=[get_passport_visa_info]
+    )
+
+def __getattr__(name: str) -> Any:
+    # Built when ADK first asks for it, so importing the tools stays cheap
+    if name in ("agent", "root_agent"):
+        agent = globals()["agent"] = globals()["root_agent"] = create_agent()
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
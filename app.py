@@ -1,9 +1,12 @@
 import streamlit as st
-from agents import chat_agent
+from agents.common.formatting import StreamingLinkFormatter, format_message
+from agents.common.metrics import METRICS_SERVER
+from agents.common.reddit_client import REDDIT_CLIENTS
+from agents.prewarm import PREWARM_CONFIG, PREWARMER
+from agents.reddit_scout.questions import EXAMPLE_QUESTIONS
 import os
 from dotenv import load_dotenv
 import time
-import re
 
 # Set page config (MUST be the first Streamlit command)
 st.set_page_config(
@@ -49,56 +52,15 @@ required_vars = [
 
 missing_vars = [var for var in required_vars if not os.getenv(var)]
 
-def format_reddit_links(text):
-    """Convert Reddit URLs and structured link data to formatted markdown"""
-    def format_structured_link(summary, search_query, link_text="Search Reddit"):
-        # Create a clean URL-friendly version of the search query
-        url_query = search_query.replace(' ', '%20')
-        return f"""
-**{summary}**
-- Search: `{search_query}`
-- {link_text}: [Reddit Search](https://www.reddit.com/search/?q={url_query})
-"""
-    
-    # First try to parse structured link data
-    try:
-        import json
-        data = json.loads(text)
-        if isinstance(data, dict) and "summary" in data and "search_query" in data:
-            return format_structured_link(
-                data["summary"],
-                data["search_query"],
-                data.get("link_text", "Search Reddit")
-            )
-    except (json.JSONDecodeError, TypeError):
-        pass
-    
-    # If not structured data, handle regular Reddit URLs
-    def clean_title(title):
-        return title.replace('_', ' ').rstrip('/')
-    
-    # First, clean up any incorrectly nested markdown links
-    # Remove any nested markdown patterns
-    text = re.sub(r'\[(?:\[([^\]]+)\]\([^)]+\))\](?:\([^)]+\))', r'[\1]', text)
-    
-    # Handle full Reddit URLs - only if they're not already part of a markdown link
-    text = re.sub(
-        r'(?<!\]\()https?://(?:www\.)?reddit\.com/r/(\w+)/comments/([^/]+)/([^/\s]+)/?(?!\))',
-        lambda m: f'[{clean_title(m.group(3))}](https://reddit.com/r/{m.group(1)}/comments/{m.group(2)}/{m.group(3)})',
-        text
-    )
-    
-    # Handle r/subreddit mentions - only if they're not already part of a markdown link
-    text = re.sub(
-        r'(?<!\]\()(?<!/)(?<!\w)r/(\w+)(?!\w)(?!\))',
-        r'[r/\1](https://reddit.com/r/\1)',
-        text
-    )
-    
-    # Clean up any double-wrapped links that might have been created
-    text = re.sub(r'\[(\[.*?\]\(.*?\))\]\(.*?\)', r'\1', text)
-    
-    return text
+# Create the shared Reddit client once per process; its health check runs in the background
+if not missing_vars:
+    REDDIT_CLIENTS.warm_up()
+    # Keep the Popular Questions and hot listings cached ahead of expiry
+    if PREWARM_CONFIG.in_app:
+        PREWARMER.start()
+
+# Per-stage latency histograms at /metrics, if METRICS_PORT is set
+METRICS_SERVER.start()
 
 def handle_example_question(question: str):
     """Handle when an example question is clicked"""
@@ -136,18 +98,7 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     
     # Example Questions
-    example_questions = [
-        "What are the requirements for a US tourist visa?",
-        "How to apply for Schengen visa?",
-        "Digital nomad visa options",
-        "Canada Express Entry points calculator",
-        "Portugal D7 visa requirements",
-        "UK skilled worker visa process",
-        "Australian PR pathways",
-        "Dubai golden visa eligibility",
-        "Estonia e-Residency benefits",
-        "Singapore work visa types"
-    ]
+    example_questions = EXAMPLE_QUESTIONS
     
     for question in example_questions:
         if st.button(
@@ -196,21 +147,26 @@ else:
     with chat_container:
         for message in st.session_state.messages:
             with st.chat_message(message["role"]):
-                # Format Reddit links in the message
-                formatted_content = format_reddit_links(message["content"])
-                st.markdown(formatted_content)
+                # Format Reddit links in the message (once; kept in the message for later reruns)
+                st.markdown(format_message(message))
         
         # Show loading message if processing
         if st.session_state.processing:
             with st.chat_message("assistant"):
-                st.markdown('<div style="animation: pulse 1.5s infinite; padding: 1.5rem; border-radius: 16px; background: #f5f9ff; text-align: center; margin: 1rem 0; border: 1px solid #e3f2fd;">🔍 Searching and analyzing Reddit discussions...</div>', unsafe_allow_html=True)
+                placeholder = st.empty()
+                placeholder.markdown('<div style="animation: pulse 1.5s infinite; padding: 1.5rem; border-radius: 16px; background: #f5f9ff; text-align: center; margin: 1rem 0; border: 1px solid #e3f2fd;">🔍 Searching and analyzing Reddit discussions...</div>', unsafe_allow_html=True)
                 try:
-                    # Generate response
-                    response = chat_agent.generate_response(st.session_state.messages[-1]["content"])
-                    # Format Reddit links in response
-                    formatted_response = format_reddit_links(response)
-                    # Add response to messages
-                    st.session_state.messages.append({"role": "assistant", "content": formatted_response})
+                    # Imported on the first question so the page renders without loading Gemini
+                    from agents import chat_agent
+                    # Stream the response, formatting Reddit links as they complete
+                    formatter = StreamingLinkFormatter()
+                    for chunk in chat_agent.stream_response(st.session_state.messages[-1]["content"]):
+                        placeholder.markdown(formatter.feed(chunk) + "▌")
+                    # Format Reddit links in the complete response
+                    formatted_response = formatter.finish()
+                    placeholder.markdown(formatted_response)
+                    # Add response to messages, already formatted so reruns don't format it again
+                    st.session_state.messages.append({"role": "assistant", "content": formatter.text, "formatted": formatted_response})
                     # Reset processing flag
                     st.session_state.processing = False
                     st.rerun()
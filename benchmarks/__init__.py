@@ -0,0 +1 @@
+"""Offline benchmarks with record/replay stand-ins for Reddit and Gemini."""
@@ -0,0 +1,143 @@
+"""
+Size and speed of the listing cache's entry formats.
+
+Builds cache entries exactly as save_listing_to_cache does (a PostBatch of
+MCP_LISTING_LIMIT fixture posts per entry, stored as columns)
+and reports, for the former gzip+pickle format and every codec available
+here, the bytes per entry and the encode/decode time per entry.
+
+When zstandard is installed, a dictionary is trained on half of the
+entries and measured on the other half ("+dict" rows); --train-dict
+trains one on all entries and writes it for use as MCP_CACHE_DICTIONARY.
+
+    python -m benchmarks.codecs
+    python -m benchmarks.codecs --posts 100 --out codecs.json
+    python -m benchmarks.codecs --fixture benchmarks/fixtures/recorded.json --train-dict .mcp_cache.dict
+"""
+
+import gzip
+import json
+import time
+import pickle
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.run import git_commit
+
+from agents.common.cache_codecs import (
+    COMPRESSORS, SERIALIZERS, Codec, is_available, train_dictionary,
+)
+from agents.common.post_batch import PostBatch
+from agents.reddit_scout_mcp.agent import RELEVANT_SUBREDDITS
+
+from benchmarks.replay import ReplaySubmission, load_fixture, synthetic_fixture
+
+def build_entries(fixture: Dict[str, Any], posts_per_entry: int) -> List[Dict[str, Any]]:
+    """Cache entries shaped like the ones save_listing_to_cache writes."""
+    entries = []
+    now = time.time()
+    for key, posts in fixture["listings"].items():
+        sub_name = key.split("|")[0]
+        for start in range(0, len(posts), posts_per_entry):
+            batch = PostBatch.from_submissions(map(ReplaySubmission, posts[start:start + posts_per_entry]), sub_name)
+            entries.append({"timestamp": now, "data": {"limit": len(batch), "posts": batch.to_columns()}})
+    return entries
+
+def time_per_entry(function: Callable[[Any], Any], items: List[Any], repeat: int) -> float:
+    """Median over `repeat` passes of the mean seconds per item."""
+    passes = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        passes.append((time.perf_counter() - start) / len(items))
+    return statistics.median(passes)
+
+def measure(name: str, encode: Callable[[Any], bytes], decode: Callable[[bytes], Any],
+            entries: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    blobs = [encode(entry) for entry in entries]
+    assert decode(blobs[0]) == entries[0], f"{name} does not round-trip"
+    return {
+        "codec": name,
+        "bytes_per_entry": round(sum(len(blob) for blob in blobs) / len(blobs), 1),
+        "encode_us": round(time_per_entry(encode, entries, repeat) * 1e6, 1),
+        "decode_us": round(time_per_entry(decode, blobs, repeat) * 1e6, 1),
+    }
+
+def legacy_encode(entry: Any) -> bytes:
+    """The format save_to_cache wrote before the codec layer."""
+    return gzip.compress(pickle.dumps(entry))
+
+def legacy_decode(blob: bytes) -> Any:
+    return pickle.loads(gzip.decompress(blob))
+
+def serialized(entries: List[Dict[str, Any]]) -> List[bytes]:
+    """Uncompressed entries, as dictionary training samples."""
+    serializer = SERIALIZERS["msgpack" if is_available("msgpack") else "json"]()
+    return [serializer.dumps(entry) for entry in entries]
+
+def available_codecs() -> List[str]:
+    return [
+        f"{serializer}-{compressor}"
+        for serializer in SERIALIZERS if is_available(serializer)
+        for compressor in COMPRESSORS if is_available(compressor)
+    ]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare cache entry formats by size and speed")
+    parser.add_argument("--fixture", type=Path, help="Recorded fixture (default: synthetic)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--posts", type=int, default=25, help="Posts per cache entry (MCP_LISTING_LIMIT)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over all entries")
+    parser.add_argument("--train-dict", type=Path, help="Train a zstd dictionary on all entries and write it here")
+    parser.add_argument("--dict-size", type=int, default=16 * 1024, help="Dictionary size in bytes")
+    parser.add_argument("--out", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture) if args.fixture else synthetic_fixture(RELEVANT_SUBREDDITS, seed=args.seed)
+    entries = build_entries(fixture, args.posts)
+
+    results = [measure("pickle-gzip (previous)", legacy_encode, legacy_decode, entries, args.repeat)]
+    for name in available_codecs():
+        codec = Codec(name)
+        results.append(measure(name, codec.encode, codec.decode, entries, args.repeat))
+
+    if is_available("zstd"):
+        # Train on every other entry, measure on the rest, so the dictionary has not seen the test data
+        with tempfile.TemporaryDirectory() as tmp:
+            dictionary = Path(tmp) / "cache.dict"
+            dictionary.write_bytes(train_dictionary(serialized(entries[::2]), args.dict_size))
+            codec = Codec("auto-zstd", dictionary_path=dictionary)
+            results.append(measure(f"{codec.name}+dict", codec.encode, codec.decode, entries[1::2], args.repeat))
+
+    baseline = results[0]
+    print(f"{len(entries)} entries of up to {args.posts} posts\n")
+    print(f"{'codec':<26}{'bytes/entry':>12}{'size':>8}{'encode us':>12}{'decode us':>12}")
+    for result in results:
+        result["size_ratio"] = round(result["bytes_per_entry"] / baseline["bytes_per_entry"], 3)
+        print(
+            f"{result['codec']:<26}{result['bytes_per_entry']:>12.0f}{result['size_ratio']:>8.0%}"
+            f"{result['encode_us']:>12.1f}{result['decode_us']:>12.1f}"
+        )
+
+    if args.train_dict:
+        if not is_available("zstd"):
+            parser.error("--train-dict needs the zstandard package")
+        args.train_dict.write_bytes(train_dictionary(serialized(entries), args.dict_size))
+        print(f"\nWrote a {args.dict_size}-byte dictionary to {args.train_dict}; "
+              f"set MCP_CACHE_DICTIONARY={args.train_dict} and MCP_CACHE_CODEC={Codec('auto-zstd').name} to use it")
+
+    if args.out:
+        report = {
+            "metadata": {"git_commit": git_commit(), "entries": len(entries), "posts_per_entry": args.posts},
+            "codecs": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Link formatting throughput on long transcripts, and Streamlit rerun cost.
+
+Transcripts alternate Popular Questions with replayed answers from the
+fixture. Two measurements:
+
+- throughput: format_reddit_links over one long transcript, in MB/s,
+  next to the formatter it replaced (five regex passes, compiled per
+  call, and a JSON parse attempt on every message)
+- rerun: time to render every message of a conversation of N messages,
+  as app.py did before (format every message, assistant replies twice)
+  and now (format_message, which formats each message once)
+
+    python -m benchmarks.formatting
+    python -m benchmarks.formatting --messages 10,50,200,1000 --out formatting.json
+"""
+
+import re
+import json
+import time
+import argparse
+import statistics
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.run import git_commit
+
+from agents.common.formatting import format_message, format_reddit_links, format_structured_link
+from agents.reddit_scout.questions import EXAMPLE_QUESTIONS
+from agents.reddit_scout_mcp.agent import RELEVANT_SUBREDDITS
+
+from benchmarks.replay import load_fixture, synthetic_fixture
+
+def previous_format_reddit_links(text: str) -> str:
+    """The formatter before the single-pass engine, for comparison."""
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict) and "summary" in data and "search_query" in data:
+            return format_structured_link(data["summary"], data["search_query"], data.get("link_text", "Search Reddit"))
+    except (json.JSONDecodeError, TypeError):
+        pass
+    text = re.sub(r'\[(?:\[([^\]]+)\]\([^)]+\))\](?:\([^)]+\))', r'[\1]', text)
+    text = re.sub(
+        r'(?<!\]\()https?://(?:www\.)?reddit\.com/r/(\w+)/comments/([^/]+)/([^/\s]+)/?(?!\))',
+        lambda m: f"[{m.group(3).replace('_', ' ').rstrip('/')}](https://reddit.com/r/{m.group(1)}/comments/{m.group(2)}/{m.group(3)})",
+        text
+    )
+    text = re.sub(r'(?<!\]\()(?<!/)(?<!\w)r/(\w+)(?!\w)(?!\))', r'[r/\1](https://reddit.com/r/\1)', text)
+    return re.sub(r'\[(\[.*?\]\(.*?\))\]\(.*?\)', r'\1', text)
+
+def build_conversation(answers: List[str], messages: int) -> List[Dict[str, Any]]:
+    """Alternating user questions and assistant answers, as st.session_state.messages holds them."""
+    conversation = []
+    for i in range(messages):
+        if i % 2 == 0:
+            conversation.append({"role": "user", "content": EXAMPLE_QUESTIONS[(i // 2) % len(EXAMPLE_QUESTIONS)]})
+        else:
+            answer = answers[(i // 2) % len(answers)]
+            conversation.append({"role": "assistant", "content": answer, "formatted": format_reddit_links(answer)})
+    return conversation
+
+def timed(function: Callable[[], Any], repeat: int) -> float:
+    """Median seconds per call over `repeat` calls."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark link formatting on long transcripts")
+    parser.add_argument("--fixture", type=Path, help="Recorded fixture (default: synthetic)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--messages", default="10,50,200", help="Comma-separated conversation lengths")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture) if args.fixture else synthetic_fixture(RELEVANT_SUBREDDITS, seed=args.seed)
+    answers = list(fixture["answers"].values())
+    lengths = [int(n) for n in args.messages.split(",")]
+
+    transcript = "\n\n".join(message["content"] for message in build_conversation(answers, max(lengths)))
+    megabytes = len(transcript.encode("utf-8")) / 1e6
+    throughput = {
+        "megabytes": round(megabytes, 3),
+        "previous_mb_s": round(megabytes / timed(lambda: previous_format_reddit_links(transcript), args.repeat), 1),
+        "current_mb_s": round(megabytes / timed(lambda: format_reddit_links(transcript), args.repeat), 1),
+    }
+    print(f"Transcript of {max(lengths)} messages ({megabytes:.2f} MB): "
+          f"previous {throughput['previous_mb_s']:.1f} MB/s, current {throughput['current_mb_s']:.1f} MB/s\n")
+
+    print(f"{'messages':>8}{'previous rerun':>18}{'first render':>16}{'rerun':>12}")
+    reruns = []
+    for length in lengths:
+        conversation = build_conversation(answers, length)
+
+        def previous_rerun() -> None:
+            for message in conversation:
+                previous_format_reddit_links(message["formatted" if message["role"] == "assistant" else "content"])
+
+        def first_render() -> None:
+            for message in conversation:
+                message.pop("formatted", None)
+                format_message(message)
+
+        def rerun() -> None:
+            for message in conversation:
+                format_message(message)
+
+        result = {
+            "messages": length,
+            "previous_rerun_ms": round(timed(previous_rerun, args.repeat) * 1000, 3),
+            "first_render_ms": round(timed(first_render, args.repeat) * 1000, 3),
+            "rerun_ms": round(timed(rerun, args.repeat) * 1000, 3),
+        }
+        reruns.append(result)
+        print(f"{length:>8}{result['previous_rerun_ms']:>15.2f} ms{result['first_render_ms']:>13.2f} ms{result['rerun_ms']:>9.3f} ms")
+
+    if args.out:
+        report = {"metadata": {"git_commit": git_commit()}, "throughput": throughput, "reruns": reruns}
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Import-time budget check.
+
+Importing the agents must stay cheap: no network, no files written and no
+heavy third-party modules until something is actually used. Each module is
+imported in a fresh interpreter, in an empty working directory, and the
+check fails when
+
+- the median import time exceeds --budget milliseconds,
+- a heavy module (praw, numpy, Gemini, ADK, ...) was loaded,
+- the import wrote to stdout, or
+- the import created files (e.g. the .mcp_cache directory).
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget 150 --runs 7 --out import_time.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# What the app, the ADK CLI and the background workers import first
+MODULES = [
+    "agents",
+    "agents.reddit_scout",
+    "agents.reddit_scout.agent",
+    "agents.reddit_scout_mcp",
+    "agents.reddit_scout_mcp.agent",
+    "agents.reddit_scout.chat_agent",
+    "agents.prewarm",
+    "agents.harvester",
+]
+
+# Loaded on first use only; each costs from tens of milliseconds to seconds
+HEAVY_MODULES = [
+    "praw",
+    "prawcore",
+    "requests",
+    "numpy",
+    "dotenv",
+    "google.generativeai",
+    "google.adk",
+    "http.server",
+]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+sys.stderr.write("\\n" + json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}) + "\\n")
+"""
+
+def git_commit() -> Optional[str]:
+    # Not imported from benchmarks.run, which loads the agents into this process
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def probe(module: str) -> Dict[str, Any]:
+    """Import one module in a fresh interpreter and an empty working directory."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    # Keep MCP_CACHE_DIR and friends relative, so any directory created at import shows up here
+    for name in ("MCP_CACHE_DIR", "REDDIT_STORE_PATH", "CHAT_ANSWER_CACHE_PATH", "REDDIT_RATE_DB"):
+        env.pop(name, None)
+    with tempfile.TemporaryDirectory(prefix="reddit-import-") as cwd:
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            cwd=cwd, env=env, capture_output=True, text=True,
+        )
+        created = sorted(os.listdir(cwd))
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    report = json.loads(result.stderr.strip().splitlines()[-1])
+    return {
+        "seconds": report["seconds"],
+        "heavy": [name for name in HEAVY_MODULES if name in report["modules"]],
+        "stdout": result.stdout,
+        "created": created,
+    }
+
+def check(module: str, runs: int, budget_ms: float) -> Dict[str, Any]:
+    probes = [probe(module) for _ in range(runs)]
+    times = sorted(p["seconds"] * 1000 for p in probes)
+    first = probes[0]
+    problems: List[str] = []
+    median = statistics.median(times)
+    if median > budget_ms:
+        problems.append(f"{median:.1f} ms over the {budget_ms:g} ms budget")
+    if first["heavy"]:
+        problems.append(f"loads {', '.join(first['heavy'])}")
+    if first["stdout"]:
+        problems.append(f"prints {first['stdout'].strip()[:60]!r}")
+    if first["created"]:
+        problems.append(f"creates {', '.join(first['created'])}")
+    return {
+        "module": module,
+        "median_ms": round(median, 1),
+        "max_ms": round(times[-1], 1),
+        "heavy": first["heavy"],
+        "created": first["created"],
+        "problems": problems,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check that importing the agents stays fast and side-effect free")
+    parser.add_argument("--budget", type=float, default=250.0, help="Median import time allowed per module (ms)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--module", action="append", help="Module to check (repeatable; default: all entry points)")
+    parser.add_argument("--out", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for module in args.module or MODULES:
+        result = check(module, args.runs, args.budget)
+        results.append(result)
+        status = "ok" if not result["problems"] else "FAIL: " + "; ".join(result["problems"])
+        print(f"{module:<36}{result['median_ms']:>8.1f} ms  (max {result['max_ms']:.1f} ms)  {status}")
+
+    if args.out:
+        report = {
+            "metadata": {"git_commit": git_commit(), "python": sys.version.split()[0], "budget_ms": args.budget, "runs": args.runs},
+            "modules": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+
+    failed = [result["module"] for result in results if result["problems"]]
+    if failed:
+        print(f"\n{len(failed)} module(s) over budget or with import side effects")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
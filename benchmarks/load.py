@@ -0,0 +1,254 @@
+"""
+Load generator for the chat pipeline.
+
+Simulates many chat sessions calling ChatAgent.generate_response at once,
+against the replay stand-ins for Reddit and Gemini with configurable
+latency and error rates, to find how much traffic one app process can
+take before latency falls over.
+
+Open loop (default): questions arrive as a Poisson process at --rate per
+second and are handled by up to --sessions concurrent sessions (Streamlit
+runs one script thread per session). Time spent waiting for a free
+session is reported as queueing delay. Closed loop: --sessions sessions
+each ask a question, wait --think seconds on average, and ask again.
+
+    python -m benchmarks.load --rate 5 --sessions 20 --duration 30
+    python -m benchmarks.load --sweep 1,2,5,10,20,50 --reddit-latency 0.3 --model-latency 2
+    python -m benchmarks.load --mode closed --sweep 1,5,10,25,50 --think 2
+
+With --sweep, each step runs for --duration seconds, starting with empty
+listing, answer and semantic caches, and unique questions are never
+reused across steps, so no step is answered from an earlier one's work.
+The first step where questions wait longer for a free session than it
+takes to answer them (p95 queueing delay over the median service time),
+or where p95 latency exceeds --slo, is reported as the saturation point;
+the step before it is the capacity.
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Imported first: sets up the isolated benchmark environment before the agents load
+from benchmarks.run import git_commit, percentile, reset_listing_cache, set_chat_caches
+
+from agents.reddit_scout.answer_cache import ANSWER_CACHE
+from agents.reddit_scout.chat_agent import chat_agent
+from agents.reddit_scout.questions import EXAMPLE_QUESTIONS
+from agents.reddit_scout.semantic_cache import SEMANTIC_CACHE
+from agents.reddit_scout_mcp.agent import RELEVANT_SUBREDDITS
+
+from benchmarks.replay import ReplayModel, ReplayReddit, install, load_fixture, synthetic_fixture
+
+ERROR_PREFIX = "I encountered an error while processing your request"
+
+@dataclass
+class Turn:
+    """One chat turn as seen by the load generator (times from time.monotonic)."""
+    scheduled: float
+    started: float
+    finished: float
+    ok: bool
+
+class QuestionMix:
+    """
+    Draws questions: a share `repeat_share` are Popular Questions (which the
+    caches can answer), the rest unique variants that miss every cache.
+    """
+    def __init__(self, repeat_share: float, seed: int):
+        self.repeat_share = repeat_share
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._unique = 0
+
+    def next(self) -> str:
+        with self._lock:
+            question = self._rng.choice(EXAMPLE_QUESTIONS)
+            if self._rng.random() < self.repeat_share:
+                return question
+            self._unique += 1
+            # The number keeps the semantic cache from matching the original question
+            return f"{question} (case {self._unique})"
+
+def reset_caches() -> None:
+    """Empty every cache a chat turn can be answered from."""
+    reset_listing_cache()
+    ANSWER_CACHE.clear()
+    SEMANTIC_CACHE.clear()
+
+def ask(mix: QuestionMix, scheduled: float) -> Turn:
+    started = time.monotonic()
+    try:
+        answer = chat_agent.generate_response(mix.next())
+        ok = not answer.startswith(ERROR_PREFIX)
+    except Exception:
+        ok = False
+    return Turn(scheduled, started, time.monotonic(), ok)
+
+def run_open(rate: float, sessions: int, duration: float, mix: QuestionMix, seed: int) -> List[Turn]:
+    """Poisson arrivals at `rate` per second, served by up to `sessions` concurrent sessions."""
+    rng = random.Random(seed)
+    executor = ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="load-session")
+    futures = []
+    start = time.monotonic()
+    next_arrival = start + rng.expovariate(rate)
+    while next_arrival < start + duration:
+        delay = next_arrival - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        futures.append(executor.submit(ask, mix, next_arrival))
+        next_arrival += rng.expovariate(rate)
+    executor.shutdown(wait=True)
+    return [future.result() for future in futures]
+
+def run_closed(sessions: int, duration: float, think: float, mix: QuestionMix, seed: int) -> List[Turn]:
+    """`sessions` users each asking, thinking for ~`think` seconds, and asking again until `duration` is up."""
+    turns: List[Turn] = []
+    lock = threading.Lock()
+    end = time.monotonic() + duration
+
+    def session(index: int) -> None:
+        rng = random.Random(seed + index)
+        while True:
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+            now = time.monotonic()
+            if now >= end:
+                return
+            turn = ask(mix, now)
+            with lock:
+                turns.append(turn)
+
+    threads = [threading.Thread(target=session, args=(i,), name=f"load-session-{i}") for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return turns
+
+def summarize(turns: List[Turn], duration: float, wall_time: float) -> Dict[str, Any]:
+    if not turns:
+        return {"turns": 0}
+    latencies = sorted(turn.finished - turn.scheduled for turn in turns)
+    service = sorted(turn.finished - turn.started for turn in turns)
+    queueing = sorted(turn.started - turn.scheduled for turn in turns)
+    errors = sum(1 for turn in turns if not turn.ok)
+    ms = lambda seconds: round(seconds * 1000, 1)
+    return {
+        "turns": len(turns),
+        "offered": round(len(turns) / duration, 2),
+        "throughput": round(len(turns) / wall_time, 2),
+        "error_rate": round(errors / len(turns), 4),
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "max_ms": ms(latencies[-1]),
+        "service_p50_ms": ms(percentile(service, 0.50)),
+        "queue_mean_ms": ms(sum(queueing) / len(queueing)),
+        "queue_p95_ms": ms(percentile(queueing, 0.95)),
+    }
+
+def is_saturated(result: Dict[str, Any], slo_ms: float) -> bool:
+    """Questions queue for longer than they take to answer, or p95 is over the SLO."""
+    if not result["turns"]:
+        return False
+    return result["queue_p95_ms"] > result["service_p50_ms"] or result["p95_ms"] > slo_ms
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate concurrent chat load against replayed Reddit and Gemini")
+    parser.add_argument("--mode", choices=["open", "closed"], default="open")
+    parser.add_argument("--rate", type=float, default=5.0, help="Open loop: questions per second")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent sessions")
+    parser.add_argument("--think", type=float, default=2.0, help="Closed loop: mean think time between questions (s)")
+    parser.add_argument("--sweep", help="Comma-separated rates (open) or session counts (closed) to step through")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per run or sweep step")
+    parser.add_argument("--repeat-share", type=float, default=0.5, help="Share of questions repeated from the Popular Questions")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the listing, answer and semantic caches")
+    parser.add_argument("--reddit-latency", type=float, default=0.3, help="Seconds per replayed Reddit request")
+    parser.add_argument("--model-latency", type=float, default=2.0, help="Seconds per replayed Gemini call")
+    parser.add_argument("--reddit-error-rate", type=float, default=0.0)
+    parser.add_argument("--model-error-rate", type=float, default=0.0)
+    parser.add_argument("--slo", type=float, default=10000.0, help="p95 latency (ms) above which a step counts as saturated")
+    parser.add_argument("--fixture", type=Path, help="Recorded fixture (default: synthetic)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture) if args.fixture else synthetic_fixture(RELEVANT_SUBREDDITS, seed=args.seed)
+    reddit = ReplayReddit(fixture, latency=args.reddit_latency, error_rate=args.reddit_error_rate, seed=args.seed)
+    model = ReplayModel(fixture, latency=args.model_latency, error_rate=args.model_error_rate, seed=args.seed)
+    install(reddit, model)
+    set_chat_caches(not args.no_cache)
+
+    if args.sweep:
+        steps = [float(step) for step in args.sweep.split(",")]
+    else:
+        steps = [args.rate if args.mode == "open" else float(args.sessions)]
+
+    # One mix for the whole sweep, so each step's unique questions are new
+    mix = QuestionMix(args.repeat_share, args.seed)
+    results = []
+    capacity = None
+    saturation = None
+    for step in steps:
+        reset_caches()
+        started = time.monotonic()
+        if args.mode == "open":
+            turns = run_open(step, args.sessions, args.duration, mix, args.seed)
+        else:
+            turns = run_closed(int(step), args.duration, args.think, mix, args.seed)
+        result = {"step": step, **summarize(turns, args.duration, time.monotonic() - started)}
+        results.append(result)
+
+        label = f"rate {step:g}/s" if args.mode == "open" else f"{int(step)} sessions"
+        print(
+            f"{label:<16}{result.get('throughput', 0):>8.2f} turns/s  p50 {result.get('p50_ms', 0):>8.1f} ms  "
+            f"p95 {result.get('p95_ms', 0):>8.1f} ms  p99 {result.get('p99_ms', 0):>8.1f} ms  "
+            f"queue {result.get('queue_mean_ms', 0):>8.1f} ms  errors {result.get('error_rate', 0):.1%}"
+        )
+        if is_saturated(result, args.slo):
+            saturation = step
+            break
+        capacity = step
+
+    if args.sweep:
+        unit = "questions/s" if args.mode == "open" else "sessions"
+        if saturation is None:
+            print(f"\nNot saturated up to {steps[-1]:g} {unit}")
+        else:
+            print(f"\nSaturated at {saturation:g} {unit}; capacity {capacity:g} {unit}" if capacity is not None
+                  else f"\nSaturated already at {saturation:g} {unit}")
+
+    if args.out:
+        report = {
+            "metadata": {
+                "git_commit": git_commit(),
+                "mode": args.mode,
+                "sessions": args.sessions,
+                "duration": args.duration,
+                "repeat_share": args.repeat_share,
+                "caches": not args.no_cache,
+                "reddit_latency": args.reddit_latency,
+                "model_latency": args.model_latency,
+                "reddit_error_rate": args.reddit_error_rate,
+                "model_error_rate": args.model_error_rate,
+                "slo_ms": args.slo,
+            },
+            "steps": results,
+            "capacity": capacity,
+            "saturation": saturation,
+            "reddit_requests": reddit.requests,
+            "model_calls": model.calls,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
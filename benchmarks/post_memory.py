@@ -0,0 +1,123 @@
+"""
+Memory held per 10k posts, as per-post dicts versus PostBatch.
+
+Posts from the fixture are grouped into listings of MCP_LISTING_LIMIT, as
+the listing cache stores them, and measured with tracemalloc two ways:
+
+- fetched: built from submissions, as the fetch path does (strings the
+  submissions already hold are shared, so only the added memory counts)
+- cached: decoded from a cache entry, as the memory tier holds them
+  (every string is a fresh copy)
+
+The "dicts" rows use the RedditPost dicts the fetch path built before
+PostBatch.
+
+    python -m benchmarks.post_memory
+    python -m benchmarks.post_memory --posts 50000 --out post_memory.json
+"""
+
+import gc
+import json
+import argparse
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from benchmarks.run import git_commit
+
+from agents.common.cache_codecs import Codec
+from agents.common.post_batch import PostBatch
+from agents.reddit_scout_mcp.agent import RELEVANT_SUBREDDITS
+
+from benchmarks.replay import ReplaySubmission, load_fixture, synthetic_fixture
+
+def post_to_dict(post: Any, sub_name: str) -> Dict[str, Any]:
+    """The RedditPost dict the fetch path built for every post before PostBatch."""
+    post_date = datetime.fromtimestamp(post.created_utc).strftime('%Y-%m-%d')
+    return {
+        "title": post.title,
+        "url": f"https://reddit.com{post.permalink}",
+        "score": post.score,
+        "num_comments": post.num_comments,
+        "created_utc": post_date,
+        "flair": post.link_flair_text or "",
+        "selftext": post.selftext[:500] + "..." if len(post.selftext) > 500 else post.selftext,
+        "subreddit": sub_name
+    }
+
+def traced_bytes(build: Callable[[], Any]) -> int:
+    """Memory still allocated by build()'s result once it returns."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return held
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure memory per 10k posts: dicts versus PostBatch")
+    parser.add_argument("--fixture", type=Path, help="Recorded fixture (default: synthetic)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--posts", type=int, default=10000, help="Posts to hold")
+    parser.add_argument("--listing-size", type=int, default=25, help="Posts per cached listing (MCP_LISTING_LIMIT)")
+    parser.add_argument("--out", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    if args.fixture:
+        fixture = load_fixture(args.fixture)
+    else:
+        per_subreddit = -(-args.posts // len(RELEVANT_SUBREDDITS))
+        fixture = synthetic_fixture(RELEVANT_SUBREDDITS, posts_per_subreddit=per_subreddit, seed=args.seed)
+
+    listings = []
+    for key, posts in fixture["listings"].items():
+        sub_name = key.split("|")[0]
+        submissions = [ReplaySubmission(post) for post in posts]
+        for start in range(0, len(submissions), args.listing_size):
+            listings.append((sub_name, submissions[start:start + args.listing_size]))
+    total = sum(len(submissions) for _, submissions in listings)
+    if total < args.posts:
+        print(f"Note: the fixture has only {total} posts")
+
+    codec = Codec()
+    dict_blobs = [
+        codec.encode({"limit": len(subs), "posts": [post_to_dict(post, sub_name) for post in subs]})
+        for sub_name, subs in listings
+    ]
+    batch_blobs = [
+        codec.encode({"limit": len(subs), "posts": PostBatch.from_submissions(subs, sub_name).to_columns()})
+        for sub_name, subs in listings
+    ]
+
+    cases = {
+        "dicts, fetched": lambda: [[post_to_dict(post, sub_name) for post in subs] for sub_name, subs in listings],
+        "dicts, cached": lambda: [codec.decode(blob)["posts"] for blob in dict_blobs],
+        "PostBatch, fetched": lambda: [PostBatch.from_submissions(subs, sub_name) for sub_name, subs in listings],
+        "PostBatch, cached": lambda: [PostBatch.from_columns(codec.decode(blob)["posts"]) for blob in batch_blobs],
+    }
+
+    print(f"{total} posts in {len(listings)} listings, cache codec {codec.name}\n")
+    print(f"{'representation':<22}{'bytes/post':>12}{'MiB per 10k':>14}")
+    results = []
+    for name, build in cases.items():
+        per_post = traced_bytes(build) / total
+        results.append({"representation": name, "bytes_per_post": round(per_post, 1), "mib_per_10k": round(per_post * 10000 / 2**20, 2)})
+        print(f"{name:<22}{per_post:>12.0f}{per_post * 10000 / 2**20:>14.2f}")
+
+    if args.out:
+        report = {
+            "metadata": {"git_commit": git_commit(), "posts": total, "listing_size": args.listing_size, "codec": codec.name},
+            "results": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
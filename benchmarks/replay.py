@@ -0,0 +1,288 @@
+"""
+Record/replay stand-ins for Reddit and Gemini.
+
+ReplayReddit and ReplayModel implement the small parts of praw.Reddit and
+genai.GenerativeModel the agents use, serving listings and answers from a
+fixture file instead of the network, so benchmarks run offline, without
+credentials and with the same inputs every time.
+
+A fixture is JSON:
+
+    {
+      "listings": {"<subreddit>|hot|": [post, ...], "<subreddit>|search|<query>": [post, ...]},
+      "answers": {"<normalized question>": "answer text", ...}
+    }
+
+where each post has id, title, selftext, permalink, score, num_comments,
+created_utc (epoch seconds), flair and subreddit. Record one from the
+live APIs with
+
+    python -m benchmarks.replay --out benchmarks/fixtures/recorded.json [--answers]
+
+or let the suite generate a deterministic synthetic fixture.
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+from agents.reddit_scout.answer_cache import normalize_question
+from agents.reddit_scout.questions import EXAMPLE_QUESTIONS
+
+class ReplayError(Exception):
+    """An error injected by a stand-in."""
+
+class ReplaySubmission:
+    """Just the praw.models.Submission attributes the agents read."""
+    __slots__ = ("id", "name", "title", "selftext", "permalink", "score", "num_comments",
+                 "created_utc", "link_flair_text", "subreddit")
+
+    def __init__(self, post: Dict[str, Any]):
+        self.id = post["id"]
+        self.name = f"t3_{post['id']}"
+        self.title = post["title"]
+        self.selftext = post["selftext"]
+        self.permalink = post["permalink"]
+        self.score = post["score"]
+        self.num_comments = post["num_comments"]
+        self.created_utc = post["created_utc"]
+        self.link_flair_text = post.get("flair") or None
+        self.subreddit = SimpleNamespace(display_name=post["subreddit"])
+
+class ReplaySubreddit:
+    def __init__(self, reddit: "ReplayReddit", name: str):
+        self.reddit = reddit
+        self.display_name = name
+
+    def hot(self, limit: int = 25) -> List[ReplaySubmission]:
+        return self.reddit.listing(self.display_name, "hot", "", limit)
+
+    def new(self, limit: int = 25, **kwargs: Any) -> List[ReplaySubmission]:
+        posts = self.reddit.listing(self.display_name, "hot", "", 100)
+        return sorted(posts, key=lambda post: post.created_utc, reverse=True)[:limit]
+
+    def search(self, query: str, limit: int = 25, **kwargs: Any) -> List[ReplaySubmission]:
+        return self.reddit.listing(self.display_name, "search", query, limit)
+
+class ReplayReddit:
+    """
+    praw.Reddit stand-in serving recorded listings.
+
+    Searches that were not recorded are answered from the subreddit's hot
+    listing, keeping posts that share a word with the query. `latency`
+    seconds are slept per request to emulate the network, and a share
+    `error_rate` of requests fail with ReplayError.
+    """
+    def __init__(self, fixture: Dict[str, Any], latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.listings = fixture["listings"]
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.read_only = True
+        self.auth = SimpleNamespace(limits={"remaining": None, "reset_timestamp": None, "used": None})
+        self.user = SimpleNamespace(me=lambda: None)
+
+    def subreddit(self, name: str) -> ReplaySubreddit:
+        return ReplaySubreddit(self, name)
+
+    def info(self, fullnames: Optional[List[str]] = None) -> List[ReplaySubmission]:
+        self._request()
+        wanted = {fullname[3:] for fullname in fullnames or []}
+        return [
+            ReplaySubmission(post)
+            for posts in self.listings.values()
+            for post in posts
+            if post["id"] in wanted
+        ]
+
+    def listing(self, subreddit: str, listing: str, query: str, limit: int) -> List[ReplaySubmission]:
+        self._request()
+        posts = self.listings.get(f"{subreddit}|{listing}|{query}")
+        if posts is None:
+            posts = self.listings.get(f"{subreddit}|hot|", [])
+            if listing == "search":
+                terms = set(query.lower().split())
+                posts = [post for post in posts if terms & set(f"{post['title']} {post['selftext']}".lower().split())]
+        return [ReplaySubmission(post) for post in posts[:limit]]
+
+    def _request(self) -> None:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors += 1
+            raise ReplayError("Injected Reddit error")
+
+class ReplayModel:
+    """
+    genai.GenerativeModel stand-in serving recorded answers.
+
+    Questions without a recorded answer get the default answer. The model
+    is recognised by the question quoted in the chat prompt. `latency`
+    seconds are spent before the first chunk, and a share `error_rate` of
+    calls fail with ReplayError.
+    """
+    model_name = "models/replay"
+
+    def __init__(self, fixture: Dict[str, Any], latency: float = 0.0, chunk_chars: int = 80,
+                 error_rate: float = 0.0, seed: int = 0):
+        self.answers = fixture.get("answers", {})
+        self.default_answer = fixture.get("default_answer") or next(iter(self.answers.values()), "No answer recorded.")
+        self.latency = latency
+        self.chunk_chars = chunk_chars
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def answer_for(self, prompt: str) -> str:
+        marker = 'Based on the user\'s question: "'
+        start = prompt.find(marker)
+        if start >= 0:
+            question = prompt[start + len(marker):prompt.find('"', start + len(marker))]
+            return self.answers.get(normalize_question(question), self.default_answer)
+        return self.default_answer
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs: Any) -> Any:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        self._maybe_fail()
+        answer = self.answer_for(prompt)
+        if stream:
+            return iter(self._chunks(answer))
+        return SimpleNamespace(text=answer)
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs: Any) -> Any:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        return SimpleNamespace(text=self.answer_for(prompt))
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors += 1
+            raise ReplayError("Injected Gemini error")
+
+    def _chunks(self, answer: str) -> Iterator[SimpleNamespace]:
+        for start in range(0, len(answer), self.chunk_chars):
+            yield SimpleNamespace(text=answer[start:start + self.chunk_chars])
+
+def install(reddit: ReplayReddit, model: ReplayModel) -> None:
+    """Point the shared Reddit client and the chat agent's Gemini models at the stand-ins."""
+    from agents.common.reddit_client import REDDIT_CLIENTS
+    from agents.reddit_scout.chat_agent import chat_agent
+
+    REDDIT_CLIENTS.get_client = lambda: reddit
+    chat_agent.model = model
+    chat_agent.async_model = lambda: model
+
+def load_fixture(path: Path) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+SYNTHETIC_TOPICS = [
+    "visa requirements", "processing time", "biometrics appointment", "proof of funds", "health insurance",
+    "tax residency", "digital nomad visa", "golden visa", "skilled worker visa", "citizenship by descent",
+    "Schengen 90/180 rule", "Express Entry draw", "PR pathway", "job offer sponsorship", "apostille documents",
+]
+
+def synthetic_fixture(subreddits: List[str], posts_per_subreddit: int = 100, seed: int = 1234) -> Dict[str, Any]:
+    """A deterministic fixture with realistic sizes, for when no recording is available."""
+    rng = random.Random(seed)
+    now = 1_760_000_000
+    listings = {}
+    for sub_name in subreddits:
+        posts = []
+        for i in range(posts_per_subreddit):
+            topic = rng.choice(SYNTHETIC_TOPICS)
+            post_id = f"{sub_name[:4].lower()}{i:04d}"
+            slug = topic.lower().replace(" ", "_").replace("/", "_")
+            posts.append({
+                "id": post_id,
+                "title": f"Question about {topic} ({sub_name} #{i})",
+                "selftext": " ".join(rng.choice(SYNTHETIC_TOPICS) for _ in range(rng.randint(5, 120))),
+                "permalink": f"/r/{sub_name}/comments/{post_id}/{slug}/",
+                "score": int(rng.paretovariate(1.2) * 5),
+                "num_comments": int(rng.paretovariate(1.3) * 3),
+                "created_utc": now - rng.randint(0, 90 * 86400),
+                "flair": rng.choice(["", "Question", "Discussion", "Success story"]),
+                "subreddit": sub_name,
+            })
+        listings[f"{sub_name}|hot|"] = posts
+
+    answers = {}
+    for question in EXAMPLE_QUESTIONS:
+        sub_name = rng.choice(subreddits)
+        links = " ".join(
+            f"See https://www.reddit.com/r/{sub_name}/comments/{post['id']}/{post['permalink'].rstrip('/').rsplit('/', 1)[-1]}/ and r/{sub_name}."
+            for post in rng.sample(listings[f"{sub_name}|hot|"], 5)
+        )
+        answers[normalize_question(question)] = (
+            f"## Summary\n\nCommunity discussions about {question.lower()} mention several steps.\n\n"
+            + "\n\n".join(f"- Point {i}: {rng.choice(SYNTHETIC_TOPICS)} matters. {links}" for i in range(8))
+            + "\n\n*Always verify with official sources.*"
+        )
+    return {"listings": listings, "answers": answers}
+
+def record_fixture(out: Path, limit: int, with_answers: bool) -> None:
+    """Record hot listings and Popular Question searches (and optionally answers) from the live APIs."""
+    from agents.common.reddit_client import get_reddit_client
+    from agents.reddit_scout.agent import RELEVANT_SUBREDDITS
+
+    reddit = get_reddit_client()
+
+    def to_post(post: Any, sub_name: str) -> Dict[str, Any]:
+        return {
+            "id": post.id,
+            "title": post.title,
+            "selftext": post.selftext,
+            "permalink": post.permalink,
+            "score": post.score,
+            "num_comments": post.num_comments,
+            "created_utc": int(post.created_utc),
+            "flair": post.link_flair_text or "",
+            "subreddit": sub_name,
+        }
+
+    listings = {}
+    for sub_name in RELEVANT_SUBREDDITS:
+        sub = reddit.subreddit(sub_name)
+        listings[f"{sub_name}|hot|"] = [to_post(post, sub_name) for post in sub.hot(limit=limit)]
+        for question in EXAMPLE_QUESTIONS:
+            listings[f"{sub_name}|search|{question}"] = [to_post(post, sub_name) for post in sub.search(question, limit=limit)]
+        print(f"Recorded r/{sub_name}")
+
+    answers = {}
+    if with_answers:
+        from agents.reddit_scout.chat_agent import chat_agent
+        for question in EXAMPLE_QUESTIONS:
+            answers[normalize_question(question)] = chat_agent.generate_response(question)
+            print(f"Recorded answer: {question}")
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"listings": listings, "answers": answers}, f)
+    print(f"Wrote {out}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record a benchmark fixture from the live Reddit and Gemini APIs")
+    parser.add_argument("--out", type=Path, default=Path("benchmarks/fixtures/recorded.json"))
+    parser.add_argument("--limit", type=int, default=25, help="Posts per listing")
+    parser.add_argument("--answers", action="store_true", help="Also record Gemini answers to the Popular Questions")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    record_fixture(args.out, args.limit, args.answers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Offline benchmark suite for the Reddit fetch, cache, context and chat paths.
+
+Reddit and Gemini are replaced by the replay stand-ins in
+benchmarks/replay.py, and every cache and store lives in a fresh temporary
+directory, so two runs on the same machine see the same inputs and start
+from the same state. Each case reports latency percentiles, throughput,
+allocations and the cache hit ratios it produced.
+
+    python -m benchmarks.run --out results.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.2
+    python -m benchmarks.run --case chat_cold --iterations 50 --reddit-latency 0.05
+
+With --compare, the run fails (exit status 1) when any case's p50 or p95
+is slower than the baseline by more than the threshold.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import atexit
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = Path(tempfile.mkdtemp(prefix="reddit-bench-"))
+atexit.register(shutil.rmtree, BENCH_DIR, ignore_errors=True)
+
+# Isolated, deterministic settings; must be in place before the agents are imported
+BENCH_ENV = {
+    "MCP_CACHE_DIR": str(BENCH_DIR / "mcp_cache"),
+    "REDDIT_STORE_PATH": str(BENCH_DIR / "store" / "posts.sqlite3"),
+    "CHAT_ANSWER_CACHE_PATH": str(BENCH_DIR / "store" / "answers.sqlite3"),
+    "REDDIT_RATE_DB": str(BENCH_DIR / "store" / "ratelimit.sqlite3"),
+    "REDDIT_RATE_LIMIT": "false",
+    "REDDIT_RETRIEVAL_MODE": "live",
+    "CHAT_SEMANTIC_VERIFY_RATE": "0",
+    "PREWARM_IN_APP": "false",
+    "REDDIT_CLIENT_ID": "benchmark",
+    "REDDIT_CLIENT_SECRET": "benchmark",
+    "REDDIT_USER_AGENT": "benchmark",
+    "GOOGLE_API_KEY": "benchmark",
+}
+for name, value in BENCH_ENV.items():
+    os.environ.setdefault(name, value)
+
+from agents.common.cache import CACHE_BACKEND, CACHE_STATS, MEMORY_CACHE
+from agents.common.formatting import StreamingLinkFormatter, format_reddit_links
+from agents.reddit_scout import agent as scout_agent
+from agents.reddit_scout.answer_cache import ANSWER_CACHE
+from agents.reddit_scout.chat_agent import chat_agent
+from agents.reddit_scout.context import build_context
+from agents.reddit_scout.questions import EXAMPLE_QUESTIONS
+from agents.reddit_scout.semantic_cache import SEMANTIC_CACHE
+from agents.reddit_scout_mcp.agent import RELEVANT_SUBREDDITS, get_passport_visa_info
+
+from benchmarks.replay import ReplayModel, ReplayReddit, install, load_fixture, synthetic_fixture
+
+@dataclass
+class BenchmarkCase:
+    """One benchmarked operation; run(i) performs the i-th operation, before(i) prepares it untimed."""
+    name: str
+    run: Callable[[int], Any]
+    before: Optional[Callable[[int], None]] = None
+    setup: Optional[Callable[[], None]] = None
+    iterations: int = 100
+
+def reset_listing_cache() -> None:
+    """Drop every cached listing from both cache tiers."""
+    MEMORY_CACHE.clear()
+    CACHE_BACKEND.expire(float("inf"))
+
+def set_chat_caches(enabled: bool) -> None:
+    scout_agent.USE_LISTING_CACHE = enabled
+    ANSWER_CACHE.config.enabled = enabled
+    SEMANTIC_CACHE.config.enabled = enabled
+    SEMANTIC_CACHE.clear()
+
+def question(i: int) -> str:
+    return EXAMPLE_QUESTIONS[i % len(EXAMPLE_QUESTIONS)]
+
+def build_cases(fixture: Dict[str, Any], model: ReplayModel) -> List[BenchmarkCase]:
+    answers = list(fixture["answers"].values()) or [model.default_answer]
+    posts = scout_agent.get_reddit_posts(query=question(0))
+
+    def stream_format(i: int) -> str:
+        answer = answers[i % len(answers)]
+        formatter = StreamingLinkFormatter()
+        for start in range(0, len(answer), model.chunk_chars):
+            formatter.feed(answer[start:start + model.chunk_chars])
+        return formatter.finish()
+
+    return [
+        BenchmarkCase(
+            "reddit_fetch_cold",
+            run=lambda i: scout_agent.get_reddit_posts(query=question(i)),
+            before=lambda i: reset_listing_cache(),
+            setup=lambda: set_chat_caches(True),
+        ),
+        BenchmarkCase(
+            "reddit_fetch_warm",
+            run=lambda i: scout_agent.get_reddit_posts(query=question(i)),
+            setup=lambda: set_chat_caches(True),
+            iterations=200,
+        ),
+        BenchmarkCase(
+            "mcp_listing_all_cold",
+            run=lambda i: get_passport_visa_info(),
+            before=lambda i: reset_listing_cache(),
+        ),
+        BenchmarkCase(
+            "mcp_listing_all_warm",
+            run=lambda i: get_passport_visa_info(),
+            iterations=200,
+        ),
+        BenchmarkCase(
+            "mcp_listing_one_warm",
+            run=lambda i: get_passport_visa_info(subreddit=RELEVANT_SUBREDDITS[i % len(RELEVANT_SUBREDDITS)]),
+            iterations=200,
+        ),
+        BenchmarkCase(
+            "context_build",
+            run=lambda i: build_context(chat_agent.instruction, question(i), posts),
+            iterations=200,
+        ),
+        BenchmarkCase(
+            "format_links",
+            run=lambda i: format_reddit_links(answers[i % len(answers)]),
+            iterations=500,
+        ),
+        BenchmarkCase(
+            "format_links_streaming",
+            run=stream_format,
+            iterations=500,
+        ),
+        BenchmarkCase(
+            "chat_cold",
+            run=lambda i: chat_agent.generate_response(question(i)),
+            before=lambda i: reset_listing_cache(),
+            setup=lambda: set_chat_caches(False),
+            iterations=50,
+        ),
+        BenchmarkCase(
+            "chat_warm",
+            run=lambda i: chat_agent.generate_response(question(i)),
+            setup=lambda: set_chat_caches(True),
+            iterations=200,
+        ),
+    ]
+
+def counters(reddit: ReplayReddit, model: ReplayModel) -> Dict[str, int]:
+    cache = CACHE_STATS.get_stats()
+    answer = ANSWER_CACHE.get_stats()
+    semantic = SEMANTIC_CACHE.get_stats()
+    return {
+        "listing_hits": cache["hits"],
+        "listing_misses": cache["misses"],
+        "answer_hits": answer["hits"],
+        "answer_misses": answer["misses"],
+        "semantic_hits": semantic["hits"],
+        "semantic_lookups": semantic["lookups"],
+        "reddit_requests": reddit.requests,
+        "model_calls": model.calls,
+    }
+
+def ratio(hits: int, total: int) -> Optional[float]:
+    return round(hits / total, 4) if total else None
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def measure(case: BenchmarkCase, reddit: ReplayReddit, model: ReplayModel, warmup: int, iterations: int) -> Dict[str, Any]:
+    if case.setup:
+        case.setup()
+    for i in range(warmup):
+        if case.before:
+            case.before(i)
+        case.run(i)
+
+    before = counters(reddit, model)
+    timings = []
+    for i in range(iterations):
+        if case.before:
+            case.before(i)
+        start = time.perf_counter()
+        case.run(i)
+        timings.append(time.perf_counter() - start)
+    after = counters(reddit, model)
+    delta = {name: after[name] - before[name] for name in after}
+
+    # Allocations are measured in a separate pass, since tracing slows everything down
+    traced = min(iterations, 20)
+    tracemalloc.start()
+    for i in range(traced):
+        if case.before:
+            case.before(i)
+        case.run(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    total = sum(timings)
+    return {
+        "iterations": iterations,
+        "mean_ms": round(statistics.fmean(timings) * 1000, 4),
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(timings, 0.99) * 1000, 4),
+        "max_ms": round(timings[-1] * 1000, 4),
+        "ops_per_sec": round(iterations / total, 2) if total else None,
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "listing_hit_ratio": ratio(delta["listing_hits"], delta["listing_hits"] + delta["listing_misses"]),
+        "answer_hit_ratio": ratio(delta["answer_hits"], delta["answer_hits"] + delta["answer_misses"]),
+        "semantic_hit_ratio": ratio(delta["semantic_hits"], delta["semantic_lookups"]),
+        "reddit_requests_per_op": round(delta["reddit_requests"] / iterations, 3),
+        "model_calls_per_op": round(delta["model_calls"] / iterations, 3),
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Cases whose p50 or p95 got slower than the baseline by more than threshold."""
+    regressions = []
+    print(f"\n{'case':<26}{'metric':<8}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if not previous.get(metric):
+                continue
+            change = current[metric] / previous[metric] - 1
+            flag = "  REGRESSION" if change > threshold else ""
+            print(f"{name:<26}{metric[:3]:<8}{previous[metric]:>12.3f}{current[metric]:>12.3f}{change:>+10.1%}{flag}")
+            if change > threshold:
+                regressions.append(f"{name} {metric} {change:+.1%}")
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--fixture", type=Path, help="Recorded fixture (default: synthetic, generated from --seed)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--case", action="append", help="Run only these cases (repeatable)")
+    parser.add_argument("--iterations", type=int, help="Override every case's iteration count")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--reddit-latency", type=float, default=0.0, help="Seconds per replayed Reddit request")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Seconds per replayed Gemini call")
+    parser.add_argument("--out", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before a case counts as regressed")
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture) if args.fixture else synthetic_fixture(RELEVANT_SUBREDDITS, seed=args.seed)
+    reddit = ReplayReddit(fixture, latency=args.reddit_latency)
+    model = ReplayModel(fixture, latency=args.model_latency)
+    install(reddit, model)
+
+    cases = build_cases(fixture, model)
+    if args.case:
+        unknown = set(args.case) - {case.name for case in cases}
+        if unknown:
+            parser.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+        cases = [case for case in cases if case.name in args.case]
+
+    results = {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fixture": str(args.fixture) if args.fixture else f"synthetic(seed={args.seed})",
+            "reddit_latency": args.reddit_latency,
+            "model_latency": args.model_latency,
+        },
+        "results": {},
+    }
+    for case in cases:
+        iterations = args.iterations or case.iterations
+        result = measure(case, reddit, model, args.warmup, iterations)
+        results["results"][case.name] = result
+        print(
+            f"{case.name:<26}p50 {result['p50_ms']:>9.3f} ms  p95 {result['p95_ms']:>9.3f} ms  "
+            f"p99 {result['p99_ms']:>9.3f} ms  {result['ops_per_sec'] or 0:>10.1f} ops/s  "
+            f"peak {result['peak_alloc_kb']:>8.1f} KiB"
+        )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: " + "; ".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()